@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Backfill historical JobTech ads from local JSONL dumps
+
+JobTech publishes historical ads as JSONL files with one ad per line,
+in the same format as the search API. This script streams such a file
+in large binary chunks. Each batch of raw lines is sent to a pool of
+worker processes, which parse, normalize (normalize_jobtech_ad) and
+classify the ads. The parent process writes the results in file order
+either to the job store or to JSONL shards per publication month.
+
+Memory stays bounded: at most two batches per worker are in flight,
+and a batch is dropped as soon as it is written. After every batch the
+byte offset reached in the dump is checkpointed together with the
+written data, so an interrupted run resumes where it stopped.
+
+Archived ads never replace ads already in the job store and are not
+part of the current result set.
+
+Usage:
+    python scripts/backfill.py ads_2023.jsonl
+    python scripts/backfill.py ads_2023.jsonl --shards archive --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import jobtech_job_scraper as scraper
+from job_store import JobStore
+from json_stream import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Ads classified per worker task
+DEFAULT_BATCH_SIZE = 2000
+
+# Bytes read from the dump at a time
+READ_BUFFER_SIZE = 1 << 20
+
+# Store metadata key prefix for the checkpoint of each dump
+CHECKPOINT_KEY_PREFIX = "backfill:"
+
+# Checkpoint file in a shard directory
+SHARD_STATE_FILE = "backfill_state.json"
+
+
+def read_batches(path, offset, batch_size):
+    """
+    Read a JSONL file in batches of raw lines, starting at a byte offset
+
+    Args:
+        path (str): JSONL file
+        offset (int): Byte offset to start at, at the start of a line
+        batch_size (int): Lines per batch
+
+    Yields:
+        tuple: (list of non-empty lines as bytes, byte offset after the batch)
+    """
+    with open(path, "rb", buffering=READ_BUFFER_SIZE) as f:
+        f.seek(offset)
+        lines = []
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= batch_size:
+                yield lines, offset
+                lines = []
+        if lines:
+            yield lines, offset
+
+
+def classify_lines(lines):
+    """
+    Parse, normalize and classify a batch of dump lines, in a worker process
+
+    Args:
+        lines (list): Raw JSONL lines
+
+    Returns:
+        tuple: (classified jobs, number of lines that were not valid ads)
+    """
+    jobs = []
+    invalid = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            invalid += 1
+            continue
+        if not isinstance(record, dict) or not record.get("id") or record.get("removed"):
+            invalid += 1
+            continue
+        jobs.append(scraper.normalize_jobtech_ad(record, None))
+
+    if jobs and scraper.get_batch_scorer() is not None:
+        scraper.categorize_job_batch(jobs)
+    else:
+        for job in jobs:
+            scraper.categorize_job(job)
+    return jobs, invalid
+
+
+class StoreSink:
+    """
+    Writes archived ads to the job store, with the checkpoint in the store metadata
+
+    Args:
+        path (str): Job store database
+        source (str): Dump being backfilled
+    """
+
+    def __init__(self, path, source):
+        self.store = JobStore(path)
+        self.key = CHECKPOINT_KEY_PREFIX + os.path.abspath(source)
+        self.seen_at = datetime.now(timezone.utc).strftime(scraper.TIMESTAMP_FORMAT)
+
+    def load_checkpoint(self):
+        """
+        Read the checkpoint of the dump, None if there is none
+        """
+        value = self.store.get_meta(self.key)
+        return json.loads(value) if value else None
+
+    def reset(self):
+        """
+        Start the dump over; archived ads are never inserted twice, so nothing needs undoing
+        """
+
+    def write(self, jobs, checkpoint):
+        """
+        Insert a batch and its checkpoint in one transaction
+
+        Returns:
+            int: Number of ads not stored before
+        """
+        return self.store.archive_jobs(jobs, self.seen_at, meta={self.key: json.dumps(checkpoint)})
+
+    def close(self):
+        self.store.close()
+
+
+def _remove_ranges(path, ranges):
+    """
+    Rewrite a file without the given byte ranges
+
+    Args:
+        path (str): File to rewrite, replaced atomically
+        ranges (list): Sorted, non-overlapping (start, end) byte ranges
+    """
+    temp_path = path + ".tmp"
+    with open(path, "rb") as source, open(temp_path, "wb") as target:
+        position = 0
+        for start, end in list(ranges) + [(os.path.getsize(path), None)]:
+            source.seek(position)
+            left = start - position
+            while left > 0:
+                chunk = source.read(min(left, READ_BUFFER_SIZE))
+                target.write(chunk)
+                left -= len(chunk)
+            position = end
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(temp_path, path)
+
+
+class ShardSink:
+    """
+    Appends archived ads to JSONL files per publication month
+
+    The sizes of all shards are checkpointed with the dump offset. On
+    resume, shards are truncated to the checkpointed sizes, so ads
+    written after the last checkpoint are not duplicated. Several dumps
+    can be backfilled into the same directory; the byte ranges each dump
+    appended to each shard are recorded, so restarting one dump removes
+    only its own ads.
+
+    Args:
+        directory (str): Shard directory
+        source (str): Dump being backfilled
+    """
+
+    def __init__(self, directory, source):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.source = os.path.abspath(source)
+        self.state_path = os.path.join(directory, SHARD_STATE_FILE)
+        self.state = {"sources": {}, "shards": {}, "segments": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        # [source, start, end] byte ranges per shard, in file order
+        self.state.setdefault("segments", {})
+        self.files = {}
+
+    def _shard_path(self, name):
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    def load_checkpoint(self):
+        """
+        Read the checkpoint of the dump, None if there is none
+
+        Shards are cut back to their checkpointed sizes, and shards
+        created after the last checkpoint are removed.
+        """
+        recorded = self.state["shards"]
+        for entry in os.listdir(self.directory):
+            name, extension = os.path.splitext(entry)
+            if extension != ".jsonl":
+                continue
+            path = self._shard_path(name)
+            if name not in recorded:
+                os.remove(path)
+            elif os.path.getsize(path) > recorded[name]:
+                os.truncate(path, recorded[name])
+        return self.state["sources"].get(self.source)
+
+    def reset(self):
+        """
+        Start the dump over: remove its ads from the shards and forget its checkpoint
+
+        Ads written by other dumps stay where they are, and so do their
+        checkpoints. A shard left without ads is removed.
+        """
+        self.load_checkpoint()
+        segments = self.state["segments"]
+        if self.source in self.state["sources"] and not any(
+                owner == self.source for shard in segments.values() for owner, _, _ in shard):
+            logger.warning(f"No shard ranges recorded for {self.source}, its earlier ads stay in the shards")
+        for name in list(segments):
+            removed = [(start, end) for owner, start, end in segments[name] if owner == self.source]
+            if not removed:
+                continue
+            path = self._shard_path(name)
+            removed_bytes = sum(end - start for start, end in removed)
+            if removed_bytes == self.state["shards"][name]:
+                os.remove(path)
+                del segments[name]
+                del self.state["shards"][name]
+                continue
+            _remove_ranges(path, removed)
+            # Ranges after a removed one move back by its length
+            segments[name] = [
+                [owner, start - shift, end - shift]
+                for owner, start, end in segments[name] if owner != self.source
+                for shift in [sum(e - s for s, e in removed if e <= start)]
+            ]
+            self.state["shards"][name] -= removed_bytes
+        self.state["sources"].pop(self.source, None)
+        self._save_state()
+
+    def _save_state(self):
+        write_atomic(self.state_path, json.dumps(self.state, ensure_ascii=False, indent=4).encode("utf-8"))
+
+    def write(self, jobs, checkpoint):
+        """
+        Append a batch to the shards, then checkpoint it
+
+        Returns:
+            int: Number of ads written
+        """
+        for job in jobs:
+            name = (job.get("published") or "")[:7] or "unknown"
+            f = self.files.get(name)
+            if f is None:
+                f = self.files[name] = open(self._shard_path(name), "ab")
+            f.write(job.to_json().encode("utf-8") + b"\n")
+        for name, f in self.files.items():
+            f.flush()
+            os.fsync(f.fileno())
+            start, end = self.state["shards"].get(name, 0), f.tell()
+            if end > start:
+                segments = self.state["segments"].setdefault(name, [])
+                if segments and segments[-1][0] == self.source and segments[-1][2] == start:
+                    segments[-1][2] = end
+                else:
+                    segments.append([self.source, start, end])
+            self.state["shards"][name] = end
+        self.state["sources"][self.source] = checkpoint
+        self._save_state()
+        return len(jobs)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def backfill(path, sink, workers=None, batch_size=DEFAULT_BATCH_SIZE, restart=False):
+    """
+    Classify every ad in a JSONL dump and write it to a sink
+
+    Args:
+        path (str): JSONL dump
+        sink (StoreSink or ShardSink): Destination of the classified ads
+        workers (int): Worker processes (None = number of CPUs)
+        batch_size (int): Ads classified per worker task
+        restart (bool): Ignore the checkpoint and start at the beginning
+
+    Returns:
+        dict: The final checkpoint (offset, records, invalid lines and kept
+            jobs over all runs) and the ads written by this run
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    checkpoint = None
+    if restart:
+        sink.reset()
+    else:
+        checkpoint = sink.load_checkpoint()
+    if checkpoint and checkpoint["offset"] > size:
+        logger.warning(f"{path} is smaller than at the last checkpoint, starting over")
+        sink.reset()
+        checkpoint = None
+    if checkpoint:
+        logger.info(f"Resuming {path} at byte {checkpoint['offset']} of {size}")
+    checkpoint = dict(checkpoint or {"offset": 0, "records": 0, "invalid": 0, "kept": 0})
+
+    # Compile the rules once; forked workers inherit them
+    scraper.get_matcher()
+    scraper.get_batch_scorer()
+
+    start = time.perf_counter()
+    start_records = checkpoint["records"]
+    pending = deque()
+    counts = {"written": 0}
+
+    def write_next():
+        future, end_offset = pending.popleft()
+        jobs, invalid = future.result()
+        checkpoint.update(
+            offset=end_offset,
+            records=checkpoint["records"] + len(jobs),
+            invalid=checkpoint["invalid"] + invalid,
+            kept=checkpoint["kept"] + sum(1 for job in jobs if job["category"])
+        )
+        counts["written"] += sink.write(jobs, dict(checkpoint))
+        elapsed = time.perf_counter() - start
+        rate = (checkpoint["records"] - start_records) / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Backfilled {checkpoint['records']} ads ({checkpoint['offset'] * 100 // max(size, 1)}% "
+                    f"of {path}, {rate:.0f} ads/s)")
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for lines, end_offset in read_batches(path, checkpoint["offset"], batch_size):
+            pending.append((pool.submit(classify_lines, lines), end_offset))
+            if len(pending) >= 2 * workers:
+                write_next()
+        while pending:
+            write_next()
+    except BaseException:
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    logger.info(f"Backfill of {path} complete: {checkpoint['records']} ads, {checkpoint['kept']} kept, "
+                f"{counts['written']} written by this run, {checkpoint['invalid']} invalid lines")
+    return dict(checkpoint, written=counts["written"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill historical JobTech ads from a JSONL dump")
+    parser.add_argument("dump", help="JSONL file with one JobTech ad per line")
+    parser.add_argument("--store", default=scraper.JOB_STORE_FILE,
+                        help="job store to write the ads to (default: %(default)s)")
+    parser.add_argument("--shards", metavar="DIR",
+                        help="write JSONL shards per publication month to DIR instead of the job store")
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="ads per worker task")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    scraper.setup_logging()
+    sink = ShardSink(args.shards, args.dump) if args.shards else StoreSink(args.store, args.dump)
+    try:
+        backfill(args.dump, sink, args.workers, args.batch_size, args.restart)
+    finally:
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
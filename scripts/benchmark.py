@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the job scraper
+
+Runs micro-benchmarks for classification and serialization on synthetic
+ads (see synthetic_jobs.py) and an end-to-end benchmark of the scraper's
+main() against a local stub of the JobTech search API with a configurable
+response latency. Results are written as JSON, together with the commit
+and environment they were measured on, so runs of different commits can
+be compared.
+
+Usage:
+    python scripts/benchmark.py --output benchmark_results.json
+    python scripts/benchmark.py --scales 1000 10000 --repeat 5 --latency 0.1
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import jobtech_job_scraper as scraper
+from frontend_export import export_frontend_payload
+from jobtech_stub_server import create_server
+from synthetic_jobs import DEFAULT_SCALES, generate_ads, generate_search_response
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scales for the end-to-end benchmark; the search API caps every query
+# at about 2000 hits, so larger corpora only add generation time
+DEFAULT_END_TO_END_SCALES = [1000, 10000]
+
+# Stub server response latency in seconds
+DEFAULT_LATENCY = 0.05
+
+# Request rate for the end-to-end benchmark, high enough that the stub's
+# latency rather than the rate limiter dominates
+DEFAULT_END_TO_END_RATE = 50.0
+
+
+def measure(func, repeat):
+    """
+    Time repeated calls of a function
+
+    Args:
+        func (callable): Function to time, called without arguments
+        repeat (int): Number of runs
+
+    Returns:
+        list: Wall-clock seconds of each run
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def make_result(name, scale, runs, items, **extra):
+    """
+    Summarize the runs of one benchmark
+
+    Args:
+        name (str): Benchmark name
+        scale (int): Number of synthetic ads in the corpus
+        runs (list): Seconds of each run
+        items (int): Number of items processed per run, for the throughput
+
+    Returns:
+        dict: Benchmark result
+    """
+    best = min(runs)
+    result = {
+        "name": name,
+        "scale": scale,
+        "items": items,
+        "repeat": len(runs),
+        "best_seconds": round(best, 6),
+        "median_seconds": round(statistics.median(runs), 6),
+        "runs": [round(run, 6) for run in runs],
+        "items_per_second": round(items / best, 1) if best > 0 else None
+    }
+    result.update(extra)
+    return result
+
+
+def run_micro_benchmarks(scale, repeat, work_dir):
+    """
+    Benchmark classification and serialization on a synthetic corpus
+
+    Args:
+        scale (int): Number of synthetic ads
+        repeat (int): Runs per benchmark
+        work_dir (str): Directory for the files written by the benchmarks
+
+    Returns:
+        list: Benchmark results
+    """
+    jobs = [scraper.normalize_jobtech_ad(ad, "Göteborg") for ad in generate_ads(scale)]
+    results = []
+
+    # Build the matcher up front, it is compiled once per run of the scraper
+    scraper.get_matcher()
+
+    def score_all():
+        for job in jobs:
+            for category in scraper.JOB_CATEGORIES:
+                scraper.calculate_relevance_score(job, category)
+
+    runs = measure(score_all, repeat)
+    results.append(make_result("calculate_relevance_score", scale, runs, len(jobs) * len(scraper.JOB_CATEGORIES)))
+
+    categorized = []
+
+    def categorize():
+        categorized[:] = [scraper.filter_and_categorize_jobs(jobs)]
+
+    runs = measure(categorize, repeat)
+    it_jobs, ai_jobs, rpa_jobs, all_filtered_jobs = categorized[0]
+    results.append(make_result(
+        "filter_and_categorize_jobs", scale, runs, len(jobs),
+        categorized={"IT": len(it_jobs), "AI": len(ai_jobs), "RPA": len(rpa_jobs), "all": len(all_filtered_jobs)}
+    ))
+
+    if scraper.get_batch_scorer() is not None:
+        # The per-job classification above is the reference for the batch scorer
+        batch_jobs = [dict(job) for job in jobs]
+        runs = measure(lambda: scraper.categorize_job_batch(batch_jobs), repeat)
+        fields = ("is_consultant", "is_meaningful", "category", "relevance_score", "content_hash")
+        mismatches = sum(
+            1 for job, batch_job in zip(jobs, batch_jobs)
+            if any(job[field] != batch_job[field] for field in fields)
+        )
+        if mismatches:
+            raise RuntimeError(f"Batch scoring differs from categorize_job for {mismatches} jobs")
+        results.append(make_result("categorize_job_batch", scale, runs, len(jobs)))
+
+    json_path = os.path.join(work_dir, "all_jobs.json")
+    runs = measure(lambda: scraper.save_jobs_to_json(all_filtered_jobs, json_path), repeat)
+    results.append(make_result(
+        "save_jobs_to_json", scale, runs, len(all_filtered_jobs),
+        bytes=os.path.getsize(json_path)
+    ))
+
+    data_dir = os.path.join(work_dir, "data")
+    runs = measure(
+        lambda: export_frontend_payload(
+            all_filtered_jobs,
+            os.path.join(data_dir, "jobs_index.json"),
+            os.path.join(data_dir, "details"),
+            os.path.join(data_dir, "search_index.json")
+        ),
+        repeat
+    )
+    results.append(make_result("export_frontend_payload", scale, runs, len(all_filtered_jobs)))
+
+    return results
+
+
+def run_end_to_end_benchmark(scale, repeat, latency, requests_per_second, work_dir):
+    """
+    Benchmark a full run of the scraper against the local stub server
+
+    Each run starts from an empty output directory, so it measures a
+    full sync, including the job store and every export.
+
+    Args:
+        scale (int): Number of synthetic ads served by the stub
+        repeat (int): Number of runs
+        latency (float): Stub response latency in seconds
+        requests_per_second (float): Request rate of the scraper
+        work_dir (str): Directory for the scraper output
+
+    Returns:
+        dict: Benchmark result
+    """
+    server = create_server("127.0.0.1", 0, search=generate_search_response(scale), latency=latency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    env = dict(os.environ)
+    env.update({
+        "JOBTECH_API_URL": f"http://127.0.0.1:{server.server_address[1]}/search",
+        "JOBSCRAPER_REQUESTS_PER_SECOND": str(requests_per_second)
+    })
+
+    runs = []
+    exported = 0
+    try:
+        for run in range(repeat):
+            base_dir = os.path.join(work_dir, f"end_to_end_{scale}_{run}")
+            os.makedirs(base_dir)
+            env["JOBSCRAPER_BASE_DIR"] = base_dir
+
+            start = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, os.path.join(SCRIPT_DIR, "jobtech_job_scraper.py")],
+                cwd=base_dir, env=env, capture_output=True, text=True
+            )
+            runs.append(time.perf_counter() - start)
+            if completed.returncode != 0:
+                raise RuntimeError(f"Scraper run failed:\n{completed.stderr[-2000:]}")
+
+            with open(os.path.join(base_dir, "all_jobs.json"), "r", encoding="utf-8") as f:
+                exported = len(json.load(f))
+            # A run that exports nothing would only time an empty export
+            if not exported:
+                raise RuntimeError(f"Scraper run exported no jobs from {scale} synthetic ads")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return make_result(
+        "main", scale, runs, exported,
+        latency=latency, requests_per_second=requests_per_second
+    )
+
+
+def git_commit():
+    """
+    Commit the benchmarks ran on, None outside a git checkout
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SCRIPT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the job scraper")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="corpus sizes for the micro-benchmarks")
+    parser.add_argument("--end-to-end-scales", type=int, nargs="*", default=DEFAULT_END_TO_END_SCALES,
+                        help="corpus sizes for the end-to-end benchmark (none to skip it)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help="stub server response latency in seconds")
+    parser.add_argument("--requests-per-second", type=float, default=DEFAULT_END_TO_END_RATE,
+                        help="request rate of the scraper in the end-to-end benchmark")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    args = parser.parse_args()
+
+    # The scraper logs every saved file; keep that out of the measurements
+    logging.disable(logging.INFO)
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in args.scales:
+            print(f"Micro-benchmarks with {scale} ads...", file=sys.stderr)
+            scale_dir = os.path.join(work_dir, f"micro_{scale}")
+            os.makedirs(scale_dir)
+            results.extend(run_micro_benchmarks(scale, args.repeat, scale_dir))
+
+        for scale in args.end_to_end_scales:
+            print(f"End-to-end benchmark with {scale} ads...", file=sys.stderr)
+            results.append(run_end_to_end_benchmark(
+                scale, args.repeat, args.latency, args.requests_per_second, work_dir
+            ))
+
+    report = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for result in results:
+        print(f"{result['name']:28} {result['scale']:>7} ads  {result['best_seconds']:10.4f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
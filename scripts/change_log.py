@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Change log of the listing index
+
+Rewriting the whole listing every day makes every visitor download it
+again and adds a full copy to the repository history, even when only a
+handful of ads changed. The change log records the listing as a
+snapshot followed by one delta per export that changed anything:
+
+- manifest.json: the current version, the snapshot and the deltas since it
+- snapshot-<version>.json: every listing entry at that version
+- delta-<version>.json: the entries added and updated and the ids
+  removed since the previous version
+
+index.html keeps the listing of the last visit in local storage and
+only downloads the deltas it has not applied yet. After
+COMPACT_AFTER_DELTAS deltas, or once the deltas add up to half the size
+of the snapshot, the next export writes a new snapshot. The previous
+snapshot and its deltas stay until the compaction after that, so a
+visitor who still has the previous manifest, from a browser or CDN
+cache, can load every file it names.
+
+Entries are applied in place, removed entries are dropped and added
+entries are appended. A delta carries the full id order only when the
+listing order differs from that. Keys are sorted and every entry is on
+a line of its own, so the files diff well from run to run.
+"""
+
+import json
+import logging
+import os
+import time
+
+from json_stream import write_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# Deltas kept before the next export compacts them into a new snapshot
+COMPACT_AFTER_DELTAS = 30
+
+
+def _file_version(filename):
+    """
+    Version of a snapshot or delta file, None for other files
+    """
+    if filename.startswith(("snapshot-", "delta-")) and filename.endswith(".json"):
+        return int(filename.split("-")[1].split(".")[0])
+    return None
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def encode_lines(document):
+    """
+    Encode a change log file with sorted keys and every list entry on a line of its own
+
+    Args:
+        document (dict): File contents
+
+    Returns:
+        bytes: Encoded file
+    """
+    parts = []
+    for key in sorted(document):
+        value = document[key]
+        if isinstance(value, list) and value:
+            parts.append(f"{_dumps(key)}:[\n" + ",\n".join(_dumps(item) for item in value) + "\n]")
+        else:
+            parts.append(f"{_dumps(key)}:{_dumps(value)}")
+    return ("{" + ",\n".join(parts) + "}\n").encode("utf-8")
+
+
+def diff_listings(previous, current):
+    """
+    Compare two listings
+
+    Args:
+        previous (list): Listing entries of the previous version
+        current (list): Listing entries of the new version
+
+    Returns:
+        dict: added and updated entries and removed ids in listing order,
+            plus the id order if applying the rest would not reproduce it
+    """
+    before = {entry["id"]: entry for entry in previous}
+    now = {entry["id"] for entry in current}
+    added = [entry for entry in current if entry["id"] not in before]
+    updated = [entry for entry in current if entry["id"] in before and entry != before[entry["id"]]]
+    removed = [entry["id"] for entry in previous if entry["id"] not in now]
+
+    delta = {"added": added, "updated": updated, "removed": removed}
+    order = [entry["id"] for entry in current]
+    if [entry["id"] for entry in previous if entry["id"] in now] + [entry["id"] for entry in added] != order:
+        delta["order"] = order
+    return delta
+
+
+def apply_delta(listing, delta):
+    """
+    Apply a delta to a listing, as index.html does
+
+    Args:
+        listing (list): Listing entries
+        delta (dict): Delta from diff_listings
+
+    Returns:
+        list: Listing entries of the next version
+    """
+    updated = {entry["id"]: entry for entry in delta["updated"]}
+    removed = set(delta["removed"])
+    result = [updated.get(entry["id"], entry) for entry in listing if entry["id"] not in removed]
+    result.extend(delta["added"])
+    if "order" in delta:
+        by_id = {entry["id"]: entry for entry in result}
+        result = [by_id[job_id] for job_id in delta["order"]]
+    return result
+
+
+class ChangeLog:
+    """
+    Snapshot and deltas of the listing index in one directory
+
+    Args:
+        directory (str): Change log directory
+        compact_after (int): Deltas kept before the next snapshot
+    """
+
+    def __init__(self, directory, compact_after=COMPACT_AFTER_DELTAS):
+        self.directory = directory
+        self.compact_after = compact_after
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+
+    def _read(self, filename):
+        with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self):
+        """
+        Rebuild the listing of the current version from the snapshot and the deltas
+
+        Returns:
+            tuple: (manifest, listing entries), or (None, None) if there is
+                no readable change log
+        """
+        try:
+            manifest = self._read(MANIFEST_FILE)
+            listing = self._read(manifest["snapshot"]["file"])["jobs"]
+            for entry in manifest["deltas"]:
+                listing = apply_delta(listing, self._read(entry["file"]))
+        except FileNotFoundError:
+            return None, None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Unreadable change log in {self.directory}, starting a new snapshot: {e}")
+            return None, None
+        return manifest, listing
+
+    def update(self, listing, metrics=None):
+        """
+        Record the listing of this export as a delta, or as a new snapshot
+
+        Args:
+            listing (list): Listing entries in listing order
+            metrics (RunMetrics): Receives the write time of every file
+
+        Returns:
+            dict: The manifest, unchanged if the listing did not change
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        manifest, previous = self.load()
+        if manifest is not None:
+            delta = diff_listings(previous, listing)
+            if not (delta["added"] or delta["updated"] or delta["removed"] or "order" in delta):
+                logger.info(f"Listing unchanged at change log version {manifest['version']}")
+                return manifest
+
+            version = manifest["version"] + 1
+            filename = f"delta-{version:06d}.json"
+            data = encode_lines(dict(delta, version=version))
+            delta_bytes = sum(entry["bytes"] for entry in manifest["deltas"]) + len(data)
+            if len(manifest["deltas"]) < self.compact_after and delta_bytes * 2 < manifest["snapshot"]["bytes"]:
+                self._write(filename, data, metrics)
+                manifest = dict(manifest, version=version, deltas=manifest["deltas"] + [{
+                    "version": version, "file": filename, "bytes": len(data),
+                    "added": len(delta["added"]), "updated": len(delta["updated"]),
+                    "removed": len(delta["removed"])
+                }])
+                self._write(MANIFEST_FILE, encode_lines(manifest), metrics)
+                logger.info(f"Saved change log version {version}: {len(delta['added'])} added, "
+                            f"{len(delta['updated'])} updated, {len(delta['removed'])} removed ({len(data)} bytes)")
+                return manifest
+        else:
+            # Never reuse a version number a visitor may have cached
+            versions = [_file_version(name) for name in os.listdir(self.directory)]
+            version = max((v for v in versions if v is not None), default=0) + 1
+
+        # Compact: a new snapshot replaces the previous one and all deltas.
+        # Only the files from before the previous snapshot are removed, the
+        # previous manifest may still be cached by a visitor or a CDN
+        keep_from = manifest["snapshot"]["version"] if manifest is not None else version
+        filename = f"snapshot-{version:06d}.json"
+        data = encode_lines({"version": version, "jobs": listing})
+        self._write(filename, data, metrics)
+        manifest = {
+            "version": version,
+            "snapshot": {"version": version, "file": filename, "bytes": len(data)},
+            "deltas": []
+        }
+        self._write(MANIFEST_FILE, encode_lines(manifest), metrics)
+        for name in os.listdir(self.directory):
+            file_version = _file_version(name)
+            if file_version is not None and file_version < keep_from:
+                os.remove(os.path.join(self.directory, name))
+        logger.info(f"Saved change log snapshot version {version} with {len(listing)} jobs ({len(data)} bytes)")
+        return manifest
+
+    def _write(self, filename, data, metrics=None):
+        path = os.path.join(self.directory, filename)
+        start = time.perf_counter()
+        write_atomic(path, data)
+        if metrics is not None:
+            metrics.record_file(path, time.perf_counter() - start)
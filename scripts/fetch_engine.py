@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Concurrent fetch engine for the job scrapers
+
+Runs many search requests in parallel over one pooled keep-alive HTTP
+session. All workers share a token-bucket rate limiter that pauses
+when an API answers 429 and honours its Retry-After header. Responses
+can be served from and stored in an on-disk cache (http_cache.py).
+
+Work can be split into shards, e.g. one per region. Tasks are
+interleaved across shards, the fair limiter hands the next token to
+the waiting shard that got the fewest so far, and every shard has its
+own retry budget, so one large or failing shard neither starves nor
+fails the others.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when the caller does not configure the engine
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_BURST = 5
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_TIMEOUT = 30
+DEFAULT_STREAM_BUFFER = 100
+DEFAULT_SHARD_RETRIES = 3
+DEFAULT_SHARD_RETRY_DELAY = 2.0
+
+# Marks the end of one task's stream in stream_concurrently
+_STREAM_DONE = object()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all workers
+
+    Tokens refill at `rate` per second up to `capacity`. A call to
+    `pause` stops handing out tokens until the given delay has passed,
+    which is how a 429 from one worker slows down all of them.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, capacity=DEFAULT_BURST):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available and consume it
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    elapsed = now - self._last_refill
+                    self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                    self._last_refill = now
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Stop handing out tokens for the given number of seconds
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class FairTokenBucket(TokenBucket):
+    """
+    Token bucket that shares its rate fairly between shards
+
+    When several shards wait for a token, it goes to the one that has
+    received the fewest tokens so far. Workers of one shard therefore
+    cannot crowd out the others, whatever the number of tasks per shard.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, capacity=DEFAULT_BURST):
+        super().__init__(rate, capacity)
+        self._turn = threading.Condition(self._lock)
+        self._granted = {}
+        self._waiting = {}
+
+    def acquire(self, shard=None):
+        """
+        Block until a token is available and it is the shard's turn, and consume it
+
+        Args:
+            shard: Key of the shard asking, e.g. a region code
+        """
+        with self._turn:
+            self._waiting[shard] = self._waiting.get(shard, 0) + 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    else:
+                        elapsed = now - self._last_refill
+                        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                        self._last_refill = now
+                        fewest = min(self._granted.get(waiting, 0) for waiting in self._waiting)
+                        if self._tokens >= 1.0 and self._granted.get(shard, 0) == fewest:
+                            self._tokens -= 1.0
+                            self._granted[shard] = self._granted.get(shard, 0) + 1
+                            return
+                        wait = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else None
+                    # Woken early when another shard takes a token and it may be our turn
+                    self._turn.wait(wait)
+            finally:
+                self._waiting[shard] -= 1
+                if not self._waiting[shard]:
+                    del self._waiting[shard]
+                self._turn.notify_all()
+
+    def for_shard(self, shard):
+        """
+        View of the bucket that acquires tokens for one shard
+
+        Returns:
+            ShardLimiter: Limiter to pass to rate_limited_get
+        """
+        return ShardLimiter(self, shard)
+
+
+class ShardLimiter:
+    """
+    Rate limiter of one shard, sharing a FairTokenBucket with the others
+    """
+
+    __slots__ = ("bucket", "shard")
+
+    def __init__(self, bucket, shard):
+        self.bucket = bucket
+        self.shard = shard
+
+    def acquire(self):
+        self.bucket.acquire(self.shard)
+
+    def pause(self, seconds):
+        # A 429 slows down every shard, as the API limits all of them together
+        self.bucket.pause(seconds)
+
+
+class FetchShard:
+    """
+    One shard of the fetch work, e.g. the searches of one region
+
+    Args:
+        name (str): Shard key, e.g. a region code
+        bucket (FairTokenBucket): Rate limiter shared by all shards
+        max_retries (int): Retries of failed requests allowed for the whole shard
+        retry_delay (float): Delay before the first retry in seconds, doubled after every retry
+
+    Attributes:
+        limiter (ShardLimiter): Rate limiter of the shard
+        failed (bool): Set when a search of the shard failed for good
+    """
+
+    def __init__(self, name, bucket, max_retries=DEFAULT_SHARD_RETRIES, retry_delay=DEFAULT_SHARD_RETRY_DELAY):
+        self.name = name
+        self.limiter = bucket.for_shard(name)
+        self.retries_left = max_retries
+        self.retry_delay = retry_delay
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def next_retry(self, error):
+        """
+        Decide whether to retry a failed request, using up the shard's budget
+
+        Connection errors, timeouts, 429 and server errors are retried;
+        other client errors would fail again.
+
+        Args:
+            error (requests.exceptions.RequestException): Why the request failed
+
+        Returns:
+            float: Seconds to wait before retrying, None to give up
+        """
+        response = getattr(error, "response", None)
+        if response is not None and response.status_code != 429 and response.status_code < 500:
+            return None
+        with self._lock:
+            if self.retries_left <= 0:
+                return None
+            self.retries_left -= 1
+            delay = self.retry_delay
+            self.retry_delay *= 2
+        return delay
+
+
+def interleave_shards(tasks, shard_of):
+    """
+    Order tasks round-robin across their shards, keeping the order within each shard
+
+    Args:
+        tasks (list): Tasks in any order
+        shard_of (callable): Returns the shard key of a task
+
+    Returns:
+        list: The same tasks, first task of every shard first
+    """
+    by_shard = {}
+    for task in tasks:
+        by_shard.setdefault(shard_of(task), []).append(task)
+    ordered = []
+    for position in range(max((len(shard_tasks) for shard_tasks in by_shard.values()), default=0)):
+        ordered.extend(shard_tasks[position] for shard_tasks in by_shard.values() if position < len(shard_tasks))
+    return ordered
+
+
+def create_session(pool_size=DEFAULT_MAX_WORKERS):
+    """
+    Create a keep-alive session whose connection pool fits all workers
+
+    Args:
+        pool_size (int): Number of connections to keep open per host
+
+    Returns:
+        requests.Session: Session shared by all fetch workers
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date
+
+    Returns:
+        float: Delay in seconds, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def rate_limited_get(session, url, rate_limiter, params=None, headers=None,
+                     max_retries=DEFAULT_MAX_RETRIES, timeout=DEFAULT_TIMEOUT, metrics=None,
+                     cache=None, cache_ttl=None, revalidate=False, cache_only=False):
+    """
+    Send a GET request through the shared rate limiter, retrying on 429
+
+    With a response cache, a fresh cached response is returned without
+    a request or a rate-limiter token, and has `from_cache` set. A stale
+    one is revalidated with a conditional request, and a 304 answer
+    returns the cached body.
+
+    Args:
+        session (requests.Session): Pooled session to send the request with
+        url (str): Request URL
+        rate_limiter (TokenBucket or ShardLimiter): Limiter shared by all workers
+        params (dict): Query parameters
+        headers (dict): Extra request headers
+        max_retries (int): Number of retries after a 429 response
+        timeout (float): Per-request timeout in seconds
+        metrics (RunMetrics): Receives latency, bytes and retries of the request
+        cache (ResponseCache): Cache to answer from and store the response in
+        cache_ttl (float): Seconds the response is served from the cache (None = the cache's default)
+        revalidate (bool): Ask the server even if the cached response is fresh
+        cache_only (bool): Only answer from the cache, never send a request
+
+    Returns:
+        requests.Response: Successful response, None if `cache_only` is
+            set and there is no fresh cached response
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or
+            the API keeps answering 429 after all retries
+    """
+    cached = cache.get(url, params) if cache is not None else None
+    if cached is not None and cached.fresh and not revalidate:
+        if metrics is not None:
+            metrics.count("http_cache_hits")
+        response = cached.to_response(url)
+        response.from_cache = True
+        return response
+    if cache_only:
+        return None
+    if cached is not None:
+        headers = dict(headers or {}, **cached.validators())
+
+    start = time.perf_counter()
+    latency = 0.0
+    retries = 0
+    response = None
+    try:
+        for attempt in range(max_retries + 1):
+            rate_limiter.acquire()
+            sent = time.perf_counter()
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+            latency += time.perf_counter() - sent
+            if response.status_code == 429 and attempt < max_retries:
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = 2 ** attempt
+                logger.warning(f"Rate limited by {url}, retrying in {delay:.1f}s")
+                rate_limiter.pause(delay)
+                retries += 1
+                continue
+            response.raise_for_status()
+            if metrics is not None:
+                metrics.record_request(url, response.status_code, latency,
+                                       time.perf_counter() - start - latency, len(response.content), retries)
+            if cache is not None:
+                if response.status_code == 304 and cached is not None:
+                    cache.refresh(cached, response, cache_ttl)
+                    if metrics is not None:
+                        metrics.count("http_cache_revalidated")
+                    return cached.to_response(url)
+                if response.status_code == 200:
+                    cache.put(url, params, response, cache_ttl)
+            return response
+    except requests.exceptions.RequestException as e:
+        if metrics is not None:
+            metrics.record_request(url, response.status_code if response is not None else None, latency,
+                                   time.perf_counter() - start - latency, 0, retries, error=str(e))
+        raise
+
+
+def stream_concurrently(func, tasks, max_workers=DEFAULT_MAX_WORKERS,
+                        buffer_size=DEFAULT_STREAM_BUFFER):
+    """
+    Drain the generators `func(*task)` on a bounded thread pool and
+    yield their items in task order
+
+    Each task gets a bounded buffer, so workers that run ahead of the
+    consumer block instead of piling results up in memory.
+
+    Args:
+        func (callable): Generator function to call for each task
+        tasks (list): Argument tuples, one per call
+        max_workers (int): Maximum number of generators running at once
+        buffer_size (int): Maximum number of items buffered per task
+
+    Yields:
+        Items from every task, task by task in the order of `tasks`
+    """
+    buffers = [queue.Queue(maxsize=buffer_size) for _ in tasks]
+    stopped = threading.Event()
+
+    def put(buffer, item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(index, task):
+        try:
+            for item in func(*task):
+                if not put(buffers[index], item):
+                    return
+        finally:
+            put(buffers[index], _STREAM_DONE)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(drain, index, task) for index, task in enumerate(tasks)]
+        try:
+            for buffer in buffers:
+                while True:
+                    item = buffer.get()
+                    if item is _STREAM_DONE:
+                        break
+                    yield item
+            for future in futures:
+                future.result()
+        finally:
+            stopped.set()
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Front-end payload export
+
+Splits the current result set into what index.html needs at first
+paint and what it can load later:
+
+- a compact listing index with only the fields the job cards and
+  filters use, plus a short description snippet
+- detail shards holding the full descriptions, loaded on demand
+- an inverted search index over the listing (see search_index.py)
+- optionally a change log of the listing, so returning visitors only
+  download what changed since their last visit (see change_log.py)
+- the listing, search index and change log once more per region, with
+  a manifest of the regions, so the website only downloads the regions
+  a visitor selects; the regions share the detail shards
+- on request, precompressed .gz (and .br, if the brotli module is
+  installed) variants of every file, for servers that serve them
+  directly; GitHub Pages compresses on the fly, so the nightly export
+  leaves them out
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+
+from change_log import ChangeLog
+from json_stream import AtomicJsonWriter, write_atomic
+from search_index import SearchIndexBuilder, encode_search_index
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Fields the job cards and filters read from the listing index
+LISTING_FIELDS = [
+    "id", "title", "employer", "location", "category", "relevance_score",
+    "is_meaningful", "published", "deadline", "url"
+]
+
+# Length of the description snippet shown on the cards
+SNIPPET_LENGTH = 200
+
+# Number of detail shards, fixed so a job never moves between shards
+DETAIL_SHARDS = 16
+
+# Suffixes of the precompressed variants of a payload file
+VARIANT_SUFFIXES = (".gz", ".br")
+
+# Files of a region payload, and the manifest listing the regions
+REGION_LISTING_FILE = "jobs_index.json"
+REGION_SEARCH_INDEX_FILE = "search_index.json"
+REGION_CHANGES_DIR = "changes"
+REGIONS_MANIFEST_FILE = "manifest.json"
+
+
+def detail_shard(job_id):
+    """
+    Pick the detail shard for a job id, stable across runs
+
+    Args:
+        job_id (str): Job id
+
+    Returns:
+        int: Shard number between 0 and DETAIL_SHARDS - 1
+    """
+    digest = hashlib.sha1(str(job_id).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % DETAIL_SHARDS
+
+
+def make_snippet(description, length=SNIPPET_LENGTH):
+    """
+    Shorten a description to a one-line snippet
+
+    Args:
+        description (str): Full description
+        length (int): Maximum snippet length
+
+    Returns:
+        str: Snippet, ending in an ellipsis if it was cut
+    """
+    text = re.sub(r"\s+", " ", description or "").strip()
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+def listing_record(job):
+    """
+    Build the listing index entry for a job
+
+    Args:
+        job (dict): Job in the standard format
+
+    Returns:
+        dict: Card and filter fields, the snippet and the detail shard
+    """
+    record = {field: job.get(field) for field in LISTING_FIELDS}
+    record["snippet"] = make_snippet(job.get("description"))
+    record["detail_shard"] = detail_shard(job.get("id"))
+    return record
+
+
+def remove_variants(path):
+    """
+    Remove the precompressed variants of a file, which would be stale without them being rewritten
+    """
+    for suffix in VARIANT_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def write_payload_file(path, data, precompress=False, metrics=None):
+    """
+    Atomically write a file, together with its precompressed variants if requested
+
+    Args:
+        path (str): Target path of the uncompressed file
+        data (bytes): File contents
+        precompress (bool): Also write the .gz and .br variants
+        metrics (RunMetrics): Receives the write time of the file and its variants
+    """
+    start = time.perf_counter()
+    write_atomic(path, data)
+    if precompress:
+        # mtime=0 keeps the gzip output identical for identical input
+        write_atomic(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write_atomic(path + ".br", brotli.compress(data))
+    else:
+        remove_variants(path)
+    if metrics is not None:
+        metrics.record_file(path, time.perf_counter() - start)
+
+
+class FrontendPayloadWriter:
+    """
+    Streams jobs into the listing index, the detail shards and the search index
+
+    Jobs are written as they are added. The search index is held in
+    memory, and so are the listing entries when there is a change log,
+    because the change log diffs the whole listing against the previous
+    version. Descriptions are never held. Nothing replaces the previous
+    payload until commit.
+
+    Args:
+        listing_path (str): Path of the listing index
+        details_dir (str): Directory for the detail shards (None = the
+            shards are written by another writer)
+        search_index_path (str): Path of the inverted search index
+        change_log_dir (str): Directory of the listing change log (None = no change log)
+        precompress (bool): Also write .gz and .br variants of the listing,
+            detail shards and search index
+    """
+
+    def __init__(self, listing_path, details_dir, search_index_path, change_log_dir=None, precompress=False):
+        self.details_dir = details_dir
+        self.search_index_path = search_index_path
+        self.precompress = precompress
+        self.count = 0
+        if details_dir is not None:
+            os.makedirs(details_dir, exist_ok=True)
+        self.listing = AtomicJsonWriter(listing_path, compact=True, precompress=precompress)
+        self.shards = {}
+        self.search_index = SearchIndexBuilder()
+        self.change_log = ChangeLog(change_log_dir) if change_log_dir else None
+        # Listing entries for the change log, which needs the whole listing
+        self.records = []
+
+    def add(self, job):
+        """
+        Add the next job
+
+        Args:
+            job (dict): Categorized job in the standard format
+        """
+        record = listing_record(job)
+        self.listing.write(record)
+        if self.change_log is not None:
+            self.records.append(record)
+
+        if self.details_dir is not None:
+            shard = self.shards.get(record["detail_shard"])
+            if shard is None:
+                path = os.path.join(self.details_dir, f"{record['detail_shard']:02d}.json")
+                shard = self.shards[record["detail_shard"]] = AtomicJsonWriter(
+                    path, container="object", compact=True, precompress=self.precompress
+                )
+            shard.write_member(job["id"], job.get("description") or "")
+
+        # Postings refer to positions in the listing, so index the same order
+        self.search_index.add(job)
+        self.count += 1
+
+    def commit(self, metrics=None):
+        """
+        Replace the previous payload with the jobs added
+
+        The detail shards go first, so the new listing never points at a
+        shard that does not have its jobs yet.
+
+        Args:
+            metrics (RunMetrics): Receives the write time of every file
+        """
+        written = set()
+        for shard in self.shards.values():
+            shard.commit()
+            filename = os.path.basename(shard.path)
+            written.add(filename)
+            if self.precompress:
+                written.update(filename + suffix for suffix in VARIANT_SUFFIXES)
+            if metrics is not None:
+                metrics.record_file(shard.path, shard.seconds, jobs=shard.items)
+
+        if self.details_dir is not None:
+            # Remove shards that have no jobs left, and variants that were not rewritten
+            for filename in os.listdir(self.details_dir):
+                if filename not in written:
+                    os.remove(os.path.join(self.details_dir, filename))
+            logger.info(f"Saved {len(self.shards)} detail shards to {self.details_dir}")
+
+        self.listing.commit()
+        if not self.precompress:
+            remove_variants(self.listing.path)
+        if metrics is not None:
+            metrics.record_file(self.listing.path, self.listing.seconds, jobs=self.listing.items)
+        logger.info(f"Saved listing index with {self.count} jobs to {self.listing.path} "
+                    f"({os.path.getsize(self.listing.path)} bytes)")
+
+        # The search index carries the change log version of its listing
+        listing_version = None
+        if self.change_log is not None:
+            listing_version = self.change_log.update(self.records, metrics)["version"]
+
+        index_data = encode_search_index(self.search_index.build(listing_version))
+        write_payload_file(self.search_index_path, index_data, self.precompress, metrics)
+        logger.info(f"Saved search index to {self.search_index_path} ({len(index_data)} bytes)")
+
+    def abort(self):
+        """
+        Discard everything written so far, keeping the previous payload
+        """
+        self.listing.abort()
+        for shard in self.shards.values():
+            shard.abort()
+
+
+class RegionPayloadWriter:
+    """
+    Splits the front-end payload by region
+
+    Every configured region gets its own listing index, search index and
+    change log in a directory named after its code. The manifest lists
+    the regions with their number of jobs and the regions shown first.
+    Jobs outside the configured regions are only in the full payload.
+
+    Args:
+        directory (str): Directory holding the region payloads and the manifest
+        regions (list): Region objects from the search configuration
+        default_regions (list): Codes of the regions the website shows first
+        precompress (bool): Also write .gz and .br variants of the region payloads
+    """
+
+    def __init__(self, directory, regions, default_regions, precompress=False):
+        self.directory = directory
+        self.regions = list(regions)
+        self.default_regions = list(default_regions)
+        self.writers = {}
+        try:
+            for region in self.regions:
+                region_dir = os.path.join(directory, region.code)
+                self.writers[region.code] = FrontendPayloadWriter(
+                    os.path.join(region_dir, REGION_LISTING_FILE), None,
+                    os.path.join(region_dir, REGION_SEARCH_INDEX_FILE),
+                    os.path.join(region_dir, REGION_CHANGES_DIR), precompress
+                )
+        except Exception:
+            self.abort()
+            raise
+
+    def add(self, job):
+        """
+        Add the next job to the payload of its region
+
+        Args:
+            job (dict): Categorized job in the standard format
+        """
+        writer = self.writers.get(job.get("region"))
+        if writer is not None:
+            writer.add(job)
+
+    def commit(self, metrics=None):
+        """
+        Replace the previous region payloads and the manifest
+
+        Args:
+            metrics (RunMetrics): Receives the write time of every file
+        """
+        for writer in self.writers.values():
+            writer.commit(metrics)
+
+        manifest = {
+            "regions": [
+                {"code": region.code, "name": region.name, "jobs": self.writers[region.code].count,
+                 "path": f"{region.code}/"}
+                for region in self.regions
+            ],
+            "default": self.default_regions
+        }
+        path = os.path.join(self.directory, REGIONS_MANIFEST_FILE)
+        start = time.perf_counter()
+        write_atomic(path, (json.dumps(manifest, ensure_ascii=False, indent=4) + "\n").encode("utf-8"))
+        if metrics is not None:
+            metrics.record_file(path, time.perf_counter() - start)
+
+        # Remove the payloads of regions that are no longer configured
+        for name in os.listdir(self.directory):
+            if name not in self.writers and os.path.isdir(os.path.join(self.directory, name)):
+                shutil.rmtree(os.path.join(self.directory, name))
+        logger.info(f"Saved payloads of {len(self.writers)} regions to {self.directory}")
+
+    def abort(self):
+        """
+        Discard everything written so far, keeping the previous payloads
+        """
+        for writer in self.writers.values():
+            writer.abort()
+
+
+def export_frontend_payload(jobs, listing_path, details_dir, search_index_path, metrics=None, precompress=False):
+    """
+    Write the listing index, the detail shards and the search index for the front end
+
+    Args:
+        jobs (iterable): Categorized jobs in the standard format, consumed once
+        listing_path (str): Path of the listing index
+        details_dir (str): Directory for the detail shards
+        search_index_path (str): Path of the inverted search index
+        metrics (RunMetrics): Receives the write time of every file
+        precompress (bool): Also write .gz and .br variants of every file
+
+    Returns:
+        int: Number of jobs exported
+    """
+    try:
+        payload = FrontendPayloadWriter(listing_path, details_dir, search_index_path, precompress=precompress)
+    except Exception as e:
+        logger.error(f"Error saving front-end payload: {e}")
+        return 0
+
+    try:
+        for job in jobs:
+            payload.add(job)
+        payload.commit(metrics)
+    except Exception as e:
+        payload.abort()
+        logger.error(f"Error saving front-end payload: {e}")
+
+    return payload.count
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of HTTP responses for the job scrapers
+
+Successful GET responses are kept in a SQLite file, keyed by the URL
+and the sorted query parameters, with zlib-compressed bodies. Request
+headers are not part of the key, so API keys never end up in it.
+
+An entry is served without a request until its time to live runs out.
+After that, a response that had an ETag or Last-Modified header is
+revalidated with If-None-Match / If-Modified-Since, and a 304 answer
+makes the stored body fresh again without downloading it. When the
+cache grows past its size limit, the least recently used entries are
+evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when the caller does not configure the cache
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+
+# Response headers kept with a cached body
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_used ON responses (used);
+"""
+
+
+def cache_key(url, params=None):
+    """
+    Key of a request: a hash of the URL and the sorted query parameters
+    """
+    request = json.dumps([url, sorted((str(key), str(value)) for key, value in (params or {}).items())],
+                         ensure_ascii=False)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """
+    A response read from the cache
+
+    Attributes:
+        key (str): Cache key of the request
+        headers (dict): Stored response headers
+        body (bytes): Uncompressed body
+        expires (float): Unix time after which the entry must be revalidated
+    """
+
+    __slots__ = ("key", "headers", "body", "expires")
+
+    def __init__(self, key, headers, body, expires):
+        self.key = key
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+    @property
+    def fresh(self):
+        """
+        Whether the entry can be used without asking the server
+        """
+        return time.time() < self.expires
+
+    def validators(self):
+        """
+        Conditional request headers that revalidate the entry (empty if it has no validators)
+        """
+        conditions = {}
+        if self.headers.get("ETag"):
+            conditions["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            conditions["If-Modified-Since"] = self.headers["Last-Modified"]
+        return conditions
+
+    def to_response(self, url):
+        """
+        Rebuild a requests.Response holding the cached body
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+
+class ResponseCache:
+    """
+    Thread-safe on-disk response cache shared by all fetch workers
+
+    Args:
+        path (str): SQLite file of the cache
+        ttl (float): Default seconds an entry is served without a request
+        max_bytes (int): Size limit of the compressed bodies
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, url, params=None):
+        """
+        Look up the cached response of a request, fresh or not
+
+        Returns:
+            CachedResponse: Cached response, None if there is none
+        """
+        key = cache_key(url, params)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT headers, body, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        headers, body, expires = row
+        try:
+            return CachedResponse(key, json.loads(headers), zlib.decompress(body), expires)
+        except (ValueError, zlib.error) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+
+    def put(self, url, params, response, ttl=None):
+        """
+        Store a successful response, then evict entries beyond the size limit
+
+        Responses marked Cache-Control: no-store are not stored.
+
+        Args:
+            url (str): Request URL
+            params (dict): Query parameters of the request
+            response (requests.Response): Response with status 200
+            ttl (float): Seconds to serve it without a request (None = the cache's default)
+        """
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            return
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        body = zlib.compress(response.content, COMPRESSION_LEVEL)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, headers, body, size, expires, used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(url, params), url, json.dumps(headers), body, len(body),
+                 now + (self.ttl if ttl is None else ttl), now)
+            )
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, cached, response, ttl=None):
+        """
+        Make an entry fresh again after the server answered 304 Not Modified
+
+        Args:
+            cached (CachedResponse): Entry that was revalidated
+            response (requests.Response): The 304 response, whose validators replace the stored ones
+            ttl (float): Seconds to serve it without a request (None = the cache's default)
+        """
+        for name in ("ETag", "Last-Modified"):
+            if response.headers.get(name):
+                cached.headers[name] = response.headers[name]
+        cached.expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self.conn.execute(
+                "UPDATE responses SET headers = ?, expires = ? WHERE key = ?",
+                (json.dumps(cached.headers), cached.expires, cached.key)
+            )
+            self.conn.commit()
+
+    def _evict(self):
+        """
+        Drop expired entries that cannot be revalidated, then the least recently used ones over the limit
+        """
+        self.conn.execute(
+            "DELETE FROM responses WHERE expires < ? "
+            "AND headers NOT LIKE '%\"ETag\"%' AND headers NOT LIKE '%\"Last-Modified\"%'",
+            (time.time(),)
+        )
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} responses from the HTTP cache")
+
+    def stats(self):
+        """
+        Number of entries and size of the compressed bodies in bytes
+        """
+        with self._lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size}
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Local JSON query API over the current result set
+
+Served by the scraper's `watch` command, which keeps the result set in
+memory and refreshes it from JobTech on an interval. Endpoints:
+
+- GET /jobs: filtered, sorted and paginated listing entries. Parameters:
+  category, region (two-digit region code), min_relevance (percent),
+  meaningful (1 = meaningful employers only), q (search terms, matched like the website search),
+  sort (relevance, published, deadline or title), order (asc or desc),
+  offset and limit
+- GET /jobs/<id>: one job with its full description
+- GET /status: size and version of the result set and the last update
+
+Every response carries an ETag derived from the version of the result
+set and the request, so a client repeating a request gets 304 Not
+Modified until the data changes.
+"""
+
+import hashlib
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from frontend_export import listing_record
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Page size of /jobs, and the largest page a client may ask for
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Sort keys of /jobs with the order used when none is given
+SORT_ORDERS = {
+    "relevance": "desc",
+    "published": "desc",
+    "deadline": "asc",
+    "title": "asc"
+}
+
+
+class QueryError(ValueError):
+    """
+    Invalid query parameter, answered with 400 Bad Request
+    """
+
+
+class JobIndex:
+    """
+    Immutable in-memory view of the result set, ready to be queried
+
+    A new index is built after every update and swapped in as a whole,
+    so requests never see a half-updated result set. Only `updated` is
+    moved forward when an update leaves the result set unchanged.
+
+    Building on the index of the previous update reuses the listing
+    entry, search terms and hash of every job that did not change, so an
+    update only tokenizes and hashes the jobs it touched.
+
+    Args:
+        jobs (iterable): Jobs in the standard format
+        updated (str): Time of the last update
+        previous (JobIndex): Index of the previous update, if any
+
+    Attributes:
+        changed (int): Number of jobs that were not in the previous index as they are now
+    """
+
+    def __init__(self, jobs, updated=None, previous=None):
+        self.jobs = list(jobs)
+        self.updated = updated
+        self.by_id = {str(job["id"]): job for job in self.jobs}
+        self.listings = []
+        self.texts = []
+        self._hashes = []
+        self.changed = 0
+        for job in self.jobs:
+            position = previous._positions.get(str(job["id"])) if previous is not None else None
+            if position is not None and previous.jobs[position] == job:
+                self.listings.append(previous.listings[position])
+                self.texts.append(previous.texts[position])
+                self._hashes.append(previous._hashes[position])
+                continue
+            self.changed += 1
+            self.listings.append(listing_record(job))
+            # Terms joined with spaces: " term" matches every term starting with it
+            self.texts.append(" " + " ".join(tokenize(" ".join(str(job.get(field) or "") for field in
+                                                               ("title", "employer", "location", "description")))))
+            self._hashes.append(hashlib.sha1(json.dumps(dict(job), sort_keys=True, ensure_ascii=False)
+                                             .encode("utf-8")).digest())
+        self._positions = {str(job["id"]): position for position, job in enumerate(self.jobs)}
+
+        self.version = hashlib.sha1(b"".join(self._hashes)).hexdigest()[:16]
+        self._orders = {}
+
+    def etag(self, path, params):
+        """
+        ETag of a request against this version of the result set
+        """
+        version = self.version if path != "/status" else f"{self.version} {self.updated}"
+        request = json.dumps([path, sorted(params.items())], ensure_ascii=False)
+        return '"' + hashlib.sha1(f"{version} {request}".encode("utf-8")).hexdigest()[:32] + '"'
+
+    def _order(self, sort, descending):
+        """
+        Positions of all jobs in the given order, computed once per index
+        """
+        key = (sort, descending)
+        if key not in self._orders:
+            if sort == "relevance":
+                value = lambda position: self.jobs[position].get("relevance_score") or 0
+            elif sort == "title":
+                value = lambda position: (self.jobs[position].get("title") or "").lower()
+            else:
+                value = lambda position: self.jobs[position].get(sort) or ""
+            # Jobs without a date go last in either direction
+            positions = range(len(self.jobs))
+            if sort in ("published", "deadline"):
+                dated = [position for position in positions if value(position)]
+                undated = [position for position in positions if not value(position)]
+                self._orders[key] = sorted(dated, key=value, reverse=descending) + undated
+            else:
+                self._orders[key] = sorted(positions, key=value, reverse=descending)
+        return self._orders[key]
+
+    def query(self, params):
+        """
+        Answer a /jobs query
+
+        Args:
+            params (dict): Query parameters, one value each
+
+        Returns:
+            dict: Total matches, offset, limit and the listing entries of the page
+
+        Raises:
+            QueryError: If a parameter is invalid
+        """
+        category = params.get("category")
+        region = params.get("region")
+        meaningful = params.get("meaningful") in ("1", "true", "yes")
+        sort = params.get("sort", "relevance")
+        if sort not in SORT_ORDERS:
+            raise QueryError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+        order = params.get("order", SORT_ORDERS[sort])
+        if order not in ("asc", "desc"):
+            raise QueryError("order must be asc or desc")
+        try:
+            min_relevance = int(params.get("min_relevance", 0))
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            raise QueryError("min_relevance, offset and limit must be integers")
+        if offset < 0 or not 0 < limit <= MAX_LIMIT:
+            raise QueryError(f"offset must not be negative and limit must be between 1 and {MAX_LIMIT}")
+        terms = [" " + term for term in tokenize(params.get("q", ""))]
+
+        matches = []
+        for position in self._order(sort, order == "desc"):
+            job = self.jobs[position]
+            if category and job.get("category") != category:
+                continue
+            if region and job.get("region") != region:
+                continue
+            if (job.get("relevance_score") or 0) < min_relevance:
+                continue
+            if meaningful and not job.get("is_meaningful"):
+                continue
+            if terms and not all(term in self.texts[position] for term in terms):
+                continue
+            matches.append(position)
+
+        return {
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+            "jobs": [self.listings[position] for position in matches[offset:offset + limit]]
+        }
+
+    def status(self):
+        """
+        Answer a /status request
+        """
+        return {"version": self.version, "updated": self.updated, "jobs": len(self.jobs)}
+
+
+def create_api_server(host, port, get_index):
+    """
+    Create the query API server
+
+    Args:
+        host (str): Interface to bind to
+        port (int): Port to bind to (0 picks a free port)
+        get_index (callable): Returns the current JobIndex
+
+    Returns:
+        ThreadingHTTPServer: Server ready for serve_forever()
+    """
+
+    class ApiHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            index = get_index()
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            path = url.path.rstrip("/")
+
+            etag = index.etag(path, params)
+            if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                return
+
+            try:
+                if path == "/jobs":
+                    payload = index.query(params)
+                elif path.startswith("/jobs/"):
+                    job = index.by_id.get(unquote(path[len("/jobs/"):]))
+                    if job is None:
+                        self._send_json(404, {"error": "No such job"})
+                        return
+                    payload = dict(job)
+                elif path == "/status":
+                    payload = index.status()
+                else:
+                    self._send_json(404, {"error": "Not found"})
+                    return
+            except QueryError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(200, payload, etag)
+
+        def _send_json(self, status, payload, etag=None):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if etag is not None:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), ApiHandler)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Compact job record
+
+Jobs used to be plain dicts with 11 to 17 keys each, and every JobTech
+or Indeed ad carried its own copies of strings like the employer,
+location and source. At archive scale the dict overhead and the
+duplicates dominate memory. A Job keeps its fields in __slots__ and
+interns the low-cardinality strings, so all jobs share one copy of
+"Göteborg" or "JobTech".
+
+Job is a mutable mapping with a fixed set of keys, so code written for
+the dict format keeps working. A field that was never set is missing,
+just like an absent dict key. The lowercase text the keyword matcher
+scans is computed on first use and kept until a text field changes,
+and to_json caches the encoded record until any field changes.
+"""
+
+import json
+import sys
+from collections.abc import MutableMapping
+
+# Fields of a job, in export order
+JOB_RECORD_FIELDS = (
+    "id", "title", "employer", "location", "region", "description", "url", "published",
+    "deadline", "is_consultant", "is_meaningful", "source", "category", "relevance_score",
+    "content_hash", "sources", "first_seen", "last_seen"
+)
+
+# Low-cardinality fields whose values are interned
+INTERNED_FIELDS = frozenset(["employer", "location", "region", "source", "category"])
+
+# Fields the keyword matcher scans, in the order lowercase() returns them
+TEXT_FIELDS = ("title", "description", "employer")
+
+_FIELD_SET = frozenset(JOB_RECORD_FIELDS)
+
+
+class Job(MutableMapping):
+    """
+    One job in the standard format
+
+    Takes the same arguments as dict: a mapping or key/value pairs, and
+    keyword arguments.
+
+    Raises:
+        KeyError: When a key is not one of JOB_RECORD_FIELDS
+    """
+
+    __slots__ = JOB_RECORD_FIELDS + ("_lowercase", "_json")
+
+    def __init__(self, fields=(), **extra):
+        self._lowercase = None
+        self._json = None
+        for key, value in dict(fields, **extra).items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        # Skips the KeyError round trip of Mapping.get, this is called a lot
+        return getattr(self, key, default) if key in _FIELD_SET else default
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(f"Job has no field {key!r}")
+        if key in INTERNED_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, key, value)
+        self._json = None
+        if key in TEXT_FIELDS:
+            self._lowercase = None
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        delattr(self, key)
+        self._json = None
+        self._lowercase = None
+
+    def __contains__(self, key):
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def __iter__(self):
+        return (field for field in JOB_RECORD_FIELDS if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for field in JOB_RECORD_FIELDS if hasattr(self, field))
+
+    def __repr__(self):
+        return f"Job({self.to_dict()!r})"
+
+    def __getstate__(self):
+        # The caches are cheaper to recompute than to send to another process
+        return tuple(getattr(self, field, _MISSING) for field in JOB_RECORD_FIELDS)
+
+    def __setstate__(self, state):
+        self._lowercase = None
+        self._json = None
+        for field, value in zip(JOB_RECORD_FIELDS, state):
+            if value is not _MISSING:
+                setattr(self, field, value)
+
+    def lowercase(self):
+        """
+        Title, description and employer in lowercase, computed once
+
+        Returns:
+            tuple: Three strings, empty for fields that are not set
+        """
+        if self._lowercase is None:
+            lowered = []
+            for field in TEXT_FIELDS:
+                # Same text as match_job scans for a dict in the processed format
+                text = str(getattr(self, field, ""))
+                lower = text.lower()
+                # Share the string when it already is lowercase
+                lowered.append(text if lower == text else lower)
+            self._lowercase = tuple(lowered)
+        return self._lowercase
+
+    def to_dict(self):
+        """
+        Copy the fields that are set into a dict, in export order
+        """
+        return {field: getattr(self, field) for field in JOB_RECORD_FIELDS if hasattr(self, field)}
+
+    def to_json(self):
+        """
+        Compact JSON encoding of the job, cached until a field changes
+
+        Returns:
+            str: Same text as json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        """
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        return self._json
+
+
+class _Missing:
+    """
+    Marks unset fields in pickled jobs; pickles as the module-level singleton
+    """
+
+    def __reduce__(self):
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+def normalize_job(source, job_id, title, employer, location, description, url, published, deadline, region=None):
+    """
+    Build the standard job record for an ad from any source
+
+    The classification fields are filled in later by categorize_job.
+
+    Args:
+        source (str): Source name, e.g. "JobTech" or "Indeed"
+        job_id: Id of the ad at the source, stored as a string
+        title (str): Job title
+        employer (str): Employer name
+        location (str): Municipality
+        description (str): Full description
+        url (str): Application URL
+        published (str): Publication date
+        deadline (str): Application deadline
+        region (str): Two-digit code of the region (län) of the location
+
+    Returns:
+        Job: The job, with its repeated strings interned
+    """
+    return Job(
+        id=str(job_id) if job_id is not None else None,
+        title=title,
+        employer=employer,
+        location=location,
+        region=region,
+        description=description,
+        url=url,
+        published=published,
+        deadline=deadline,
+        source=source
+    )
@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite job store
+
+Keeps every job the scraper has seen, keyed by id, with first-seen and
+last-seen timestamps, its classification and whether it is part of the
+current result set. An FTS5 index over title, description and employer
+supports ad-hoc search over the full history.
+
+Active jobs are also indexed by the end of their application deadline,
+so the ones that expired since the last run are found without scanning
+the result set.
+"""
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+
+try:
+    from zoneinfo import ZoneInfo
+    DEADLINE_TIMEZONE = ZoneInfo("Europe/Stockholm")
+except (ImportError, KeyError):
+    # Without time zone data, deadlines are compared in local time
+    DEADLINE_TIMEZONE = None
+
+from job_record import Job
+
+logger = logging.getLogger(__name__)
+
+# Number of jobs written per executemany call
+UPSERT_BATCH_SIZE = 500
+
+# Job fields stored as columns, in export order
+JOB_FIELDS = [
+    "id", "title", "employer", "location", "region", "description", "url", "published",
+    "deadline", "is_consultant", "is_meaningful", "source", "category", "relevance_score"
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    employer TEXT,
+    location TEXT,
+    description TEXT,
+    url TEXT,
+    published TEXT,
+    deadline TEXT,
+    is_consultant INTEGER NOT NULL DEFAULT 0,
+    is_meaningful INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    category TEXT,
+    relevance_score INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    content_hash TEXT,
+    minhash BLOB,
+    duplicate_of TEXT,
+    sources TEXT,
+    expires TEXT,
+    region TEXT
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_category_score ON jobs (category, relevance_score);
+CREATE INDEX IF NOT EXISTS idx_jobs_relevance_score ON jobs (relevance_score);
+CREATE INDEX IF NOT EXISTS idx_jobs_last_seen ON jobs (last_seen);
+CREATE INDEX IF NOT EXISTS idx_jobs_active ON jobs (active, category);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (active, expires);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5 (
+    title, description, employer,
+    content='jobs', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs BEGIN
+    INSERT INTO jobs_fts (rowid, title, description, employer)
+    VALUES (new.rowid, new.title, new.description, new.employer);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, title, description, employer)
+    VALUES ('delete', old.rowid, old.title, old.description, old.employer);
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE OF title, description, employer ON jobs BEGIN
+    INSERT INTO jobs_fts (jobs_fts, rowid, title, description, employer)
+    VALUES ('delete', old.rowid, old.title, old.description, old.employer);
+    INSERT INTO jobs_fts (rowid, title, description, employer)
+    VALUES (new.rowid, new.title, new.description, new.employer);
+END;
+"""
+
+UPSERT_SQL = """
+INSERT INTO jobs (
+    id, title, employer, location, region, description, url, published, deadline,
+    is_consultant, is_meaningful, source, category, relevance_score,
+    first_seen, last_seen, active, content_hash, expires
+) VALUES (
+    :id, :title, :employer, :location, :region, :description, :url, :published, :deadline,
+    :is_consultant, :is_meaningful, :source, :category, :relevance_score,
+    :seen_at, :seen_at, 1, :content_hash, :expires
+)
+ON CONFLICT (id) DO UPDATE SET
+    title = excluded.title,
+    employer = excluded.employer,
+    location = excluded.location,
+    region = excluded.region,
+    description = excluded.description,
+    url = excluded.url,
+    published = excluded.published,
+    deadline = excluded.deadline,
+    expires = excluded.expires,
+    is_consultant = excluded.is_consultant,
+    is_meaningful = excluded.is_meaningful,
+    source = excluded.source,
+    category = excluded.category,
+    relevance_score = excluded.relevance_score,
+    last_seen = excluded.last_seen,
+    active = 1,
+    minhash = CASE WHEN jobs.content_hash IS excluded.content_hash THEN jobs.minhash END,
+    content_hash = excluded.content_hash
+"""
+
+# Archived jobs never replace stored ones and are not part of the current result set
+ARCHIVE_SQL = """
+INSERT INTO jobs (
+    id, title, employer, location, region, description, url, published, deadline,
+    is_consultant, is_meaningful, source, category, relevance_score,
+    first_seen, last_seen, active, content_hash, expires
+) VALUES (
+    :id, :title, :employer, :location, :region, :description, :url, :published, :deadline,
+    :is_consultant, :is_meaningful, :source, :category, :relevance_score,
+    :seen_at, :seen_at, 0, :content_hash, :expires
+)
+ON CONFLICT (id) DO NOTHING
+"""
+
+SET_META_SQL = """
+INSERT INTO store_meta (key, value) VALUES (?, ?)
+ON CONFLICT (key) DO UPDATE SET value = excluded.value
+"""
+
+UPDATE_CLASSIFICATION_SQL = """
+UPDATE jobs SET
+    is_consultant = :is_consultant,
+    is_meaningful = :is_meaningful,
+    category = :category,
+    relevance_score = :relevance_score,
+    content_hash = :content_hash
+WHERE id = :id
+"""
+
+# Columns written by classification, as stored on a job dict
+CLASSIFICATION_FIELDS = ["is_consultant", "is_meaningful", "category", "relevance_score", "content_hash"]
+
+# Columns added after the first release, with their types
+MIGRATED_COLUMNS = {
+    "content_hash": "TEXT",
+    "minhash": "BLOB",
+    "duplicate_of": "TEXT",
+    "sources": "TEXT",
+    "expires": "TEXT",
+    "region": "TEXT"
+}
+
+# Format of expiry times: local time in DEADLINE_TIMEZONE, which sorts as text
+EXPIRY_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def expiry_time(deadline):
+    """
+    Turn an application deadline into the time the ad expires
+
+    JobTech deadlines are local Swedish times. A deadline without a time
+    lasts until the end of its day.
+
+    Args:
+        deadline (str): Deadline as an ISO 8601 date or date and time
+
+    Returns:
+        str: Expiry time in EXPIRY_FORMAT, None if the ad has no valid deadline
+    """
+    if not deadline or not isinstance(deadline, str):
+        return None
+    deadline = deadline.strip()
+    try:
+        parsed = datetime.fromisoformat(deadline)
+    except ValueError:
+        return None
+    if len(deadline) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(DEADLINE_TIMEZONE).replace(tzinfo=None)
+    return parsed.strftime(EXPIRY_FORMAT)
+
+
+def current_expiry_time():
+    """
+    The current time in the format of expiry_time
+    """
+    return datetime.now(DEADLINE_TIMEZONE).strftime(EXPIRY_FORMAT)
+
+
+def _row_to_job(row):
+    """
+    Convert a jobs row into the standard job format
+    """
+    job = Job((field, row[field]) for field in JOB_FIELDS)
+    job["is_consultant"] = bool(job["is_consultant"])
+    job["is_meaningful"] = bool(job["is_meaningful"])
+    if row["sources"]:
+        job["sources"] = json.loads(row["sources"])
+    return job
+
+
+class JobStore:
+    """
+    SQLite-backed store of all jobs seen by the scraper
+
+    Args:
+        path (str): Database file, created if it does not exist
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        """
+        Add columns introduced after a database was created
+        """
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if not columns:
+            return
+        for column, column_type in MIGRATED_COLUMNS.items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        if "expires" not in columns:
+            rows = self.conn.execute("SELECT rowid, deadline FROM jobs WHERE deadline IS NOT NULL").fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET expires = ? WHERE rowid = ?",
+                ((expiry_time(row["deadline"]), row["rowid"]) for row in rows)
+            )
+        self.conn.commit()
+
+    def get_meta(self, key):
+        """
+        Read a value from the store metadata, None if it is not set
+        """
+        row = self.conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key, value):
+        """
+        Write a value to the store metadata
+        """
+        with self.conn:
+            self.conn.execute(SET_META_SQL, (key, value))
+
+    def close(self):
+        """
+        Close the database connection
+        """
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def upsert_jobs(self, jobs, seen_at):
+        """
+        Insert or update jobs by id and mark them as active
+
+        Args:
+            jobs (iterable): Classified jobs, consumed in batches
+            seen_at (str): Timestamp of the current run
+
+        Returns:
+            int: Number of jobs written
+        """
+        count = 0
+        batch = []
+        with self.conn:
+            for job in jobs:
+                row = {field: job.get(field) for field in JOB_FIELDS}
+                row["is_consultant"] = int(bool(row["is_consultant"]))
+                row["is_meaningful"] = int(bool(row["is_meaningful"]))
+                row["seen_at"] = seen_at
+                row["content_hash"] = job.get("content_hash")
+                row["expires"] = expiry_time(row["deadline"])
+                batch.append(row)
+                if len(batch) >= UPSERT_BATCH_SIZE:
+                    self.conn.executemany(UPSERT_SQL, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.conn.executemany(UPSERT_SQL, batch)
+                count += len(batch)
+        return count
+
+    def archive_jobs(self, jobs, seen_at, meta=None):
+        """
+        Insert historical jobs that are not stored yet, as inactive
+
+        Args:
+            jobs (iterable): Classified jobs
+            seen_at (str): Timestamp of the current run
+            meta (dict): Store metadata to write in the same transaction,
+                e.g. a resume checkpoint
+
+        Returns:
+            int: Number of jobs inserted
+        """
+        count = 0
+        batch = []
+        with self.conn:
+            for job in jobs:
+                row = {field: job.get(field) for field in JOB_FIELDS}
+                row["is_consultant"] = int(bool(row["is_consultant"]))
+                row["is_meaningful"] = int(bool(row["is_meaningful"]))
+                row["seen_at"] = seen_at
+                row["content_hash"] = job.get("content_hash")
+                row["expires"] = expiry_time(row["deadline"])
+                batch.append(row)
+                if len(batch) >= UPSERT_BATCH_SIZE:
+                    count += self.conn.executemany(ARCHIVE_SQL, batch).rowcount
+                    batch = []
+            if batch:
+                count += self.conn.executemany(ARCHIVE_SQL, batch).rowcount
+            for key, value in (meta or {}).items():
+                self.conn.execute(SET_META_SQL, (key, value))
+        return count
+
+    def deactivate_unseen(self, seen_at, keep_regions=()):
+        """
+        Remove the jobs not seen by the current run from the current result set
+
+        Jobs without a region may belong to any region, so they stay as
+        soon as any region is kept.
+
+        Args:
+            seen_at (str): Timestamp of the current run
+            keep_regions (iterable): Codes of regions whose jobs stay, e.g.
+                because one of their searches failed
+
+        Returns:
+            int: Number of jobs deactivated
+        """
+        keep_regions = list(keep_regions)
+        sql = "UPDATE jobs SET active = 0 WHERE active = 1 AND last_seen < ?"
+        if keep_regions:
+            sql += f" AND region IS NOT NULL AND region NOT IN ({', '.join('?' * len(keep_regions))})"
+        with self.conn:
+            cursor = self.conn.execute(sql, [seen_at] + keep_regions)
+        return cursor.rowcount
+
+    def assign_regions(self, region_of):
+        """
+        Fill in the region of active jobs stored before jobs had one
+
+        Args:
+            region_of (callable): Returns the region code of a location
+                name, None if it is not known
+
+        Returns:
+            int: Number of jobs updated
+        """
+        locations = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT location FROM jobs WHERE active = 1 AND region IS NULL"
+        )]
+        updates = [(region_of(location), location) for location in locations]
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE jobs SET region = ? WHERE active = 1 AND region IS NULL AND location = ?",
+                [(region, location) for region, location in updates if region]
+            )
+        return max(cursor.rowcount, 0)
+
+    def expire_jobs(self, now=None):
+        """
+        Remove the jobs whose application deadline has passed from the current result set
+
+        The expiry index sorts the active jobs by expiry time, so this
+        reads just the k expired entries: O(k log n).
+
+        Args:
+            now (str): Current time in EXPIRY_FORMAT (None = now)
+
+        Returns:
+            list: Ids of the expired jobs
+        """
+        now = now or current_expiry_time()
+        with self.conn:
+            expired = [
+                row["id"] for row in self.conn.execute(
+                    "SELECT id FROM jobs WHERE active = 1 AND expires < ?", (now,)
+                )
+            ]
+            self.conn.executemany("UPDATE jobs SET active = 0 WHERE id = ?", ((job_id,) for job_id in expired))
+        return expired
+
+    def deactivate_jobs(self, job_ids):
+        """
+        Remove jobs from the current result set, keeping their history
+
+        Args:
+            job_ids (iterable): Ids of the jobs to deactivate
+
+        Returns:
+            int: Number of jobs that were active
+        """
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE jobs SET active = 0 WHERE id = ? AND active = 1",
+                ((job_id,) for job_id in job_ids)
+            )
+        return cursor.rowcount
+
+    def get_classification(self, job_id):
+        """
+        Look up the stored classification of a job
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            dict: Values of CLASSIFICATION_FIELDS, or None if the job is unknown
+        """
+        row = self.conn.execute(
+            "SELECT is_consultant, is_meaningful, category, relevance_score, content_hash "
+            "FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        classification = {field: row[field] for field in CLASSIFICATION_FIELDS}
+        classification["is_consultant"] = bool(classification["is_consultant"])
+        classification["is_meaningful"] = bool(classification["is_meaningful"])
+        return classification
+
+    def iter_all_jobs(self, batch_size=UPSERT_BATCH_SIZE):
+        """
+        Iterate over every stored job, active or not
+
+        Rows are read in batches by rowid, so the caller may update the
+        jobs it has already received while iterating.
+
+        Yields:
+            dict: Jobs in the standard format
+        """
+        last_rowid = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT rowid, * FROM jobs WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _row_to_job(row)
+            last_rowid = rows[-1]["rowid"]
+
+    def update_classifications(self, jobs):
+        """
+        Write new classifications for stored jobs
+
+        Args:
+            jobs (iterable): Jobs with CLASSIFICATION_FIELDS set
+
+        Returns:
+            int: Number of jobs updated
+        """
+        count = 0
+        batch = []
+        with self.conn:
+            for job in jobs:
+                row = {field: job.get(field) for field in CLASSIFICATION_FIELDS}
+                row["is_consultant"] = int(bool(row["is_consultant"]))
+                row["is_meaningful"] = int(bool(row["is_meaningful"]))
+                row["id"] = job["id"]
+                batch.append(row)
+                if len(batch) >= UPSERT_BATCH_SIZE:
+                    self.conn.executemany(UPDATE_CLASSIFICATION_SQL, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.conn.executemany(UPDATE_CLASSIFICATION_SQL, batch)
+                count += len(batch)
+        return count
+
+    def count_active_jobs(self):
+        """
+        Count the jobs in the current result set
+        """
+        return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE active = 1").fetchone()[0]
+
+    def stats(self):
+        """
+        Summarize the stored jobs
+
+        Returns:
+            dict: Number of stored jobs, jobs in the current result set,
+                exported jobs per category and per region and near-duplicates left out
+        """
+        row = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(active), 0), COALESCE(SUM(active = 1 AND duplicate_of IS NOT NULL), 0) "
+            "FROM jobs"
+        ).fetchone()
+        categories = self.conn.execute(
+            "SELECT category, COUNT(*) FROM jobs "
+            "WHERE active = 1 AND category IS NOT NULL AND duplicate_of IS NULL "
+            "GROUP BY category ORDER BY category"
+        ).fetchall()
+        regions = self.conn.execute(
+            "SELECT region, COUNT(*) FROM jobs "
+            "WHERE active = 1 AND category IS NOT NULL AND duplicate_of IS NULL "
+            "GROUP BY region ORDER BY region"
+        ).fetchall()
+        return {
+            "stored": row[0],
+            "active": row[1],
+            "duplicates": row[2],
+            "exported": {category: count for category, count in categories},
+            "exported_by_region": {region or "unknown": count for region, count in regions}
+        }
+
+    def iter_active_jobs(self, category=None):
+        """
+        Iterate over the categorized jobs in the current result set
+
+        Near-duplicates merged into another job are left out; the job
+        they were merged into lists them in its "sources".
+
+        Args:
+            category (str): Only return jobs of this category (None = all)
+
+        Yields:
+            dict: Jobs in the standard format, in the order first stored
+        """
+        sql = "SELECT * FROM jobs WHERE active = 1 AND category IS NOT NULL AND duplicate_of IS NULL"
+        params = []
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        sql += " ORDER BY rowid"
+        for row in self.conn.execute(sql, params):
+            yield _row_to_job(row)
+
+    def iter_dedup_candidates(self):
+        """
+        Iterate over the categorized jobs in the current result set with
+        their MinHash signature, which is None until it has been computed
+
+        Yields:
+            sqlite3.Row: id, title, employer, description, url, source,
+                published, relevance_score and minhash of each job
+        """
+        yield from self.conn.execute(
+            "SELECT id, title, employer, description, url, source, published, relevance_score, minhash "
+            "FROM jobs WHERE active = 1 AND category IS NOT NULL ORDER BY rowid"
+        )
+
+    def update_signatures(self, signatures):
+        """
+        Store MinHash signatures
+
+        Args:
+            signatures (iterable): (job id, signature) pairs
+        """
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET minhash = ? WHERE id = ?",
+                ((signature, job_id) for job_id, signature in signatures)
+            )
+
+    def set_duplicates(self, clusters):
+        """
+        Record the near-duplicate clusters of the current result set,
+        replacing the previous ones
+
+        Args:
+            clusters (list): (kept job id, merged job ids, sources) for
+                every cluster; sources is the list stored with the kept job
+
+        Returns:
+            int: Number of jobs merged into another job
+        """
+        merged = 0
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET duplicate_of = NULL, sources = NULL "
+                "WHERE duplicate_of IS NOT NULL OR sources IS NOT NULL"
+            )
+            for kept_id, merged_ids, sources in clusters:
+                self.conn.execute(
+                    "UPDATE jobs SET sources = ? WHERE id = ?",
+                    (json.dumps(sources, ensure_ascii=False), kept_id)
+                )
+                self.conn.executemany(
+                    "UPDATE jobs SET duplicate_of = ? WHERE id = ?",
+                    ((kept_id, job_id) for job_id in merged_ids)
+                )
+                merged += len(merged_ids)
+        return merged
+
+    def search(self, query, category=None, seen_since=None, limit=50):
+        """
+        Full-text search over all stored jobs, best matches first
+
+        Args:
+            query (str): FTS5 query, e.g. 'python AND göteborg'
+            category (str): Only return jobs of this category
+            seen_since (str): Only return jobs last seen at or after this timestamp
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Matching jobs with their first_seen and last_seen timestamps
+        """
+        sql = (
+            "SELECT jobs.* FROM jobs_fts JOIN jobs ON jobs.rowid = jobs_fts.rowid "
+            "WHERE jobs_fts MATCH ?"
+        )
+        params = [query]
+        if category is not None:
+            sql += " AND jobs.category = ?"
+            params.append(category)
+        if seen_since is not None:
+            sql += " AND jobs.last_seen >= ?"
+            params.append(seen_since)
+        sql += " ORDER BY bm25(jobs_fts) LIMIT ?"
+        params.append(limit)
+
+        results = []
+        for row in self.conn.execute(sql, params):
+            job = _row_to_job(row)
+            job["first_seen"] = row["first_seen"]
+            job["last_seen"] = row["last_seen"]
+            results.append(job)
+        return results
@@ -3,131 +3,113 @@
 Enhanced JobTech Job Scraper for Swedish Jobs
 
 This script uses the JobTech API (Arbetsförmedlingen) to search for IT, AI, and RPA jobs
-in Gothenburg and Kungsbacka, with advanced contextual filtering to ensure relevance.
-It excludes consultant positions and highlights meaningful employers.
+in the regions configured in search_config.json, with advanced contextual filtering to
+ensure relevance. It excludes consultant positions and highlights meaningful employers.
 """
 
-import requests
+import argparse
+import hashlib
 import json
 import os
+import threading
 import time
-import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+
+from frontend_export import FrontendPayloadWriter, RegionPayloadWriter
+from job_record import Job, normalize_job
+from job_store import JobStore
+from json_stream import AtomicJsonWriter, JsonFanOut
+from keyword_matcher import load_matcher, rules_fingerprint
+from near_duplicates import find_clusters, minhash_signature
+from query_planner import naive_request_count, plan_requests
+from run_metrics import RunMetrics
+from search_config import load_search_config
+
+# requests, the fetch engine and the batch scorer (NumPy and SciPy) are
+# imported by the functions that need them, so commands that only work
+# on the job store start quickly
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("job_scraper.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# Log file of the commands that fetch from the APIs
+LOG_FILE = "job_scraper.log"
+
 # Configuration
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_DIR = os.environ.get("JOBSCRAPER_BASE_DIR") or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 IT_JOBS_OUTPUT = os.path.join(BASE_DIR, "it_jobs.json")
 AI_JOBS_OUTPUT = os.path.join(BASE_DIR, "ai_jobs.json")
 RPA_JOBS_OUTPUT = os.path.join(BASE_DIR, "rpa_jobs.json")
 ALL_JOBS_OUTPUT = os.path.join(BASE_DIR, "all_jobs.json")
 LAST_UPDATED_FILE = os.path.join(BASE_DIR, "last_updated.txt")
 LAST_RAPIDAPI_FILE = os.path.join(BASE_DIR, "last_rapidapi.txt")
+SYNC_STATE_FILE = os.path.join(BASE_DIR, "sync_state.json")
+JOB_STORE_FILE = os.path.join(BASE_DIR, "jobs.db")
+RUN_METRICS_FILE = os.path.join(BASE_DIR, "run_metrics.json")
+RULES_CACHE_DIR = os.environ.get("JOBSCRAPER_CACHE_DIR") or os.path.join(BASE_DIR, ".cache")
+HTTP_CACHE_FILE = os.path.join(RULES_CACHE_DIR, "http.db")
+
+# Split front-end payload read by index.html
+DATA_DIR = os.path.join(BASE_DIR, "data")
+LISTING_INDEX_OUTPUT = os.path.join(DATA_DIR, "jobs_index.json")
+DETAILS_DIR = os.path.join(DATA_DIR, "details")
+SEARCH_INDEX_OUTPUT = os.path.join(DATA_DIR, "search_index.json")
+CHANGES_DIR = os.path.join(DATA_DIR, "changes")
+# Listing, search index and change log per region, and the manifest listing the regions
+REGIONS_DIR = os.path.join(DATA_DIR, "regions")
+
+# Format of run timestamps in the sync state and the job store (UTC)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
 # JobTech API configuration
-JOBTECH_API_URL = "https://jobsearch.api.jobtechdev.se/search"
+JOBTECH_API_URL = os.environ.get("JOBTECH_API_URL", "https://jobsearch.api.jobtechdev.se/search")
+JOBTECH_STREAM_URL = os.environ.get("JOBTECH_STREAM_URL", "https://jobstream.api.jobtechdev.se/stream")
+SYNC_OVERLAP = timedelta(minutes=5)  # Re-request a little before the checkpoint to avoid gaps
+JOBTECH_PAGE_SIZE = 100  # Largest page the search API returns
+JOBTECH_MAX_OFFSET = 2000  # Largest offset the search API accepts
+
+# Optional cap on the number of jobs fetched per query (None = no cap)
+MAX_RESULTS_PER_QUERY = int(os.environ["JOBSCRAPER_MAX_RESULTS_PER_QUERY"]) if os.environ.get("JOBSCRAPER_MAX_RESULTS_PER_QUERY") else None
+
+# Fetch engine configuration
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("JOBSCRAPER_MAX_CONCURRENCY", "4"))
+REQUESTS_PER_SECOND = float(os.environ.get("JOBSCRAPER_REQUESTS_PER_SECOND", "5"))
+# Retries of failed JobTech requests allowed per region and run
+REGION_MAX_RETRIES = int(os.environ.get("JOBSCRAPER_REGION_RETRIES", "3"))
+
+# HTTP response cache: seconds a JobTech search is answered from the cache (0 = JobTech
+# searches are not cached; Indeed searches always are), and the size limit of the cache in MiB
+HTTP_CACHE_TTL = float(os.environ.get("JOBSCRAPER_HTTP_CACHE_TTL", "3600"))
+HTTP_CACHE_MAX_MB = int(os.environ.get("JOBSCRAPER_HTTP_CACHE_MB", "256"))
 
 # RapidAPI configuration for Indeed Jobs API Sweden
 RAPIDAPI_KEY = "YOUR_RAPIDAPI_KEY"  # Replace with actual key if available
 RAPIDAPI_HOST = "indeed-jobs-api-sweden.p.rapidapi.com"
 RAPIDAPI_URL = "https://indeed-jobs-api-sweden.p.rapidapi.com/indeed-se"
+# Indeed searches are repeated at most once per week to conserve the API quota
+INDEED_CACHE_TTL = 7 * 24 * 3600
+
+# Search configuration: regions, search terms and category rules (see search_config.py)
+SEARCH_CONFIG_FILE = os.environ.get("JOBSCRAPER_CONFIG") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "search_config.json"
+)
+SEARCH_CONFIG = load_search_config(SEARCH_CONFIG_FILE)
 
-# Search parameters
-LOCATIONS = ["Göteborg", "Kungsbacka"]
+# Regions to search, and the names and codes of their locations
+REGIONS = SEARCH_CONFIG.regions
+LOCATIONS = SEARCH_CONFIG.locations
+MUNICIPALITY_CODES = SEARCH_CONFIG.municipality_codes
+
+# Search terms per category, OR-combined into one free-text search
+SEARCH_QUERIES = SEARCH_CONFIG.search_queries
+
+# JobTech occupation fields searched as a whole per category
+OCCUPATION_FIELDS = SEARCH_CONFIG.occupation_fields
 
 # Job categories with primary and secondary keywords for contextual matching
-JOB_CATEGORIES = {
-    "IT": {
-        "primary_keywords": [
-            "systemutvecklare", "programmerare", "mjukvaruutvecklare", "software developer",
-            "backend developer", "frontend developer", "fullstack developer", "devops engineer",
-            "system architect", "IT-arkitekt", "IT-tekniker", "system administrator",
-            "nätverkstekniker", "network engineer", "database administrator", "databasutvecklare"
-        ],
-        "secondary_keywords": [
-            "java", "python", "c#", ".net", "javascript", "typescript", "react", "angular",
-            "vue", "node.js", "php", "ruby", "go", "rust", "kotlin", "swift", "sql", "nosql",
-            "mongodb", "postgresql", "mysql", "oracle", "aws", "azure", "gcp", "docker",
-            "kubernetes", "linux", "windows server", "cisco", "juniper", "api", "rest",
-            "microservices", "agile", "scrum", "kanban", "git", "ci/cd", "jenkins", "gitlab"
-        ],
-        "exclusion_keywords": [
-            "konsult", "consultant", "bemanning", "rekrytering", "inhyrd", "postdoc",
-            "doktorand", "phd student", "forskare", "professor", "lektor",
-            "DevSecOps", "DevOps", "fullstack", "frontend", "backend"
-        ],
-        "title_patterns": [
-            r"utvecklare", r"developer", r"programmer", r"engineer", r"arkitekt", r"architect",
-            r"tekniker", r"specialist", r"expert", r"lead", r"chef", r"manager", r"admin",
-            r"administrator", r"system",
-            r"network", r"database", r"data", r"security", r"säkerhet", r"support"
-        ]
-    },
-    "AI": {
-        "primary_keywords": [
-            "AI", "artificial intelligence", "artificiell intelligens", "machine learning",
-            "maskininlärning", "deep learning", "djupinlärning", "neural networks",
-            "neurala nätverk", "data scientist", "data science", "datavetenskap",
-            "NLP", "natural language processing", "computer vision", "datorseende",
-            "predictive analytics", "prediktiv analys", "big data", "stordata",
-            "data mining", "datautvinning", "AI engineer", "ML engineer"
-        ],
-        "secondary_keywords": [
-            "tensorflow", "pytorch", "keras", "scikit-learn", "pandas", "numpy",
-            "jupyter", "python", "r", "hadoop", "spark", "databricks", "kubeflow",
-            "mlops", "reinforcement learning", "förstärkningsinlärning", "supervised learning",
-            "unsupervised learning", "clustering", "classification", "regression",
-            "recommendation systems", "rekommendationssystem", "anomaly detection",
-            "anomalidetektering", "feature engineering", "model training", "model deployment",
-            "model monitoring", "data preprocessing", "data visualization", "datavisualisering"
-        ],
-        "exclusion_keywords": [
-            "konsult", "consultant", "bemanning", "rekrytering", "inhyrd", "postdoc",
-            "doktorand", "phd student", "forskare", "professor", "lektor", "assistant professor"
-        ],
-        "title_patterns": [
-            r"AI", r"ML", r"machine learning", r"deep learning", r"data scientist",
-            r"data science", r"analytics", r"analys", r"data engineer", r"NLP",
-            r"computer vision", r"neural", r"intelligence", r"intelligens"
-        ]
-    },
-    "RPA": {
-        "primary_keywords": [
-            "RPA", "robotic process automation", "robotiserad processautomation",
-            "process automation", "processautomation", "automation developer",
-            "automationsutvecklare", "UiPath", "Blue Prism", "Automation Anywhere",
-            "Microsoft Power Automate", "business process automation", "affärsprocessautomation"
-        ],
-        "secondary_keywords": [
-            "workflow automation", "arbetsflödesautomation", "process mining", "processmining",
-            "business process management", "affärsprocesshantering", "digital workforce",
-            "digital arbetskraft", "intelligent automation", "intelligent automatisering",
-            "hyperautomation", "hyperautomatisering", "task automation", "uppgiftsautomatisering",
-            "process optimization", "processoptimering", "bot", "robot", "attended automation",
-            "unattended automation", "cognitive automation", "kognitiv automatisering"
-        ],
-        "exclusion_keywords": [
-            "konsult", "consultant", "bemanning", "rekrytering", "inhyrd", "postdoc",
-            "doktorand", "phd student", "forskare", "professor", "lektor", "styr och regler",
-            "reglertekniker", "DevSecOps", "DevOps", "fullstack", "frontend", "backend"
-        ],
-        "title_patterns": [
-            r"RPA", r"automation", r"automatisering", r"robot", r"process", r"UiPath",
-            r"Blue Prism", r"Automation Anywhere", r"Power Automate"
-        ]
-    }
-}
+JOB_CATEGORIES = SEARCH_CONFIG.job_categories
 
 # Meaningful employers keywords
 MEANINGFUL_ORGS = [
@@ -162,64 +144,335 @@ CONSULTANT_KEYWORDS = [
     "för kunds räkning", "placerad hos", "placering hos"
 ]
 
-def search_jobtech_jobs(query, location, limit=100):
+# Seconds between two updates of the watch command, and the port of its query API
+WATCH_INTERVAL = int(os.environ.get("JOBSCRAPER_WATCH_INTERVAL", "600"))
+WATCH_PORT = int(os.environ.get("JOBSCRAPER_WATCH_PORT", "8080"))
+
+# Lowest relevance score for a job to be kept in a category
+RELEVANCE_THRESHOLD = 0.6
+
+# Jobs scored at once when re-scoring the whole store
+SCORING_BATCH_SIZE = 10000
+
+# Shared HTTP session and rate limiter, created on first use
+_http_session = None
+_rate_limiter = None
+_http_cache = None
+
+# Metrics of the current run, see run_metrics.py
+_run_metrics = None
+
+def get_run_metrics():
     """
-    Search for jobs using the JobTech API
+    Get the metrics collector of the current run
+    """
+    global _run_metrics
+    if _run_metrics is None:
+        _run_metrics = RunMetrics()
+    return _run_metrics
+
+def reset_run_metrics():
+    """
+    Start collecting the metrics of a new run, for long-running processes
+    """
+    global _run_metrics
+    _run_metrics = None
+
+def get_http_client():
+    """
+    Get the pooled keep-alive session and rate limiter shared by all searches
+    
+    Returns:
+        tuple: (session, rate_limiter)
+    """
+    from fetch_engine import FairTokenBucket, create_session
+    
+    global _http_session, _rate_limiter
+    if _http_session is None:
+        _http_session = create_session(MAX_CONCURRENT_REQUESTS)
+        # Region shards share the rate through per-region views of the bucket
+        _rate_limiter = FairTokenBucket(REQUESTS_PER_SECOND, MAX_CONCURRENT_REQUESTS)
+    return _http_session, _rate_limiter
+
+def get_http_cache():
+    """
+    Get the on-disk response cache shared by all searches
+    
+    The cache is opened even when JobTech searches are not cached,
+    because it also limits the Indeed searches.
+    
+    Returns:
+        ResponseCache: Cache in HTTP_CACHE_FILE, None if the file cannot be opened
+    """
+    import sqlite3
+    from http_cache import ResponseCache
+    
+    global _http_cache
+    if _http_cache is None:
+        try:
+            _http_cache = ResponseCache(HTTP_CACHE_FILE, HTTP_CACHE_TTL, HTTP_CACHE_MAX_MB * 1024 * 1024)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Not caching HTTP responses, cannot open {HTTP_CACHE_FILE}: {e}")
+            # Do not try again for every request
+            _http_cache = False
+    return _http_cache or None
+
+def normalize_jobtech_ad(job, location, region=None):
+    """
+    Convert a JobTech ad into the standard job format
+    
+    The classification fields are filled in later by categorize_job.
     
     Args:
-        query (str): Search term
-        location (str): Location to search in
-        limit (int): Maximum number of results to return
+        job (dict): Ad as returned by the JobTech API
+        location (str): Location used when the ad has no workplace address
+        region (str): Region code used when the address does not tell the region
         
     Returns:
-        list: List of job listings
+        Job: Standardized job listing
     """
-    logger.info(f"Searching JobTech API for \'{query}\' in {location}")
+    address = job.get("workplace_address")
+    return normalize_job(
+        "JobTech",
+        job.get("id"),
+        job.get("headline"),
+        job.get("employer", {}).get("name") if job.get("employer") else "Unknown",
+        job.get("workplace_address", {}).get("municipality") if job.get("workplace_address") else location,
+        job.get("description", {}).get("text") if job.get("description") else "",
+        job.get("application_details", {}).get("url") if job.get("application_details") else "",
+        job.get("publication_date"),
+        job.get("application_deadline"),
+        SEARCH_CONFIG.region_of(address, location) or region
+    )
+
+def fetch_jobtech_page(params, offset, limit, shard=None, from_cache=None):
+    """
+    Fetch one page of JobTech search results
     
-    params = {
-        "q": f"{query} {location}",
-        "limit": limit
-    }
+    A failed request is retried while the retry budget of its region
+    shard lasts.
     
-    try:
-        response = requests.get(JOBTECH_API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
+    All pages of one walk through a search must come from the same
+    source, as the offsets of a cached page and of a fresh one may
+    point into different result lists. `from_cache` tells where the
+    earlier pages of the walk came from.
+    
+    Args:
+        params (dict): Search parameters, without offset and limit
+        offset (int): Index of the first hit to return
+        limit (int): Number of hits to return
+        shard (FetchShard): Region shard the search belongs to (None = no retries)
+        from_cache (bool): True = earlier pages came from the cache, so this
+            one only does too; False = they came from the API, so a cached
+            page is revalidated; None = this is the first page
         
-        total_hits = data.get("total", {}).get("value", 0)
-        hits = data.get("hits", [])
+    Returns:
+        tuple: Decoded API response and whether it came from the cache,
+            (None, True) if only a cached page would do and there is none
+    """
+    import requests
+    from fetch_engine import rate_limited_get
+    
+    params = dict(params, offset=offset, limit=limit)
+    session, rate_limiter = get_http_client()
+    limiter = shard.limiter if shard is not None else rate_limiter
+    cache = get_http_cache() if HTTP_CACHE_TTL > 0 else None
+    while True:
+        try:
+            response = rate_limited_get(session, JOBTECH_API_URL, limiter, params=params, metrics=get_run_metrics(),
+                                        cache=cache, revalidate=from_cache is False, cache_only=from_cache is True)
+            if response is None:
+                return None, True
+            return response.json(), getattr(response, "from_cache", False)
+        except requests.exceptions.RequestException as e:
+            delay = shard.next_retry(e) if shard is not None else None
+            if delay is None:
+                raise
+            logger.warning(f"JobTech request for region {shard.name} failed, retrying in {delay:.0f}s: {e}")
+            get_run_metrics().count("region_retries")
+            time.sleep(delay)
+
+def record_failed_search(error, shard=None):
+    """
+    Log and count a JobTech search that could not be completed
+    
+    Args:
+        error (Exception): Why the search failed
+        shard (FetchShard): Region shard of the search, marked as failed
+    """
+    logger.error(f"Error searching JobTech API: {error}")
+    get_run_metrics().count("failed_searches")
+    if shard is not None:
+        shard.failed = True
+
+def iter_jobtech_search(params, label, location, page_size=JOBTECH_PAGE_SIZE, max_results=None, first_page=None,
+                        shard=None):
+    """
+    Lazily walk all pages of a JobTech search, yielding standardized jobs
+    
+    The next page is fetched in the background while the current one is
+    being consumed, so only about two pages are held in memory at a time.
+    
+    A walk that starts from the cache stays in it. If a later page is not
+    cached any more, the walk starts over from the API and skips the ads
+    it already handed out.
+    
+    Args:
+        params (dict): Search parameters, without offset and limit
+        label (str): Description of the search for logs and metrics
+        location (str): Location used when an ad has no workplace address
+        page_size (int): Number of hits per request
+        max_results (int): Maximum number of jobs to yield (None = all)
+        first_page (tuple): Already fetched first page with page_size hits, as
+            returned by fetch_jobtech_page, if any
+        shard (FetchShard): Region shard the search belongs to
         
-        logger.info(f"Found {total_hits} total hits, retrieved {len(hits)} jobs")
+    Yields:
+        dict: Standardized job listing
+    """
+    import requests
+    
+    retrieved = 0
+    retrieved_ids = set()
+    pages = 0
+    total_hits = None
+    region = shard.name if shard is not None else None
+    if max_results is not None:
+        page_size = min(page_size, max_results)
+    
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        try:
+            page, from_cache = first_page if first_page is not None else fetch_jobtech_page(params, 0, page_size, shard)
+            pages += 1
+            total_hits = page.get("total", {}).get("value", 0)
+            logger.info(f"Found {total_hits} total hits for {label}")
+            
+            offset = 0
+            while True:
+                wanted = total_hits if max_results is None else min(total_hits, max_results)
+                hits = page.get("hits", [])
+                offset += len(hits)
+                
+                # Request the next page before handing out this one
+                next_page = None
+                if hits and offset < wanted and offset <= JOBTECH_MAX_OFFSET:
+                    limit = min(page_size, wanted - offset)
+                    next_page = prefetcher.submit(fetch_jobtech_page, params, offset, limit, shard, from_cache)
+                
+                for job in hits:
+                    if max_results is not None and retrieved >= max_results:
+                        break
+                    if job.get("id") in retrieved_ids:
+                        continue
+                    retrieved += 1
+                    retrieved_ids.add(job.get("id"))
+                    yield normalize_jobtech_ad(job, location, region)
+                
+                if next_page is None:
+                    break
+                page, from_cache = next_page.result()
+                if page is None:
+                    logger.info(f"Cached pages of {label} are incomplete, fetching it from the API")
+                    get_run_metrics().count("http_cache_restarts")
+                    page, from_cache = fetch_jobtech_page(params, 0, page_size, shard, from_cache=False)
+                    total_hits = page.get("total", {}).get("value", 0)
+                    offset = 0
+                pages += 1
         
-        # Process and standardize job data
-        processed_jobs = []
-        for job in hits:
-            processed_job = {
-                "id": job.get("id"),
-                "title": job.get("headline"),
-                "employer": job.get("employer", {}).get("name") if job.get("employer") else "Unknown",
-                "location": job.get("workplace_address", {}).get("municipality") if job.get("workplace_address") else location,
-                "description": job.get("description", {}).get("text") if job.get("description") else "",
-                "url": job.get("application_details", {}).get("url") if job.get("application_details") else "",
-                "published": job.get("publication_date"),
-                "deadline": job.get("application_deadline"),
-                "is_consultant": is_consultant_job(job),
-                "is_meaningful": is_meaningful_job(job),
-                "source": "JobTech"
-            }
-            processed_jobs.append(processed_job)
+        except requests.exceptions.RequestException as e:
+            record_failed_search(e, shard)
+    
+    if total_hits is not None and retrieved < total_hits and (max_results is None or retrieved < max_results):
+        logger.warning(f"Only {retrieved} of {total_hits} hits could be retrieved for {label}")
+    logger.info(f"Retrieved {retrieved} jobs for {label}")
+    get_run_metrics().record_search("JobTech", params.get("q"), location, pages, retrieved, total_hits)
+
+def iter_jobtech_jobs(query, location, page_size=JOBTECH_PAGE_SIZE, max_results=None):
+    """
+    Lazily walk a free-text JobTech search for a term in a location
+    
+    Args:
+        query (str): Search term
+        location (str): Location to search in
+        page_size (int): Number of hits per request
+        max_results (int): Maximum number of jobs to yield (None = all)
         
-        return processed_jobs
+    Yields:
+        dict: Standardized job listing
+    """
+    logger.info(f"Searching JobTech API for \'{query}\' in {location}")
+    label = f"\'{query}\' in {location}"
+    yield from iter_jobtech_search({"q": f"{query} {location}"}, label, location, page_size, max_results)
+
+def iter_planned_jobs(request, page_size=JOBTECH_PAGE_SIZE, max_results=None, shard=None):
+    """
+    Lazily walk a planned structured JobTech search
     
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error searching JobTech API: {e}")
-        return []
+    A search with more hits than the API can page through is split into
+    one search per municipality, or per publication window when it
+    covers a single municipality or a whole region.
+    
+    Args:
+        request (PlannedRequest): Search from plan_requests
+        page_size (int): Number of hits per request
+        max_results (int): Maximum number of jobs to yield per search (None = all)
+        shard (FetchShard): Shard of the request's region
+        
+    Yields:
+        dict: Standardized job listing
+    """
+    import requests
+    
+    label = request.describe()
+    logger.info(f"Searching JobTech API: {label}")
+    params = request.params()
+    location = ", ".join(request.locations)
+    if max_results is not None:
+        page_size = min(page_size, max_results)
+    
+    first_page = None
+    if request.can_split():
+        try:
+            first_page = fetch_jobtech_page(params, 0, page_size, shard)
+        except requests.exceptions.RequestException as e:
+            record_failed_search(e, shard)
+            return
+        total_hits = first_page[0].get("total", {}).get("value", 0)
+        wanted = total_hits if max_results is None else min(total_hits, max_results)
+        if wanted > JOBTECH_MAX_OFFSET + page_size:
+            parts = request.split(datetime.now())
+            logger.info(f"{total_hits} hits exceed the search API's offset limit, "
+                        f"splitting into {len(parts)} searches")
+            get_run_metrics().count("split_searches")
+            for part in parts:
+                yield from iter_planned_jobs(part, page_size, max_results, shard)
+            return
+    
+    yield from iter_jobtech_search(params, label, location, page_size, max_results, first_page, shard)
+
+def search_jobtech_jobs(query, location, limit=None):
+    """
+    Search for jobs using the JobTech API
+    
+    Args:
+        query (str): Search term
+        location (str): Location to search in
+        limit (int): Maximum number of results to return (None = all pages)
+        
+    Returns:
+        list: List of job listings
+    """
+    return list(iter_jobtech_jobs(query, location, max_results=limit))
 
 def search_indeed_jobs(query, location):
     """
     Search for jobs using the Indeed API via RapidAPI
     Only used as fallback when JobTech API fails
     
+    Responses are cached for a week, so only a query that was not sent
+    within the last week uses up API quota. If the response cache
+    cannot be opened, the API is used at most once per week instead.
+    
     Args:
         query (str): Search term
         location (str): Location to search in
@@ -227,8 +480,12 @@ def search_indeed_jobs(query, location):
     Returns:
         list: List of job listings
     """
-    # Check if we should use RapidAPI (only once per week)
-    if not should_use_rapidapi():
+    import requests
+    from fetch_engine import rate_limited_get
+    
+    # Without the response cache, fall back to using RapidAPI only once per week
+    cache = get_http_cache()
+    if cache is None and not should_use_rapidapi():
         logger.info("Skipping RapidAPI call (used within the last week)")
         return []
     
@@ -250,32 +507,33 @@ def search_indeed_jobs(query, location):
             logger.warning("No RapidAPI key provided, skipping Indeed API call")
             return []
         
-        response = requests.get(RAPIDAPI_URL, headers=headers, params=params)
+        session, rate_limiter = get_http_client()
+        response = rate_limited_get(session, RAPIDAPI_URL, rate_limiter, params=params, headers=headers,
+                                    metrics=get_run_metrics(), cache=cache, cache_ttl=INDEED_CACHE_TTL)
         response.raise_for_status()
         jobs = response.json()
         
-        # Update last RapidAPI usage timestamp
-        update_last_rapidapi_usage()
+        if cache is None:
+            update_last_rapidapi_usage()
         
         logger.info(f"Found {len(jobs)} jobs from Indeed API")
+        get_run_metrics().record_search("Indeed", query, location, 1, len(jobs))
         
-        # Process and standardize job data
+        # Process and standardize job data (categorize_job adds the classification)
         processed_jobs = []
         for job in jobs:
-            processed_job = {
-                "id": job.get("id", ""),
-                "title": job.get("title", ""),
-                "employer": job.get("employer", "Unknown"),
-                "location": job.get("location", location),
-                "description": job.get("description", ""),
-                "url": job.get("url", ""),
-                "published": job.get("published", datetime.now().strftime("%Y-%m-%d")),
-                "deadline": job.get("deadline", ""),
-                "is_consultant": is_consultant_job(job),
-                "is_meaningful": is_meaningful_job(job),
-                "source": "Indeed"
-            }
-            processed_jobs.append(processed_job)
+            processed_jobs.append(normalize_job(
+                "Indeed",
+                job.get("id", ""),
+                job.get("title", ""),
+                job.get("employer", "Unknown"),
+                job.get("location", location),
+                job.get("description", ""),
+                job.get("url", ""),
+                job.get("published", datetime.now().strftime("%Y-%m-%d")),
+                job.get("deadline", ""),
+                SEARCH_CONFIG.region_of(location=job.get("location", location))
+            ))
         
         return processed_jobs
     
@@ -317,126 +575,281 @@ def update_last_rapidapi_usage():
     except Exception as e:
         logger.error(f"Error updating RapidAPI usage timestamp: {e}")
 
-def is_consultant_job(job):
+# Compiled keyword matcher, built from the rules above on first use
+_matcher = None
+
+def get_matcher():
     """
-    Check if a job is likely a consultant position with improved detection
+    Get the keyword matcher compiled from JOB_CATEGORIES, CONSULTANT_KEYWORDS and MEANINGFUL_ORGS
     """
-    # Handle different job formats (JobTech vs Indeed)
-    if isinstance(job, dict):
-        if "employer" in job and isinstance(job["employer"], dict):
-            # JobTech format
-            employer = job.get("employer", {}).get("name", "").lower()
-            description = job.get("description", {}).get("text", "").lower() if isinstance(job.get("description"), dict) else ""
-            title = job.get("headline", "").lower()
-        else:
-            # Indeed or processed format
-            employer = str(job.get("employer", "")).lower()
-            description = str(job.get("description", "")).lower()
-            title = str(job.get("title", "")).lower()
-    else:
-        return False
-    
-    text_to_check = (title + " " + description + " " + employer).lower()
-    
-    # Direct consultant indicators
-    for pattern in CONSULTANT_KEYWORDS:
-        if pattern in text_to_check:
-            return True
-            
-    return False
+    global _matcher
+    if _matcher is None:
+        _matcher = load_matcher(JOB_CATEGORIES, CONSULTANT_KEYWORDS, MEANINGFUL_ORGS, RULES_CACHE_DIR)
+    return _matcher
+
+# Vectorized scorer for the same rules, built on first use
+_batch_scorer = None
 
-def is_meaningful_job(job):
+def get_batch_scorer():
     """
-    Check if a job is from a meaningful organization
+    Get the batch scorer for the active rules, or None without numpy and scipy
+    """
+    from batch_scoring import BATCH_SCORING_AVAILABLE, BatchScorer
+    
+    global _batch_scorer
+    if _batch_scorer is None and BATCH_SCORING_AVAILABLE:
+        _batch_scorer = BatchScorer(get_matcher(), list(JOB_CATEGORIES), RELEVANCE_THRESHOLD)
+    return _batch_scorer
+
+def match_job(job):
     """
-    meaningful_keywords = MEANINGFUL_ORGS
+    Scan a job's title, description and employer once for all keywords
     
+    Args:
+        job (Job or dict): Job record, or a dict in JobTech, Indeed or processed format
+        
+    Returns:
+        JobMatch: Keyword hits, or None if the job is not a dict
+    """
+    if isinstance(job, Job):
+        # The record keeps its lowercase text, so it is only lowercased once
+        return get_matcher().match(str(job.get("title", "")), None, None, lowercase=job.lowercase())
     # Handle different job formats (JobTech vs Indeed)
-    if isinstance(job, dict):
-        if "employer" in job and isinstance(job["employer"], dict):
-            # JobTech format
-            employer = job.get("employer", {}).get("name", "").lower()
-            description = job.get("description", {}).get("text", "").lower() if isinstance(job.get("description"), dict) else ""
-            title = job.get("headline", "").lower()
-        else:
-            # Indeed or processed format
-            employer = str(job.get("employer", "")).lower()
-            description = str(job.get("description", "")).lower()
-            title = str(job.get("title", "")).lower()
+    if not isinstance(job, dict):
+        return None
+    if "employer" in job and isinstance(job["employer"], dict):
+        # JobTech format
+        employer = job.get("employer", {}).get("name", "")
+        description = job.get("description", {}).get("text", "") if isinstance(job.get("description"), dict) else ""
+        title = job.get("headline", "")
     else:
-        return False
-    
-    for keyword in meaningful_keywords:
-        if keyword in employer or keyword in description or keyword in title:
-            return True
-    return False
+        # Indeed or processed format
+        employer = str(job.get("employer", ""))
+        description = str(job.get("description", ""))
+        title = str(job.get("title", ""))
+    return get_matcher().match(title, description, employer)
+
+def is_consultant_job(job, match=None):
+    """
+    Check if a job is likely a consultant position with improved detection
+    """
+    match = match or match_job(job)
+    return match is not None and get_matcher().is_consultant(match)
 
-def calculate_relevance_score(job, category):
+def is_meaningful_job(job, match=None):
+    """
+    Check if a job is from a meaningful organization
+    """
+    match = match or match_job(job)
+    return match is not None and get_matcher().is_meaningful(match)
+
+def calculate_relevance_score(job, category, match=None):
     """
     Calculate a relevance score for a job based on how well it matches a category
     
     Args:
         job (dict): Job data
         category (str): Category to match against (IT, AI, or RPA)
+        match (JobMatch): Keyword hits for the job, if already computed
         
     Returns:
         float: Relevance score between 0 and 1
     """
-    if category not in JOB_CATEGORIES:
+    match = match or match_job(job)
+    if match is None:
         return 0.0
+    return get_matcher().relevance_score(match, category)
+
+def job_content_hash(job):
+    """
+    Hash the job fields that classification depends on
     
-    # Get job text fields
-    title = job.get("title", "").lower()
-    description = job.get("description", "").lower()
-    employer = job.get("employer", "").lower()
-    
-    # Get category keywords
-    primary_keywords = JOB_CATEGORIES[category]["primary_keywords"]
-    secondary_keywords = JOB_CATEGORIES[category]["secondary_keywords"]
-    exclusion_keywords = JOB_CATEGORIES[category]["exclusion_keywords"]
-    title_patterns = JOB_CATEGORIES[category]["title_patterns"]
-    
-    # Check for exclusion keywords
-    for keyword in exclusion_keywords:
-        if keyword in title or keyword in description:
-            return 0.0
-    
-    # Initialize score components
-    title_score = 0.0
-    primary_score = 0.0
-    secondary_score = 0.0
-    
-    # Title pattern matching (strongest indicator)
-    for pattern in title_patterns:
-        if re.search(pattern, title):
-            title_score = 0.8 # High score for title match
-            break
-            
-    # Primary keyword matching
-    for keyword in primary_keywords:
-        if keyword in title:
-            primary_score += 0.4
-        elif keyword in description:
-            primary_score += 0.2
-            
-    # Secondary keyword matching
-    for keyword in secondary_keywords:
-        if keyword in title:
-            secondary_score += 0.2
-        elif keyword in description:
-            secondary_score += 0.1
-            
-    # Combine scores, cap at 1.0
-    relevance = min(1.0, title_score + primary_score + secondary_score)
+    Args:
+        job (dict): Job listing in the standard format
+        
+    Returns:
+        str: Hex digest of title, description and employer
+    """
+    content = "\0".join(str(job.get(field) or "") for field in ("title", "description", "employer"))
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def get_rules_fingerprint():
+    """
+    Fingerprint the active JOB_CATEGORIES, CONSULTANT_KEYWORDS and MEANINGFUL_ORGS
+    """
+    return rules_fingerprint(JOB_CATEGORIES, CONSULTANT_KEYWORDS, MEANINGFUL_ORGS)
+
+def categorize_job(job):
+    """
+    Classify a job: set its consultant and meaningful flags, its best
+    category and relevance score, and the content hash they were derived from
+    
+    Consultant jobs and jobs below the relevance threshold get the
+    category None.
+    
+    Args:
+        job (dict): Job listing, updated in place
+        
+    Returns:
+        str: Best category (IT, AI, or RPA), or None
+    """
+    # Scan the job text once for every category and flag
+    match = match_job(job)
+    
+    job["is_consultant"] = is_consultant_job(job, match)
+    job["is_meaningful"] = is_meaningful_job(job, match)
+    job["category"] = None
+    job["relevance_score"] = None
+    job["content_hash"] = job_content_hash(job)
+    
+    # Exclude consultant positions first
+    if job["is_consultant"]:
+        return None
+        
+    # Pick the best category; on a tie the one configured first wins
+    best_category = None
+    max_relevance = 0.0
+    for category in JOB_CATEGORIES:
+        relevance = calculate_relevance_score(job, category, match)
+        if relevance >= RELEVANCE_THRESHOLD and relevance > max_relevance:
+            best_category = category
+            max_relevance = relevance
+        
+    if best_category:
+        job["category"] = best_category
+        job["relevance_score"] = int(max_relevance * 100) # Convert to percentage
+    
+    return best_category
+
+def categorize_jobs(jobs):
+    """
+    Categorize a stream of jobs, keeping the ones that do not qualify
+    
+    Args:
+        jobs (iterable): Job listings
+        
+    Yields:
+        dict: Each job with its category and relevance score set
+    """
+    for job in jobs:
+        categorize_job(job)
+        yield job
+
+def categorize_job_batch(jobs):
+    """
+    Classify a list of jobs at once with the vectorized batch scorer
+    
+    Sets the same fields to the same values as calling categorize_job on
+    each job.
     
-    return relevance
+    Args:
+        jobs (list): Job listings, updated in place
+        
+    Returns:
+        list: Best category (IT, AI, or RPA) or None per job
+    """
+    results = get_batch_scorer().score([match_job(job) for job in jobs])
+    for index, job in enumerate(jobs):
+        job["is_consultant"] = bool(results.consultant[index])
+        job["is_meaningful"] = bool(results.meaningful[index])
+        job["category"] = results.categories[index]
+        job["relevance_score"] = results.relevance_scores[index]
+        job["content_hash"] = job_content_hash(job)
+    return results.categories
+
+def categorize_jobs_in_batches(jobs, batch_size=SCORING_BATCH_SIZE):
+    """
+    Categorize a stream of jobs batch by batch, keeping the ones that do not qualify
+    
+    Streams shorter than one batch are categorized one job at a time,
+    which is quicker than importing NumPy. So is everything when NumPy
+    and SciPy are not installed.
+    
+    Args:
+        jobs (iterable): Job listings
+        batch_size (int): Jobs scored at once
+        
+    Yields:
+        dict: Each job with its category and relevance score set
+    """
+    jobs = iter(jobs)
+    batch = list(islice(jobs, batch_size))
+    if len(batch) < batch_size or get_batch_scorer() is None:
+        yield from categorize_jobs(chain(batch, jobs))
+        return
+    while batch:
+        categorize_job_batch(batch)
+        yield from batch
+        batch = list(islice(jobs, batch_size))
+
+def categorize_changed_jobs(jobs, store, counts):
+    """
+    Categorize a stream of jobs, reusing stored classifications
+    
+    A job is only classified again when its content hash differs from
+    the stored one. Stored classifications always match the active rules,
+    because refresh_stored_classifications re-scores the whole store
+    whenever the rules change.
+    
+    Args:
+        jobs (iterable): Job listings
+        store (JobStore): Job store holding earlier classifications
+        counts (dict): Receives the number of "classified" and "reused"
+            jobs, and how many were "kept" or dropped as consultant jobs
+            ("dropped_consultant") or below the relevance threshold
+            ("dropped_below_threshold")
+        
+    Yields:
+        dict: Each job with its classification set
+    """
+    for name in ("classified", "reused", "kept", "dropped_consultant", "dropped_below_threshold"):
+        counts.setdefault(name, 0)
+    metrics = get_run_metrics()
+    for job in jobs:
+        stored = store.get_classification(job["id"])
+        if stored is not None and stored["content_hash"] == job_content_hash(job):
+            job.update(stored)
+            counts["reused"] += 1
+        else:
+            with metrics.stage("classification", profile=True):
+                categorize_job(job)
+            counts["classified"] += 1
+        
+        if job["category"]:
+            counts["kept"] += 1
+        elif job["is_consultant"]:
+            counts["dropped_consultant"] += 1
+        else:
+            counts["dropped_below_threshold"] += 1
+        yield job
+
+def refresh_stored_classifications(store, force=False):
+    """
+    Re-score every stored job if the classification rules changed
+    
+    Args:
+        store (JobStore): Job store to refresh
+        force (bool): Re-score even if the rules did not change
+    """
+    fingerprint = get_rules_fingerprint()
+    stored_fingerprint = store.get_meta("rules_fingerprint")
+    if stored_fingerprint == fingerprint and not force:
+        return
+    
+    if stored_fingerprint is not None and stored_fingerprint != fingerprint:
+        logger.info("Classification rules changed, re-scoring all stored jobs")
+    with get_run_metrics().stage("rescore", profile=True):
+        count = store.update_classifications(categorize_jobs_in_batches(store.iter_all_jobs()))
+    store.set_meta("rules_fingerprint", fingerprint)
+    if count:
+        logger.info(f"Re-scored {count} stored jobs")
 
 def filter_and_categorize_jobs(all_jobs):
     """
     Filter and categorize jobs into IT, AI, and RPA
     
     Args:
-        all_jobs (list): List of all job listings
+        all_jobs (iterable): Job listings, consumed one at a time
         
     Returns:
         tuple: (it_jobs, ai_jobs, rpa_jobs, all_filtered_jobs)
@@ -447,106 +860,584 @@ def filter_and_categorize_jobs(all_jobs):
     all_filtered_jobs = []
     
     for job in all_jobs:
-        # Exclude consultant positions first
-        if is_consultant_job(job):
+        best_category = categorize_job(job)
+        if not best_category:
             continue
-            
-        # Calculate relevance for each category
-        it_relevance = calculate_relevance_score(job, "IT")
-        ai_relevance = calculate_relevance_score(job, "AI")
-        rpa_relevance = calculate_relevance_score(job, "RPA")
-        
-        # Determine the best category and assign score
-        best_category = None
-        max_relevance = 0.0
-        
-        if it_relevance >= 0.6 and it_relevance > max_relevance:
-            best_category = "IT"
-            max_relevance = it_relevance
-        if ai_relevance >= 0.6 and ai_relevance > max_relevance:
-            best_category = "AI"
-            max_relevance = ai_relevance
-        if rpa_relevance >= 0.6 and rpa_relevance > max_relevance:
-            best_category = "RPA"
-            max_relevance = rpa_relevance
-            
-        if best_category:
-            job["category"] = best_category
-            job["relevance_score"] = int(max_relevance * 100) # Convert to percentage
-            all_filtered_jobs.append(job)
-            
-            if best_category == "IT":
-                it_jobs.append(job)
-            elif best_category == "AI":
-                ai_jobs.append(job)
-            elif best_category == "RPA":
-                rpa_jobs.append(job)
+        
+        all_filtered_jobs.append(job)
+        if best_category == "IT":
+            it_jobs.append(job)
+        elif best_category == "AI":
+            ai_jobs.append(job)
+        elif best_category == "RPA":
+            rpa_jobs.append(job)
                 
     return it_jobs, ai_jobs, rpa_jobs, all_filtered_jobs
 
-def save_jobs_to_json(jobs, filename):
+def save_jobs_to_json(jobs, filename, compact=False):
     """
     Save job listings to a JSON file
     
+    The file is streamed to a temporary file and renamed over the target
+    when complete, so a failed write never leaves a truncated file behind.
+    
     Args:
-        jobs (list): List of job listings
+        jobs (iterable): Job listings
         filename (str): Name of the JSON file
+        compact (bool): Write without indentation
     """
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(jobs, f, ensure_ascii=False, indent=4)
-        logger.info(f"Saved {len(jobs)} jobs to {filename}")
+        with AtomicJsonWriter(filename, compact=compact) as writer:
+            for job in jobs:
+                writer.write(job)
+        get_run_metrics().record_file(filename, writer.seconds, jobs=writer.items)
+        logger.info(f"Saved {writer.items} jobs to {filename}")
     except Exception as e:
         logger.error(f"Error saving jobs to {filename}: {e}")
 
-def main():
-    logger.info("Starting job scraping process...")
+def create_region_shards():
+    """
+    Create the fetch shards of a run, one per configured region
+    
+    Returns:
+        dict: FetchShard per region code, in configuration order
+    """
+    from fetch_engine import FetchShard
+    
+    _, rate_limiter = get_http_client()
+    return {region.code: FetchShard(region.code, rate_limiter, REGION_MAX_RETRIES) for region in REGIONS}
+
+def stream_all_jobs(shards=None):
+    """
+    Run the planned structured searches concurrently, sharded by region
+    
+    The searches are interleaved across regions, so the workers and the
+    request rate are shared between the regions instead of working
+    through them one after the other.
+    
+    Args:
+        shards (dict): FetchShard per region code, from create_region_shards
+            (None = new shards)
+    
+    Yields:
+        dict: Fetched job listings, in search order
+    """
+    from fetch_engine import interleave_shards, stream_concurrently
     
-    all_fetched_jobs = []
+    shards = shards if shards is not None else create_region_shards()
+    plan = plan_requests(SEARCH_QUERIES, OCCUPATION_FIELDS, REGIONS)
+    metrics = get_run_metrics()
+    metrics.count("planned_searches", len(plan))
+    metrics.count("free_text_searches_replaced", naive_request_count(SEARCH_QUERIES, LOCATIONS))
+    tasks = [(request, JOBTECH_PAGE_SIZE, MAX_RESULTS_PER_QUERY, shards[request.region]) for request in plan]
+    tasks = interleave_shards(tasks, lambda task: task[0].region)
+    logger.info(f"Running {len(tasks)} searches in {len(shards)} regions with up to "
+                f"{MAX_CONCURRENT_REQUESTS} in parallel")
     
-    # Search for IT jobs
-    for location in LOCATIONS:
-        all_fetched_jobs.extend(search_jobtech_jobs("IT-utvecklare", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("programmerare", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("systemutvecklare", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("mjukvaruutvecklare", location))
+    yield from stream_concurrently(iter_planned_jobs, tasks, MAX_CONCURRENT_REQUESTS, JOBTECH_PAGE_SIZE)
+
+def deduplicate_jobs(jobs, seen_ids):
+    """
+    Yield each job the first time its id is seen
+    
+    Args:
+        jobs (iterable): Stream of job listings
+        seen_ids (set): Ids seen so far, updated in place
         
-    # Search for AI jobs
-    for location in LOCATIONS:
-        all_fetched_jobs.extend(search_jobtech_jobs("AI", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("maskininlärning", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("data scientist", location))
+    Yields:
+        dict: Jobs with previously unseen ids
+    """
+    metrics = get_run_metrics()
+    for job in jobs:
+        metrics.count("fetched")
+        if job["id"] in seen_ids:
+            metrics.count("duplicates")
+            continue
+        seen_ids.add(job["id"])
+        yield job
+
+def load_sync_state():
+    """
+    Load the incremental sync state
+    
+    Returns:
+        dict: Saved state, empty if there is none
+    """
+    try:
+        with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Error loading sync state from {SYNC_STATE_FILE}: {e}")
+        return {}
+
+def save_sync_state(checkpoint):
+    """
+    Save the checkpoint the next incremental sync starts from
+    
+    Args:
+        checkpoint (datetime): UTC time the current run started
+    """
+    try:
+        with open(SYNC_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"checkpoint": checkpoint.strftime(TIMESTAMP_FORMAT)}, f, indent=4)
+        logger.info(f"Saved sync checkpoint {checkpoint:%Y-%m-%d %H:%M:%S} UTC")
+    except Exception as e:
+        logger.error(f"Error saving sync state to {SYNC_STATE_FILE}: {e}")
+
+def fetch_jobtech_changes(since):
+    """
+    Fetch all ads added, updated or removed since a point in time
+    
+    Args:
+        since (datetime): UTC time of the last checkpoint
         
-    # Search for RPA jobs (with UiPath focus)
-    for location in LOCATIONS:
-        all_fetched_jobs.extend(search_jobtech_jobs("RPA", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("UiPath", location))
-        all_fetched_jobs.extend(search_jobtech_jobs("automationsutvecklare", location))
+    Returns:
+        list: Changed ads from the JobTech stream API, in feed order
+    """
+    from fetch_engine import rate_limited_get
+    
+    params = {"date": (since - SYNC_OVERLAP).strftime(TIMESTAMP_FORMAT)}
+    # Not cached: the feed for the same checkpoint grows until the next run
+    session, rate_limiter = get_http_client()
+    response = rate_limited_get(session, JOBTECH_STREAM_URL, rate_limiter, params=params, metrics=get_run_metrics())
+    return response.json()
+
+def apply_job_changes(store, changes, seen_at):
+    """
+    Apply a JobTech change feed to the job store
+    
+    Removed ads, and ads that moved out of the configured regions, leave
+    the current result set. Added and updated ads in the configured
+    regions are the only ones that go back through categorization.
+    
+    Args:
+        store (JobStore): Job store holding the previous result set
+        changes (list): Changed ads in feed order
+        seen_at (str): Timestamp of the current run
+    """
+    removed_ids = set()
+    changed_jobs = {}
+    
+    for ad in changes:
+        ad_id = ad.get("id")
+        # A later feed entry supersedes earlier ones for the same ad
+        removed_ids.discard(ad_id)
+        changed_jobs.pop(ad_id, None)
         
-    # Deduplicate jobs
-    unique_jobs = {job["id"]: job for job in all_fetched_jobs}.values()
-    logger.info(f"Found {len(unique_jobs)} unique jobs before filtering")
+        address = ad.get("workplace_address")
+        if ad.get("removed") or not SEARCH_CONFIG.contains(address):
+            removed_ids.add(ad_id)
+        else:
+            changed_jobs[ad_id] = normalize_jobtech_ad(ad, address.get("municipality"))
     
-    # Filter and categorize jobs
-    it_jobs, ai_jobs, rpa_jobs, all_filtered_jobs = filter_and_categorize_jobs(list(unique_jobs))
+    removed = store.deactivate_jobs(removed_ids)
+    counts = {}
+    changed = list(categorize_changed_jobs(changed_jobs.values(), store, counts))
+    kept = sum(1 for job in changed if job["category"])
+    store.upsert_jobs(changed, seen_at)
+    get_run_metrics().add_counts({"changes": len(changes), "removed": removed, **counts})
+    logger.info(f"Applied {len(changes)} changes: {removed} removed, "
+                f"{len(changed_jobs)} added or updated, {kept} of them kept")
+    logger.info(f"Classified {counts['classified']} jobs, reused {counts['reused']} unchanged classifications")
+
+def run_incremental_sync(store, seen_at):
+    """
+    Update the previous result set with the changes since the last checkpoint
     
-    # Save categorized jobs
-    save_jobs_to_json(it_jobs, IT_JOBS_OUTPUT)
-    save_jobs_to_json(ai_jobs, AI_JOBS_OUTPUT)
-    save_jobs_to_json(rpa_jobs, RPA_JOBS_OUTPUT)
-    save_jobs_to_json(all_filtered_jobs, ALL_JOBS_OUTPUT)
+    Args:
+        store (JobStore): Job store holding the previous result set
+        seen_at (str): Timestamp of the current run
+        
+    Returns:
+        bool: True if the store was updated, False if a full sync is needed
+    """
+    import requests
     
-    # Update last updated timestamp
+    checkpoint = load_sync_state().get("checkpoint")
+    if not checkpoint:
+        logger.info("No sync checkpoint found, running a full sync")
+        return False
+    
+    if store.count_active_jobs() == 0:
+        logger.info("No previous results found, running a full sync")
+        return False
+    
+    since = datetime.strptime(checkpoint, TIMESTAMP_FORMAT)
+    logger.info(f"Fetching JobTech changes since {since:%Y-%m-%d %H:%M:%S} UTC")
+    try:
+        changes = fetch_jobtech_changes(since)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching JobTech changes: {e}")
+        return False
+    
+    apply_job_changes(store, changes, seen_at)
+    return True
+
+def run_full_sync(store, seen_at):
+    """
+    Fetch, deduplicate and categorize every search result into the store
+    
+    Jobs the searches no longer return leave the current result set.
+    In a region where a search failed, they stay until their deadline
+    passes or a complete sync of the region leaves them out, so an API
+    outage does not empty the outputs.
+    
+    Args:
+        store (JobStore): Job store to write the new result set to
+        seen_at (str): Timestamp of the current run
+    """
+    seen_ids = set()
+    counts = {}
+    metrics = get_run_metrics()
+    shards = create_region_shards()
+    # Time spent waiting for the fetch workers shows up as the "fetch" stage
+    unique_jobs = deduplicate_jobs(metrics.iterate("fetch", stream_all_jobs(shards)), seen_ids)
+    store.upsert_jobs(categorize_changed_jobs(unique_jobs, store, counts), seen_at)
+    failed_regions = [code for code, shard in shards.items() if shard.failed]
+    if failed_regions:
+        logger.warning(f"Searches failed in regions {', '.join(failed_regions)}, "
+                       f"keeping the jobs they did not return")
+    counts["unseen"] = store.deactivate_unseen(seen_at, keep_regions=failed_regions)
+    metrics.add_counts({"unique": len(seen_ids), "failed_regions": len(failed_regions), **counts})
+    logger.info(f"Found {len(seen_ids)} unique jobs before filtering")
+    fetched = metrics.counters.get("fetched", 0)
+    if fetched:
+        logger.info(f"Search overlap: {metrics.counters.get('duplicates', 0) / fetched:.1%} of fetched ads were duplicates")
+    logger.info(f"Classified {counts['classified']} jobs, reused {counts['reused']} unchanged classifications")
+
+def expire_jobs(store):
+    """
+    Remove the jobs whose application deadline has passed from the current result set
+    
+    Uses the store's expiry index, so no API calls and no scan of the
+    result set are needed.
+    
+    Args:
+        store (JobStore): Job store holding the current result set
+        
+    Returns:
+        int: Number of jobs that expired
+    """
+    expired = store.expire_jobs()
+    get_run_metrics().count("expired", len(expired))
+    if expired:
+        logger.info(f"Removed {len(expired)} jobs whose application deadline has passed")
+    return len(expired)
+
+def assign_stored_regions(store):
+    """
+    Give the jobs stored before jobs had a region the region of their location
+    
+    Args:
+        store (JobStore): Job store holding the current result set
+    """
+    assigned = store.assign_regions(lambda location: SEARCH_CONFIG.region_of(location=location))
+    if assigned:
+        logger.info(f"Assigned a region to {assigned} stored jobs")
+
+def merge_near_duplicates(store):
+    """
+    Merge near-duplicate ads in the current result set
+    
+    Reposts under a new id and the same ad from another source are found
+    by their MinHash signatures (see near_duplicates.py). Signatures are
+    kept in the store and only computed for new or changed ads. In every
+    cluster the best-scored ad is kept, the most recently published one
+    on a tie, and lists the id, source and url of every ad in the cluster.
+    The other ads are left out of the exports.
+    
+    Args:
+        store (JobStore): Job store holding the current result set
+    """
+    records = {}
+    new_signatures = []
+    
+    def signatures():
+        for row in store.iter_dedup_candidates():
+            signature = row["minhash"]
+            if signature is None:
+                signature = minhash_signature(row["title"], row["employer"], row["description"])
+                if signature is not None:
+                    new_signatures.append((row["id"], signature))
+            records[row["id"]] = {
+                "rank": (row["relevance_score"] or 0, row["published"] or ""),
+                "source": {"id": row["id"], "source": row["source"], "url": row["url"]}
+            }
+            yield row["id"], signature
+    
+    clusters = find_clusters(signatures())
+    store.update_signatures(new_signatures)
+    
+    merged_clusters = []
+    for cluster in clusters:
+        # Stable sort, so earlier stored ads win remaining ties
+        ranked = sorted(cluster, key=lambda job_id: records[job_id]["rank"], reverse=True)
+        merged_clusters.append((ranked[0], ranked[1:], [records[job_id]["source"] for job_id in ranked]))
+    
+    merged = store.set_duplicates(merged_clusters)
+    get_run_metrics().add_counts({"near_duplicates": merged})
+    logger.info(f"Computed {len(new_signatures)} new signatures, "
+                f"merged {merged} near-duplicate ads into {len(merged_clusters)} jobs")
+
+def export_jobs(store, compact=False, precompress=False):
+    """
+    Write the current result set from the store to the JSON files
+    
+    The jobs are streamed from the store in one pass. Each job is
+    serialized once and written to its category file and all_jobs.json,
+    and added to the front-end payload and to the payload of its region.
+    Every file is replaced atomically, and only after all jobs were
+    written. Jobs whose application deadline has passed are removed from
+    the result set first.
+    
+    Args:
+        store (JobStore): Job store holding the current result set
+        compact (bool): Write the JSON files without indentation
+        precompress (bool): Also write .gz and .br variants of the website data
+    """
+    metrics = get_run_metrics()
+    outputs = {"IT": IT_JOBS_OUTPUT, "AI": AI_JOBS_OUTPUT, "RPA": RPA_JOBS_OUTPUT, "all": ALL_JOBS_OUTPUT}
+    payload = None
+    regions = None
+    try:
+        # Only live postings, also when exporting without a fetch
+        expire_jobs(store)
+        assign_stored_regions(store)
+        # Slim listing index, on-demand detail shards, search index and listing change log for the website
+        payload = FrontendPayloadWriter(LISTING_INDEX_OUTPUT, DETAILS_DIR, SEARCH_INDEX_OUTPUT, CHANGES_DIR,
+                                        precompress)
+        # The same per region, sharing the detail shards, so the website only loads the regions shown
+        regions = RegionPayloadWriter(REGIONS_DIR, REGIONS, SEARCH_CONFIG.default_regions, precompress)
+        with JsonFanOut(outputs, compact=compact) as files:
+            for job in store.iter_active_jobs():
+                files.write(job, (job["category"], "all"))
+                payload.add(job)
+                regions.add(job)
+        
+        for writer in files.writers.values():
+            metrics.record_file(writer.path, writer.seconds, jobs=writer.items)
+            logger.info(f"Saved {writer.items} jobs to {writer.path}")
+        payload.commit(metrics)
+        regions.commit(metrics)
+    except Exception as e:
+        for writer in (payload, regions):
+            if writer is not None:
+                writer.abort()
+        logger.error(f"Error exporting jobs: {e}")
+
+def setup_logging(log_file=None):
+    """
+    Log to the console and, for commands that fetch from the APIs, to a file
+    
+    Args:
+        log_file (str): Log file to append to (None = console only)
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+def fetch_jobs(store, incremental=False):
+    """
+    Sync the job store with JobTech and merge near-duplicate ads
+    
+    Args:
+        store (JobStore): Job store to update
+        incremental (bool): Only fetch the ads changed since the last run
+        
+    Returns:
+        datetime: Checkpoint for the next incremental run
+    """
+    metrics = get_run_metrics()
+    # The next incremental run picks up everything changed after this point
+    checkpoint = datetime.now(timezone.utc)
+    seen_at = checkpoint.strftime(TIMESTAMP_FORMAT)
+    
+    with metrics.stage("refresh_classifications"):
+        refresh_stored_classifications(store)
+        assign_stored_regions(store)
+    with metrics.stage("sync"):
+        if not (incremental and run_incremental_sync(store, seen_at)):
+            # Deduplicate, filter and categorize jobs as they are fetched
+            run_full_sync(store, seen_at)
+    with metrics.stage("expire"):
+        expire_jobs(store)
+    with metrics.stage("near_duplicates"):
+        merge_near_duplicates(store)
+    return checkpoint
+
+def save_last_updated():
+    """
+    Write the time of the last update shown on the website
+    """
     try:
         with open(LAST_UPDATED_FILE, "w") as f:
             f.write(datetime.now().strftime("%Y-%m-%d %H:%M"))
         logger.info("Updated last updated timestamp")
     except Exception as e:
         logger.error(f"Error updating last updated timestamp: {e}")
+
+def watch_jobs(interval=WATCH_INTERVAL, host="127.0.0.1", port=WATCH_PORT, export=False):
+    """
+    Keep the result set up to date and serve it over the local query API
+    
+    The compiled rules, the HTTP session, the job store and the current
+    result set stay in memory between updates. Every update is an
+    incremental sync (a full sync if there is no checkpoint yet), and the
+    new index is built on the previous one, so only the jobs the update
+    changed are tokenized and hashed again. If an update fails, the
+    previous result set stays in service and the next update tries again.
+    
+    Args:
+        interval (int): Seconds between two updates
+        host (str): Interface the query API listens on
+        port (int): Port of the query API (0 picks a free port)
+        export (bool): Also write the JSON files after every update
+    """
+    from job_api import JobIndex, create_api_server
+    
+    store = JobStore(JOB_STORE_FILE)
+    current = {"index": JobIndex(store.iter_active_jobs(), load_sync_state().get("checkpoint"))}
+    server = create_api_server(host, port, lambda: current["index"])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving {len(current['index'].jobs)} jobs on http://{host}:{server.server_address[1]}/jobs")
+    
+    try:
+        while True:
+            reset_run_metrics()
+            try:
+                checkpoint = fetch_jobs(store, incremental=True)
+                save_sync_state(checkpoint)
+                index = JobIndex(store.iter_active_jobs(), checkpoint.strftime(TIMESTAMP_FORMAT), current["index"])
+                if export:
+                    with get_run_metrics().stage("export"):
+                        export_jobs(store)
+                    save_last_updated()
+                # An unchanged result set keeps its ETags and sort caches
+                if index.version != current["index"].version:
+                    current["index"] = index
+                    logger.info(f"Serving {len(index.jobs)} jobs, version {index.version}, {index.changed} changed")
+                else:
+                    current["index"].updated = index.updated
+                get_run_metrics().save(RUN_METRICS_FILE)
+            except Exception as e:
+                logger.error(f"Update failed, serving the previous result set: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        store.close()
+
+def print_stats(store):
+    """
+    Print a summary of the job store, the rules and the last sync as JSON
+    
+    Args:
+        store (JobStore): Job store to summarize
+    """
+    stats = store.stats()
+    stats["rules_changed"] = store.get_meta("rules_fingerprint") != get_rules_fingerprint()
+    stats["sync_checkpoint"] = load_sync_state().get("checkpoint")
+    try:
+        with open(RUN_METRICS_FILE, "r", encoding="utf-8") as f:
+            last_run = json.load(f)
+        stats["last_run"] = {
+            "started": last_run.get("started"),
+            "wall_seconds": last_run.get("wall_seconds"),
+            "counters": last_run.get("counters")
+        }
+    except (OSError, ValueError):
+        stats["last_run"] = None
+    print(json.dumps(stats, ensure_ascii=False, indent=4))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fetch IT, AI and RPA jobs from JobTech",
+        epilog="Without a command, the jobs are fetched and exported."
+    )
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fetch ads changed since the last run and update the previous results")
+    parser.add_argument("--compact", action="store_true",
+                        help="write the JSON files without indentation")
+    parser.add_argument("--precompress", action="store_true",
+                        help="also write .gz and .br variants of the website data")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="profile classification with cProfile and write the stats to PATH")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    
+    # Options repeated on a command default to the value given before it
+    fetch_parser = commands.add_parser("fetch", help="fetch and classify jobs into the job store")
+    fetch_parser.add_argument("--incremental", action="store_true", default=argparse.SUPPRESS,
+                              help="only fetch ads changed since the last run")
+    fetch_parser.add_argument("--profile", metavar="PATH", default=argparse.SUPPRESS,
+                              help="profile classification and write the stats to PATH")
+    classify_parser = commands.add_parser("classify", help="re-score every stored job with the current rules")
+    classify_parser.add_argument("--profile", metavar="PATH", default=argparse.SUPPRESS,
+                                 help="profile classification and write the stats to PATH")
+    export_parser = commands.add_parser("export", help="write the JSON files and the website data from the job store")
+    export_parser.add_argument("--compact", action="store_true", default=argparse.SUPPRESS,
+                               help="write the JSON files without indentation")
+    export_parser.add_argument("--precompress", action="store_true", default=argparse.SUPPRESS,
+                               help="also write .gz and .br variants of the website data")
+    commands.add_parser("stats", help="print a summary of the job store")
+    watch_parser = commands.add_parser("watch", help="keep the jobs up to date and serve them over a local JSON API")
+    watch_parser.add_argument("--interval", type=int, default=WATCH_INTERVAL,
+                              help="seconds between two updates (default: %(default)s)")
+    watch_parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: %(default)s)")
+    watch_parser.add_argument("--port", type=int, default=WATCH_PORT, help="port to listen on (default: %(default)s)")
+    watch_parser.add_argument("--export", action="store_true", help="also write the JSON files after every update")
+    args = parser.parse_args(argv)
+    
+    command = args.command
+    fetching = command in (None, "fetch", "watch")
+    setup_logging(LOG_FILE if fetching else None)
+    
+    if command == "watch":
+        watch_jobs(args.interval, args.host, args.port, args.export)
+        return
+    
+    if command == "stats":
+        with JobStore(JOB_STORE_FILE) as store:
+            print_stats(store)
+        return
+    
+    logger.info("Starting job scraping process..." if command is None else f"Starting {command}...")
+    metrics = get_run_metrics()
+    if args.profile:
+        metrics.enable_profiling()
+    
+    checkpoint = None
+    with JobStore(JOB_STORE_FILE) as store:
+        if fetching:
+            checkpoint = fetch_jobs(store, args.incremental)
+        if command == "classify":
+            with metrics.stage("refresh_classifications"):
+                refresh_stored_classifications(store, force=True)
+            with metrics.stage("near_duplicates"):
+                merge_near_duplicates(store)
         
-    logger.info("Job scraping process completed.")
+        # Save categorized jobs
+        if command in (None, "export"):
+            with metrics.stage("export"):
+                export_jobs(store, compact=args.compact, precompress=args.precompress)
+    
+    if checkpoint is not None:
+        save_sync_state(checkpoint)
+        
+        save_last_updated()
+        
+    metrics.save(RUN_METRICS_FILE)
+    if args.profile:
+        metrics.dump_profile(args.profile)
+    logger.info("Job scraping process completed." if command is None else f"Finished {command}.")
 
 if __name__ == "__main__":
     main()
-
-
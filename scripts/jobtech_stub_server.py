@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Local stub of the JobTech APIs for testing the scraper offline
+
+Replays a recorded change feed on /stream and a recorded search
+response on /search. Searches honour the municipality, region,
+published-after and published-before filters for hits that carry the
+fields they filter on; the free-text and occupation filters are
+ignored.
+
+The feed is a JSONL file with one stream ad per line. Ads with a
+`timestamp` (milliseconds since the epoch, as in the JobTech stream
+API) are only returned when they are newer than the `date` parameter
+of the request.
+
+Usage:
+    python scripts/jobtech_stub_server.py --feed changes.jsonl --search search.json
+    JOBTECH_STREAM_URL=http://127.0.0.1:8000/stream \\
+    JOBTECH_API_URL=http://127.0.0.1:8000/search \\
+        python scripts/jobtech_job_scraper.py --incremental
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Search parameters the stub filters on
+SEARCH_FILTERS = ("municipality", "region", "published-after", "published-before")
+
+
+def load_feed(path):
+    """
+    Load a recorded change feed
+
+    Args:
+        path (str): JSONL file with one ad per line
+
+    Returns:
+        list: Recorded ads in feed order
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def changes_since(feed, date):
+    """
+    Select the feed entries newer than a stream `date` parameter
+
+    Args:
+        feed (list): Recorded ads
+        date (str): ISO timestamp, interpreted as UTC
+
+    Returns:
+        list: Ads changed after `date`
+    """
+    if not date:
+        return feed
+    since = datetime.strptime(date, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    since_ms = since.timestamp() * 1000
+    return [ad for ad in feed if ad.get("timestamp") is None or ad["timestamp"] > since_ms]
+
+
+def filter_hits(hits, filters):
+    """
+    Select the hits matching the location and publication filters of a search
+
+    Args:
+        hits (list): Recorded search hits
+        filters (dict): Query parameters, a list of values each
+
+    Returns:
+        list: Matching hits in recorded order
+    """
+    municipalities = set(filters.get("municipality", []))
+    regions = set(filters.get("region", []))
+    after = filters.get("published-after", [None])[-1]
+    before = filters.get("published-before", [None])[-1]
+
+    def matches(hit):
+        address = hit.get("workplace_address") or {}
+        if municipalities and address.get("municipality_code") and address["municipality_code"] not in municipalities:
+            return False
+        if regions and address.get("region_code") and address["region_code"] not in regions:
+            return False
+        published = hit.get("publication_date")
+        if published and after and published <= after:
+            return False
+        if published and before and published > before:
+            return False
+        return True
+
+    return [hit for hit in hits if matches(hit)]
+
+
+def search_page(search, offset, limit):
+    """
+    Slice a recorded search response into the requested page
+
+    Args:
+        search (dict): Recorded JobTech search response
+        offset (int): Index of the first hit
+        limit (int): Number of hits
+
+    Returns:
+        dict: Search response with only the requested hits
+    """
+    hits = search.get("hits", [])
+    total = search.get("total", {"value": len(hits)})
+    return {"total": total, "hits": hits[offset:offset + limit]}
+
+
+def create_server(host, port, feed=None, search=None, latency=0.0):
+    """
+    Create the stub HTTP server
+
+    Args:
+        host (str): Interface to bind to
+        port (int): Port to bind to (0 picks a free port)
+        feed (list): Recorded change feed served on /stream
+        search (dict): Recorded search response served on /search
+        latency (float): Seconds to wait before answering each request
+
+    Returns:
+        ThreadingHTTPServer: Server ready for serve_forever()
+    """
+    # The caller may fill in the lists it passed while the server runs
+    if feed is None:
+        feed = []
+    if search is None:
+        search = {"total": {"value": 0}, "hits": []}
+    # Filtered responses by filter, so paging through a large recording stays cheap
+    filtered = {}
+    lock = threading.Lock()
+
+    def filtered_search(filters):
+        key = json.dumps(filters, sort_keys=True)
+        with lock:
+            if key not in filtered:
+                if filters:
+                    hits = filter_hits(search.get("hits", []), filters)
+                    filtered[key] = {"total": {"value": len(hits)}, "hits": hits}
+                else:
+                    filtered[key] = search
+            return filtered[key]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            params = {key: values[-1] for key, values in query.items()}
+
+            if url.path.endswith("/stream"):
+                payload = changes_since(feed, params.get("date"))
+            elif url.path.endswith("/search"):
+                filters = {key: values for key, values in query.items() if key in SEARCH_FILTERS}
+                payload = search_page(filtered_search(filters), int(params.get("offset", 0)),
+                                      int(params.get("limit", 100)))
+            else:
+                self.send_error(404)
+                return
+
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.info(format % args)
+
+    return ThreadingHTTPServer((host, port), StubHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded JobTech responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--feed", help="JSONL file with a recorded change feed")
+    parser.add_argument("--search", help="JSON file with a recorded search response")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    feed = load_feed(args.feed) if args.feed else []
+    search = None
+    if args.search:
+        with open(args.search, "r", encoding="utf-8") as f:
+            search = json.load(f)
+
+    server = create_server(args.host, args.port, feed, search, args.latency)
+    logger.info(f"Serving JobTech stub on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
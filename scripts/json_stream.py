@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Streaming, atomic JSON writers
+
+Writes JSON arrays and objects one element at a time, so an export
+never has to hold a whole file in memory. Every file is written to a
+temporary file in the target directory and only renamed over the target
+with os.replace once it is complete. A crash or error halfway leaves
+the previous file in place instead of a truncated one.
+
+In the default indented mode the output is identical to
+json.dump(..., ensure_ascii=False, indent=4). The compact mode leaves out
+all whitespace.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Temporary files are created private; committed files get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+# Indentation of the non-compact output, as in the original exports
+INDENT = 4
+
+# Characters collected before they are encoded and written out
+BUFFER_SIZE = 1 << 16
+
+
+def encode_item(value, compact=False):
+    """
+    Encode a value as an element of a top-level JSON array
+
+    The result can be written to any number of AtomicJsonWriter files
+    with the same compact setting, so each value is serialized only once.
+
+    Args:
+        value: JSON-serializable value or Job
+        compact (bool): Leave out all whitespace
+
+    Returns:
+        str: Encoded element, indented for its position in the array
+    """
+    # Job records cache their compact encoding
+    to_json = getattr(value, "to_json", None)
+    if to_json is not None:
+        if compact:
+            return to_json()
+        value = value.to_dict()
+    if compact:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    # Newlines inside strings are escaped, so every newline here is structural
+    text = json.dumps(value, ensure_ascii=False, indent=INDENT)
+    return " " * INDENT + text.replace("\n", "\n" + " " * INDENT)
+
+
+def encode_member(key, value, compact=False):
+    """
+    Encode a key and value as a member of a top-level JSON object
+
+    Args:
+        key (str): Member name
+        value: JSON-serializable value
+        compact (bool): Leave out all whitespace
+
+    Returns:
+        str: Encoded member, indented for its position in the object
+    """
+    name = json.dumps(str(key), ensure_ascii=False)
+    if compact:
+        return name + ":" + encode_item(value, compact=True)
+    return " " * INDENT + name + ": " + encode_item(value)[INDENT:]
+
+
+def write_atomic(path, data):
+    """
+    Write a complete file atomically
+
+    Args:
+        path (str): Target file
+        data (bytes): File contents
+    """
+    directory, name = os.path.split(path)
+    f = tempfile.NamedTemporaryFile("wb", dir=directory or ".", prefix=f".{name}.", suffix=".tmp", delete=False)
+    try:
+        with f:
+            f.write(data)
+        os.chmod(f.name, FILE_MODE)
+        os.replace(f.name, path)
+    except BaseException:
+        try:
+            os.remove(f.name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class AtomicJsonWriter:
+    """
+    JSON array or object written element by element and renamed into place on commit
+
+    Use it as a context manager: the file is committed when the block
+    ends normally and discarded when it raises.
+
+    Args:
+        path (str): Target file
+        container (str): "array" or "object"
+        compact (bool): Leave out all whitespace; elements must be encoded the same way
+        precompress (bool): Also write .gz (and .br, if the brotli module
+            is installed) variants of the file, compressed on the fly
+    """
+
+    def __init__(self, path, container="array", compact=False, precompress=False):
+        self.path = path
+        self.compact = compact
+        self.items = 0
+        self.seconds = 0.0
+        self._brackets = "[]" if container == "array" else "{}"
+        self.committed = False
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        # (temporary path, final path, file object) of every file being written
+        self._outputs = []
+        self._raw = self._open_temp(path)
+        self._gzip = None
+        self._brotli = None
+        self._brotli_file = None
+        self._buffer = []
+        self._buffered = 0
+        if precompress:
+            # mtime=0 and no file name keep the gzip output identical for identical input
+            self._gzip = gzip.GzipFile(filename="", mode="wb", compresslevel=9,
+                                       fileobj=self._open_temp(path + ".gz"), mtime=0)
+            if brotli is not None:
+                self._brotli = brotli.Compressor()
+                self._brotli_file = self._open_temp(path + ".br")
+
+        self._write(self._brackets[0])
+
+    def _open_temp(self, final_path):
+        directory, name = os.path.split(final_path)
+        f = tempfile.NamedTemporaryFile("wb", dir=directory or ".", prefix=f".{name}.", suffix=".tmp", delete=False)
+        self._outputs.append((f.name, final_path, f))
+        return f
+
+    def _write(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= BUFFER_SIZE:
+            self._flush()
+
+    def _flush(self):
+        start = time.perf_counter()
+        data = "".join(self._buffer).encode("utf-8")
+        self._buffer = []
+        self._buffered = 0
+        self._raw.write(data)
+        if self._gzip is not None:
+            self._gzip.write(data)
+        if self._brotli is not None:
+            self._brotli_file.write(self._brotli.process(data))
+        self.seconds += time.perf_counter() - start
+
+    def write_encoded(self, encoded):
+        """
+        Append an element produced by encode_item or encode_member
+
+        Args:
+            encoded (str): Encoded element
+        """
+        if self.compact:
+            separator = "," if self.items else ""
+        else:
+            separator = ",\n" if self.items else "\n"
+        self._write(separator + encoded)
+        self.items += 1
+
+    def write(self, value):
+        """
+        Append a value to an array file
+        """
+        self.write_encoded(encode_item(value, self.compact))
+
+    def write_member(self, key, value):
+        """
+        Append a member to an object file
+        """
+        self.write_encoded(encode_member(key, value, self.compact))
+
+    def commit(self):
+        """
+        Finish the file and atomically replace the target with it
+        """
+        start = time.perf_counter()
+        closing = self._brackets[1] if self.compact or not self.items else "\n" + self._brackets[1]
+        self._write(closing)
+        self._flush()
+        if self._gzip is not None:
+            self._gzip.close()
+        if self._brotli is not None:
+            self._brotli_file.write(self._brotli.finish())
+        for temp_path, final_path, f in self._outputs:
+            f.close()
+            os.chmod(temp_path, FILE_MODE)
+            os.replace(temp_path, final_path)
+        self.committed = True
+        self.seconds += time.perf_counter() - start
+
+    def abort(self):
+        """
+        Discard the partly written file, leaving the target untouched
+        """
+        for temp_path, _, f in self._outputs:
+            f.close()
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        elif not self.committed:
+            self.abort()
+
+
+class JsonFanOut:
+    """
+    Several JSON array files filled in one pass over a stream
+
+    Each value is serialized once and appended to every file it belongs
+    to. The files are committed together when the block ends normally
+    and all discarded when it raises.
+
+    Args:
+        paths (dict): Target file for each destination name
+        compact (bool): Leave out all whitespace
+    """
+
+    def __init__(self, paths, compact=False):
+        self.compact = compact
+        self.writers = {}
+        try:
+            for name, path in paths.items():
+                self.writers[name] = AtomicJsonWriter(path, compact=compact)
+        except Exception:
+            self.abort()
+            raise
+
+    def write(self, value, names):
+        """
+        Append a value to the files of the given destinations
+
+        Args:
+            value: JSON-serializable value
+            names (iterable): Destination names; unknown names are ignored
+        """
+        encoded = None
+        for name in names:
+            writer = self.writers.get(name)
+            if writer is None:
+                continue
+            if encoded is None:
+                encoded = encode_item(value, self.compact)
+            writer.write_encoded(encoded)
+
+    def commit(self):
+        """
+        Commit every file
+        """
+        for writer in self.writers.values():
+            writer.commit()
+
+    def abort(self):
+        """
+        Discard every file that has not been committed yet
+        """
+        for writer in self.writers.values():
+            if not writer.committed:
+                writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.commit()
+            except Exception:
+                self.abort()
+                raise
+        else:
+            self.abort()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Single-pass keyword matcher for job classification
+
+Compiles the category keywords, consultant keywords and meaningful
+employer keywords into one regex. Each text field of a job is scanned
+once, and every score and flag is derived from the resulting hit sets.
+
+Keywords are matched case-insensitively. Short keywords (acronyms and
+names like "r", "go" or "rest") must start and end at a word boundary.
+Longer keywords match anywhere, so Swedish compounds and inflections
+such as "javakonsult", "kommunen" or "konsulter" still match. A keyword
+that starts or ends with a symbol, like ".net" or "c#", needs no word
+boundary on that side, so "asp.net" contains ".net".
+
+Building a matcher merges the keywords into a prefix tree and derives a
+prefix table. load_matcher caches both on disk as JSON, keyed by the
+rules fingerprint.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+
+from json_stream import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Keywords up to this length must match as whole words
+SHORT_KEYWORD_LENGTH = 4
+
+# Bump when a change to the matching logic alters classifications, or
+# when the keyword index of KeywordMatcher changes (it is cached as JSON)
+MATCHER_VERSION = 2
+
+WORD_CHAR = re.compile(r"\w")
+
+
+def _needs_word_start(keyword):
+    """
+    Check if a keyword may only match at the start of a word
+    """
+    return len(keyword) <= SHORT_KEYWORD_LENGTH and WORD_CHAR.match(keyword[0]) is not None
+
+
+def _needs_word_end(keyword):
+    """
+    Check if a keyword may only match at the end of a word
+    """
+    return len(keyword) <= SHORT_KEYWORD_LENGTH and WORD_CHAR.match(keyword[-1]) is not None
+
+
+def rules_fingerprint(job_categories, consultant_keywords, meaningful_orgs):
+    """
+    Fingerprint a classification rule set
+
+    The fingerprint changes whenever a keyword, a title pattern or the
+    matching logic changes, which is when stored classifications go stale.
+
+    Args:
+        job_categories (dict): Category rules, as in JOB_CATEGORIES
+        consultant_keywords (list): Keywords marking consultant jobs
+        meaningful_orgs (list): Keywords marking meaningful employers
+
+    Returns:
+        str: Hex digest identifying the rule set
+    """
+    rules = {
+        "matcher_version": MATCHER_VERSION,
+        "short_keyword_length": SHORT_KEYWORD_LENGTH,
+        "job_categories": job_categories,
+        "consultant_keywords": consultant_keywords,
+        "meaningful_orgs": meaningful_orgs
+    }
+    encoded = json.dumps(rules, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _trie_pattern(keywords):
+    """
+    Build one regex matching any of the lowercase keywords
+
+    The keywords are merged into a prefix tree, so the regex engine
+    picks a branch by the next character instead of trying every
+    keyword in turn. Longer branches are tried first, so the match at
+    any position is the longest keyword found there. The word boundary
+    checks sit at the end of each keyword's branch; the start check
+    looks back past the keyword just matched.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        leaf = r"(?!\w)" if _needs_word_end(keyword) else ""
+        if _needs_word_start(keyword):
+            leaf = r"(?<!\w" + "." * len(keyword) + ")" + leaf
+        node[""] = leaf
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if "" in node:
+            branches.append(node[""])
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+def _title_pattern(patterns):
+    """
+    Combine a category's title patterns into one case-insensitive regex
+
+    Patterns written in upper case are acronyms (AI, ML, RPA) and only
+    match as whole words, so "AI" does not match inside "mail".
+    """
+    parts = []
+    for pattern in patterns:
+        if pattern.isupper():
+            parts.append(rf"(?<!\w){pattern}(?!\w)")
+        else:
+            parts.append(f"(?:{pattern})")
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+class JobMatch:
+    """
+    Keyword hits for one job, per text field
+    """
+
+    __slots__ = ("title", "title_hits", "description_hits", "employer_hits")
+
+    def __init__(self, title, title_hits, description_hits, employer_hits):
+        self.title = title
+        self.title_hits = title_hits
+        self.description_hits = description_hits
+        self.employer_hits = employer_hits
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher for a set of classification rules
+
+    Args:
+        job_categories (dict): Category rules, as in JOB_CATEGORIES
+        consultant_keywords (list): Keywords marking consultant jobs
+        meaningful_orgs (list): Keywords marking meaningful employers
+        keyword_index (dict): Keyword pattern and prefix table of the same
+            rules from keyword_index(), used instead of rebuilding them
+
+    Raises:
+        ValueError: If keyword_index does not fit the rules
+    """
+
+    def __init__(self, job_categories, consultant_keywords, meaningful_orgs, keyword_index=None):
+        self.categories = {}
+        for category, rules in job_categories.items():
+            self.categories[category] = {
+                "primary_keywords": [keyword.lower() for keyword in rules["primary_keywords"]],
+                "secondary_keywords": [keyword.lower() for keyword in rules["secondary_keywords"]],
+                "exclusion_keywords": [keyword.lower() for keyword in rules["exclusion_keywords"]],
+                "title_pattern": _title_pattern(rules["title_patterns"])
+            }
+        self.consultant_keywords = frozenset(keyword.lower() for keyword in consultant_keywords)
+        self.meaningful_keywords = frozenset(keyword.lower() for keyword in meaningful_orgs)
+
+        keywords = set(self.consultant_keywords) | set(self.meaningful_keywords)
+        for rules in self.categories.values():
+            keywords.update(rules["primary_keywords"])
+            keywords.update(rules["secondary_keywords"])
+            keywords.update(rules["exclusion_keywords"])
+
+        if keyword_index is not None:
+            self._pattern, self._prefixes = self._load_keyword_index(keyword_index, keywords)
+        else:
+            # The regex reports the longest hit at each position, shorter
+            # keywords starting there are derived from the prefix tables below,
+            # one for the start of a word and one for positions inside a word.
+            # Only positions holding the first character of a keyword are tried.
+            ordered = sorted(keywords, key=lambda keyword: (-len(keyword), keyword))
+            first_chars = re.escape("".join(sorted({keyword[0] for keyword in ordered})))
+            self._pattern = re.compile(
+                "(?=[" + first_chars + "])(?=(" + _trie_pattern(ordered) + "))" if ordered else "(?!)"
+            )
+            self._prefixes = {
+                keyword: [
+                    prefix for prefix in ordered
+                    if len(prefix) < len(keyword) and keyword.startswith(prefix)
+                    and not (_needs_word_end(prefix) and WORD_CHAR.match(keyword[len(prefix)]))
+                ]
+                for keyword in ordered
+            }
+        self._inner_prefixes = {
+            keyword: [prefix for prefix in prefixes if not _needs_word_start(prefix)]
+            for keyword, prefixes in self._prefixes.items()
+        }
+
+    @staticmethod
+    def _load_keyword_index(keyword_index, keywords):
+        pattern = keyword_index.get("pattern")
+        prefixes = keyword_index.get("prefixes")
+        if not isinstance(pattern, str) or not isinstance(prefixes, dict) or set(prefixes) != keywords:
+            raise ValueError("Keyword index does not match the rules")
+        for keyword, keyword_prefixes in prefixes.items():
+            if not isinstance(keyword_prefixes, list) or not set(keyword_prefixes) <= keywords:
+                raise ValueError(f"Invalid prefixes for keyword {keyword!r}")
+        try:
+            return re.compile(pattern), prefixes
+        except re.error as e:
+            raise ValueError(f"Invalid keyword pattern: {e}") from None
+
+    def keyword_index(self):
+        """
+        Keyword pattern and prefix table, as plain data that can be stored as JSON
+        """
+        return {"pattern": self._pattern.pattern, "prefixes": self._prefixes}
+
+    def find(self, text):
+        """
+        Find every keyword occurring in a text
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            set: Lowercase keywords found in the text
+        """
+        return self._find_lowercase(text.lower() if text else "")
+
+    def _find_lowercase(self, text):
+        hits = set()
+        if not text:
+            return hits
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1)
+            hits.add(keyword)
+            start = match.start()
+            if start and WORD_CHAR.match(text, start - 1):
+                hits.update(self._inner_prefixes[keyword])
+            else:
+                hits.update(self._prefixes[keyword])
+        return hits
+
+    def match(self, title, description, employer, lowercase=None):
+        """
+        Scan the text fields of a job once
+
+        Args:
+            title (str): Job title
+            description (str): Job description
+            employer (str): Employer name
+            lowercase (tuple): Title, description and employer already in
+                lowercase, scanned instead of the fields when given
+
+        Returns:
+            JobMatch: Keyword hits per field
+        """
+        if lowercase is None:
+            return JobMatch(title or "", self.find(title), self.find(description), self.find(employer))
+        return JobMatch(title or "", *(self._find_lowercase(text) for text in lowercase))
+
+    def is_consultant(self, match):
+        """
+        Check if any consultant keyword occurs in the job
+        """
+        return not self.consultant_keywords.isdisjoint(
+            match.title_hits | match.description_hits | match.employer_hits
+        )
+
+    def is_meaningful(self, match):
+        """
+        Check if any meaningful employer keyword occurs in the job
+        """
+        return not self.meaningful_keywords.isdisjoint(
+            match.title_hits | match.description_hits | match.employer_hits
+        )
+
+    def relevance_score(self, match, category):
+        """
+        Calculate how well a job matches a category
+
+        Args:
+            match (JobMatch): Keyword hits for the job
+            category (str): Category to match against (IT, AI, or RPA)
+
+        Returns:
+            float: Relevance score between 0 and 1
+        """
+        rules = self.categories.get(category)
+        if rules is None:
+            return 0.0
+
+        title_hits = match.title_hits
+        description_hits = match.description_hits
+
+        # Check for exclusion keywords
+        for keyword in rules["exclusion_keywords"]:
+            if keyword in title_hits or keyword in description_hits:
+                return 0.0
+
+        # Title pattern matching (strongest indicator)
+        title_score = 0.8 if rules["title_pattern"].search(match.title) else 0.0
+
+        # Primary keyword matching
+        primary_score = 0.0
+        for keyword in rules["primary_keywords"]:
+            if keyword in title_hits:
+                primary_score += 0.4
+            elif keyword in description_hits:
+                primary_score += 0.2
+
+        # Secondary keyword matching
+        secondary_score = 0.0
+        for keyword in rules["secondary_keywords"]:
+            if keyword in title_hits:
+                secondary_score += 0.2
+            elif keyword in description_hits:
+                secondary_score += 0.1
+
+        # Combine scores, cap at 1.0
+        return min(1.0, title_score + primary_score + secondary_score)
+
+
+def load_matcher(job_categories, consultant_keywords, meaningful_orgs, cache_dir=None):
+    """
+    Get the matcher for a rule set, from the on-disk cache if possible
+
+    The cache holds the merged keyword pattern and the prefix table as
+    JSON, so loading it never runs code from the cache directory; a
+    cache entry that does not fit the rules is rebuilt. Python
+    recompiles the regex from its pattern string. A changed rule set has
+    a different fingerprint and replaces the cached entry.
+
+    Args:
+        job_categories (dict): Category rules, as in JOB_CATEGORIES
+        consultant_keywords (list): Keywords marking consultant jobs
+        meaningful_orgs (list): Keywords marking meaningful employers
+        cache_dir (str): Cache directory (None = no cache)
+
+    Returns:
+        KeywordMatcher: Matcher for the rule set
+    """
+    if cache_dir is None:
+        return KeywordMatcher(job_categories, consultant_keywords, meaningful_orgs)
+
+    fingerprint = rules_fingerprint(job_categories, consultant_keywords, meaningful_orgs)
+    path = os.path.join(cache_dir, f"matcher-{fingerprint}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return KeywordMatcher(job_categories, consultant_keywords, meaningful_orgs, json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable matcher cache {path}: {e}")
+
+    matcher = KeywordMatcher(job_categories, consultant_keywords, meaningful_orgs)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomic(path, json.dumps(matcher.keyword_index(), ensure_ascii=False).encode("utf-8"))
+        # Entries of earlier rule sets, and matchers pickled by older versions
+        for stale in glob.glob(os.path.join(cache_dir, "matcher-*")):
+            if stale != path:
+                os.remove(stale)
+    except OSError as e:
+        logger.warning(f"Could not cache the matcher in {cache_dir}: {e}")
+    return matcher
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for job ads
+
+The same ad often comes back under a new id, either reposted on
+JobTech or returned by another source. Ids alone cannot catch that, so
+every ad gets a MinHash signature of its normalized title, employer and
+description:
+
+- The text is folded and tokenized like the search index, and split
+  into overlapping word shingles.
+- One-permutation MinHash hashes each shingle once and keeps the
+  smallest hash per bin. Empty bins borrow from their neighbours
+  (densification), so short ads still get a full signature.
+- LSH banding groups signatures that agree on a whole band of bins, so
+  only ads that share a bucket are compared. The cost grows with the
+  number of ads, not with the number of pairs.
+- Candidate pairs whose signatures agree on at least
+  SIMILARITY_THRESHOLD of the bins are merged into clusters. The first
+  ad of a cluster is its representative, and an ad only joins a cluster
+  if it also meets the threshold against the representative. Ads that
+  are each similar to a third ad, but not to each other, therefore do
+  not chain into one cluster, e.g. ads of one employer that share long
+  boilerplate.
+"""
+
+import hashlib
+from array import array
+from operator import eq
+
+from search_index import tokenize
+
+# Number of MinHash bins per signature
+NUM_BINS = 64
+
+# LSH banding: BANDS * ROWS must equal NUM_BINS. A pair becomes a
+# candidate when it agrees on at least MIN_SHARED_BANDS whole bands. That
+# happens to about a quarter of the pairs with a Jaccard similarity of
+# 0.5 and to more than 99% of the pairs above 0.8.
+BANDS = 16
+ROWS = 4
+MIN_SHARED_BANDS = 2
+
+# Share of equal bins from which two ads count as the same ad
+SIMILARITY_THRESHOLD = 0.8
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Members of an LSH bucket a new signature is compared with. Boilerplate
+# can put thousands of ads into one bucket; real duplicates are almost
+# always found among the most recent members of some bucket.
+MAX_BUCKET_COMPARISONS = 32
+
+# Bits of each hash used as the MinHash value; the top bits pick the bin
+_VALUE_BITS = 52
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_BIN_SHIFT = 64 - (NUM_BINS - 1).bit_length()
+_EMPTY = 1 << 64
+
+
+def shingles(title, employer, description):
+    """
+    Split an ad into the set of its word shingles
+
+    Args:
+        title (str): Job title
+        employer (str): Employer name
+        description (str): Job description
+
+    Returns:
+        set: Shingles, or single words for very short texts
+    """
+    words = tokenize(" ".join(text or "" for text in (title, employer, description)))
+    if len(words) < SHINGLE_SIZE:
+        return set(words)
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(title, employer, description):
+    """
+    Compute the MinHash signature of an ad
+
+    Args:
+        title (str): Job title
+        employer (str): Employer name
+        description (str): Job description
+
+    Returns:
+        bytes: NUM_BINS unsigned 64-bit values, or None for an ad without text
+    """
+    bins = [_EMPTY] * NUM_BINS
+    for shingle in shingles(title, employer, description):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        index = value >> _BIN_SHIFT
+        value &= _VALUE_MASK
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == _EMPTY for value in bins):
+        return None
+
+    # Rotation densification: an empty bin takes the value of the next
+    # filled bin to its right, offset by the distance so that borrowed
+    # values never equal real ones
+    original = list(bins)
+    for index in range(NUM_BINS):
+        if original[index] != _EMPTY:
+            continue
+        distance = 1
+        while original[(index + distance) % NUM_BINS] == _EMPTY:
+            distance += 1
+        bins[index] = original[(index + distance) % NUM_BINS] + (distance << _VALUE_BITS)
+
+    return array("Q", bins).tobytes()
+
+
+def similarity(signature_a, signature_b):
+    """
+    Estimate the Jaccard similarity of two ads from their signatures
+
+    Returns:
+        float: Share of equal bins, between 0 and 1
+    """
+    return sum(map(eq, _values(signature_a), _values(signature_b))) / NUM_BINS
+
+
+def _values(item_signature):
+    return memoryview(item_signature).cast("Q")
+
+
+def _similar(values_a, values_b):
+    return sum(map(eq, values_a, values_b)) >= SIMILARITY_THRESHOLD * NUM_BINS
+
+
+class _DisjointSet:
+    """
+    Union-find over item positions, with the members of every set
+
+    The root of a set is its first item.
+    """
+
+    def __init__(self):
+        self.parent = []
+        self.members = {}
+
+    def add(self):
+        position = len(self.parent)
+        self.parent.append(position)
+        self.members[position] = [position]
+        return position
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a != root_b:
+            root, joining = min(root_a, root_b), max(root_a, root_b)
+            self.parent[joining] = root
+            self.members[root].extend(self.members.pop(joining))
+
+
+def find_clusters(items):
+    """
+    Group items whose signatures are near-duplicates
+
+    Args:
+        items (iterable): (key, signature) pairs; items without a
+            signature are never grouped
+
+    Returns:
+        list: Clusters of two or more keys, each in input order
+    """
+    keys = []
+    values = []
+    sets = _DisjointSet()
+    buckets = {}
+    band_size = ROWS * 8
+
+    for key, item_signature in items:
+        position = sets.add()
+        keys.append(key)
+        values.append(None if item_signature is None else tuple(_values(item_signature)))
+        if item_signature is None:
+            continue
+
+        # Count the bands shared with earlier signatures
+        shared = {}
+        for band in range(BANDS):
+            bucket_key = (band, item_signature[band * band_size:(band + 1) * band_size])
+            members = buckets.setdefault(bucket_key, [])
+            for other in members[-MAX_BUCKET_COMPARISONS:]:
+                shared[other] = shared.get(other, 0) + 1
+            members.append(position)
+
+        own = values[position]
+        for other, count in shared.items():
+            if count < MIN_SHARED_BANDS:
+                continue
+            root_other, root_own = sets.find(other), sets.find(position)
+            if root_other == root_own or not _similar(own, values[other]):
+                continue
+            # Every member of the joining cluster must be similar to the
+            # representative of the merged cluster, its first item
+            representative = values[min(root_other, root_own)]
+            if all(_similar(values[member], representative) for member in sets.members[max(root_other, root_own)]):
+                sets.union(position, other)
+
+    clusters = {}
+    for position in range(len(keys)):
+        clusters.setdefault(sets.find(position), []).append(keys[position])
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
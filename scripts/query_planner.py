@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Query planner for the JobTech search API
+
+Searching every term in every location as free text ("systemutvecklare
+Göteborg") makes the API match fuzzily, returns heavily overlapping
+result sets and costs one paginated search per term and location. The
+planner turns the search configuration into a few structured requests
+instead:
+
+- every configured region gets its own requests, filtered by the
+  region or by its configured municipalities, so the work can be
+  sharded and retried per region
+- the search terms of a category become one free-text query, with the
+  terms OR-combined and multi-word terms quoted
+- categories with occupation fields get one request for the whole
+  field, which covers ads that use none of the search terms
+- requests of a region with the same filters are merged into one
+
+A request with more hits than the API can page through is split by
+municipality, or by publication date when it covers a single
+municipality or a whole region.
+"""
+
+import logging
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+# Ages in days at which an oversized search is split by publication date:
+# the last 7 days, 7 to 30 days ago, 30 to 90 days ago and older
+PUBLICATION_WINDOWS = (7, 30, 90)
+
+# Format of the published-after and published-before filters
+PUBLISHED_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def quote_term(term):
+    """
+    Quote a multi-word term, so the API matches it as a phrase
+    """
+    return f'"{term}"' if " " in term else term
+
+
+class PlannedRequest:
+    """
+    One structured JobTech search, covering one or more categories
+
+    Args:
+        categories (iterable): Categories the request searches for
+        terms (iterable): Free-text terms, OR-combined (empty = no free text)
+        occupation_fields (iterable): Occupation field concept ids
+        municipalities (iterable): Municipality codes (empty = the whole region)
+        locations (iterable): Location names of the municipalities or the region, for logging
+        region (str): Region code the request belongs to
+        published_after (str): Only ads published after this time
+        published_before (str): Only ads published before this time
+    """
+
+    __slots__ = ("categories", "terms", "occupation_fields", "municipalities", "locations", "region",
+                 "published_after", "published_before")
+
+    def __init__(self, categories, terms, occupation_fields, municipalities, locations, region=None,
+                 published_after=None, published_before=None):
+        self.categories = tuple(categories)
+        self.terms = tuple(terms)
+        self.occupation_fields = tuple(occupation_fields)
+        self.municipalities = tuple(municipalities)
+        self.locations = tuple(locations)
+        self.region = region
+        self.published_after = published_after
+        self.published_before = published_before
+
+    def filter_key(self):
+        """
+        Requests with the same filter key can be merged by combining their terms
+        """
+        return (self.region, bool(self.terms), self.occupation_fields, self.municipalities)
+
+    def params(self):
+        """
+        Build the query parameters, without offset and limit
+        """
+        params = {}
+        if self.terms:
+            params["q"] = " ".join(quote_term(term) for term in self.terms)
+        if self.occupation_fields:
+            params["occupation-field"] = list(self.occupation_fields)
+        if self.municipalities:
+            params["municipality"] = list(self.municipalities)
+        elif self.region:
+            params["region"] = [self.region]
+        if self.published_after:
+            params["published-after"] = self.published_after
+        if self.published_before:
+            params["published-before"] = self.published_before
+        return params
+
+    def _copy(self, municipalities, locations, published_after=None, published_before=None):
+        return PlannedRequest(self.categories, self.terms, self.occupation_fields, municipalities, locations,
+                              self.region, published_after, published_before)
+
+    def can_split(self):
+        """
+        Check if split() can divide the request any further
+        """
+        return len(self.municipalities) > 1 or not (self.published_after or self.published_before)
+
+    def split(self, now):
+        """
+        Split into smaller requests, for result sets larger than the API's
+        offset limit: one per municipality, or else one per publication
+        window of PUBLICATION_WINDOWS
+
+        Args:
+            now (datetime): Current time, the windows are counted back from it
+
+        Returns:
+            list: PlannedRequest objects covering the same ads
+        """
+        if len(self.municipalities) > 1:
+            return self.split_by_municipality()
+        bounds = [None] + [(now - timedelta(days=days)).strftime(PUBLISHED_FORMAT)
+                           for days in PUBLICATION_WINDOWS] + [None]
+        return [
+            self._copy(self.municipalities, self.locations, after, before)
+            for before, after in zip(bounds, bounds[1:])
+        ]
+
+    def split_by_municipality(self):
+        """
+        Split into one request per municipality, for result sets larger
+        than the API's offset limit
+
+        Returns:
+            list: One PlannedRequest per municipality
+        """
+        return [
+            self._copy([municipality], [location], self.published_after, self.published_before)
+            for municipality, location in zip(self.municipalities, self.locations)
+        ]
+
+    def describe(self):
+        """
+        Short description for the logs
+        """
+        parts = []
+        if self.terms:
+            parts.append(f"{len(self.terms)} terms")
+        if self.occupation_fields:
+            parts.append("occupation field " + ", ".join(self.occupation_fields))
+        parts.append("in " + ", ".join(self.locations))
+        if self.published_after or self.published_before:
+            parts.append(f"published {self.published_after or '…'} to {self.published_before or 'now'}")
+        return f"{'/'.join(self.categories)} search: " + " ".join(parts)
+
+
+def naive_request_count(search_queries, locations):
+    """
+    Number of searches the free-text fan-out over terms and locations needs
+    """
+    return sum(len(terms) for terms in search_queries.values()) * len(locations)
+
+
+def plan_requests(search_queries, occupation_fields, regions):
+    """
+    Plan the structured searches for all categories, region by region
+
+    Args:
+        search_queries (dict): Free-text terms per category, as in SEARCH_QUERIES
+        occupation_fields (dict): Occupation field concept ids per category
+        regions (list): Region objects from the search configuration
+
+    Returns:
+        list: PlannedRequest objects in region order, overlapping requests
+            of a region merged
+    """
+    requests = []
+    for region in regions:
+        municipalities = list(region.municipalities.values())
+        for category, terms in search_queries.items():
+            if terms:
+                requests.append(PlannedRequest([category], terms, [], municipalities, region.locations, region.code))
+            fields = occupation_fields.get(category) or []
+            if fields:
+                requests.append(PlannedRequest([category], [], sorted(fields), municipalities, region.locations,
+                                               region.code))
+
+    merged = {}
+    for request in requests:
+        key = request.filter_key()
+        if key not in merged:
+            merged[key] = request
+            continue
+        existing = merged[key]
+        merged[key] = PlannedRequest(
+            existing.categories + tuple(c for c in request.categories if c not in existing.categories),
+            existing.terms + tuple(t for t in request.terms if t not in existing.terms),
+            existing.occupation_fields, existing.municipalities, existing.locations, existing.region
+        )
+
+    planned = list(merged.values())
+    locations = [location for region in regions for location in region.locations]
+    logger.info(f"Planned {len(planned)} structured searches in {len(regions)} regions instead of "
+                f"{naive_request_count(search_queries, locations)} free-text searches")
+    return planned
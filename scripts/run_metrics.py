@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the job scraper
+
+Collects where a run spends its time and how many jobs each stage lets
+through. This covers:
+
+- every HTTP request: latency, time spent waiting for the rate limiter,
+  bytes received and retries
+- every search: pages fetched and jobs retrieved
+- stages: wall-clock time and CPU time of the thread running the stage,
+  accumulated over all calls
+- counters: jobs per stage, including the ones dropped along the way
+- every output file: write time and size
+
+The collected metrics are written as run_metrics.json. An optional
+cProfile profiler can be attached to selected stages.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, fraction):
+    """
+    Nearest-rank percentile of a non-empty list of values
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for the metrics of one scraper run
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = datetime.now(timezone.utc)
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self.stages = {}
+        self.counters = {}
+        self.requests = []
+        self.searches = []
+        self.files = []
+        self.profiler = None
+
+    def enable_profiling(self):
+        """
+        Profile the stages entered with profile=True
+        """
+        self.profiler = cProfile.Profile()
+
+    @contextmanager
+    def stage(self, name, profile=False):
+        """
+        Time a block and add it to a stage
+
+        CPU time is measured for the calling thread only, so work done
+        by fetch workers in the background is not counted.
+
+        Args:
+            name (str): Stage name
+            profile (bool): Run the block under the profiler, if enabled
+        """
+        profiler = self.profiler if profile else None
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self._add_stage(name, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+
+    def _add_stage(self, name, wall_seconds, cpu_seconds):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            stage["calls"] += 1
+            stage["wall_seconds"] += wall_seconds
+            stage["cpu_seconds"] += cpu_seconds
+
+    def iterate(self, name, iterable):
+        """
+        Yield from an iterable, adding the time spent waiting for each item to a stage
+
+        Args:
+            name (str): Stage name
+            iterable (iterable): Source to wrap, e.g. a stream of fetched jobs
+
+        Yields:
+            Items of the iterable
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, amount=1):
+        """
+        Add to a counter
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_counts(self, counts):
+        """
+        Add every value of a dict of counts to the counters of the same name
+        """
+        for name, amount in counts.items():
+            self.count(name, amount)
+
+    def record_request(self, url, status, latency, wait, size, retries, error=None):
+        """
+        Record one HTTP request, including its retries
+
+        Args:
+            url (str): Request URL without parameters
+            status (int): Status code of the last response, None if there was none
+            latency (float): Seconds spent in HTTP calls
+            wait (float): Seconds spent waiting for the rate limiter
+            size (int): Bytes received in the final response body
+            retries (int): Number of retries after 429 responses
+            error (str): Error message if the request failed
+        """
+        record = {
+            "url": url,
+            "status": status,
+            "latency_seconds": round(latency, 4),
+            "wait_seconds": round(wait, 4),
+            "bytes": size,
+            "retries": retries
+        }
+        if error is not None:
+            record["error"] = error
+        with self._lock:
+            self.requests.append(record)
+
+    def record_search(self, source, query, location, pages, jobs, total_hits=None):
+        """
+        Record one paginated search
+        """
+        with self._lock:
+            self.searches.append({
+                "source": source,
+                "query": query,
+                "location": location,
+                "pages": pages,
+                "jobs": jobs,
+                "total_hits": total_hits
+            })
+
+    def record_file(self, path, seconds, **extra):
+        """
+        Record one written output file with its write time and size
+        """
+        record = {"path": path, "seconds": round(seconds, 4)}
+        if os.path.exists(path):
+            record["bytes"] = os.path.getsize(path)
+        record.update(extra)
+        with self._lock:
+            self.files.append(record)
+
+    def request_summary(self):
+        """
+        Summarize the recorded requests
+        """
+        with self._lock:
+            requests = list(self.requests)
+        latencies = [record["latency_seconds"] for record in requests]
+        summary = {
+            "count": len(requests),
+            "errors": sum(1 for record in requests if "error" in record),
+            "retries": sum(record["retries"] for record in requests),
+            "bytes": sum(record["bytes"] for record in requests),
+            "wait_seconds": round(sum(record["wait_seconds"] for record in requests), 4)
+        }
+        if latencies:
+            summary.update({
+                "latency_mean_seconds": round(statistics.mean(latencies), 4),
+                "latency_p50_seconds": _percentile(latencies, 0.5),
+                "latency_p95_seconds": _percentile(latencies, 0.95),
+                "latency_max_seconds": max(latencies)
+            })
+        return summary
+
+    def to_dict(self):
+        """
+        Build the run_metrics.json document
+        """
+        with self._lock:
+            stages = {
+                name: {
+                    "calls": stage["calls"],
+                    "wall_seconds": round(stage["wall_seconds"], 4),
+                    "cpu_seconds": round(stage["cpu_seconds"], 4)
+                }
+                for name, stage in self.stages.items()
+            }
+            report = {
+                "started": self.started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "wall_seconds": round(time.perf_counter() - self._start_wall, 4),
+                "cpu_seconds": round(time.process_time() - self._start_cpu, 4),
+                "stages": stages,
+                "counters": dict(self.counters),
+                "searches": list(self.searches),
+                "files": list(self.files),
+                "requests": list(self.requests)
+            }
+        report["request_summary"] = self.request_summary()
+        return report
+
+    def save(self, path):
+        """
+        Write the metrics as JSON
+
+        Args:
+            path (str): Target file
+        """
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+            logger.info(f"Saved run metrics to {path}")
+        except Exception as e:
+            logger.error(f"Error saving run metrics to {path}: {e}")
+
+    def dump_profile(self, path):
+        """
+        Write the collected profile in pstats format, if profiling is enabled
+
+        Args:
+            path (str): Target file, readable with `python -m pstats`
+        """
+        if self.profiler is None:
+            return
+        try:
+            self.profiler.dump_stats(path)
+            logger.info(f"Saved classification profile to {path}")
+        except Exception as e:
+            logger.error(f"Error saving profile to {path}: {e}")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Search configuration: regions, search terms and job categories
+
+The areas to search and the categories to search for are read from a
+JSON file (search_config.json in the repository root by default), so
+covering more of Sweden is a configuration change. The file has these
+keys:
+
+- regions: the regions (län) to search, each with its two-digit region
+  code, a name and optionally the municipalities to limit the search
+  to, by name with their four-digit municipality codes. A region
+  without municipalities is searched as a whole.
+- default_regions: region codes the website shows first (optional,
+  default: all regions)
+- search_queries: free-text search terms per category
+- occupation_fields: JobTech occupation field ids searched as a whole,
+  per category
+- job_categories: the keyword rules of each category, see KeywordMatcher
+
+search_config.nationwide.json lists all 21 regions, which covers all
+290 municipalities.
+"""
+
+import json
+import re
+
+
+class Region:
+    """
+    One region (län) of the search area
+
+    Args:
+        code (str): Two-digit region code, e.g. "14"
+        name (str): Region name
+        municipalities (dict): Municipality code per municipality name to
+            limit the search to (empty = the whole region)
+    """
+
+    __slots__ = ("code", "name", "municipalities")
+
+    def __init__(self, code, name, municipalities=None):
+        self.code = code
+        self.name = name
+        self.municipalities = dict(municipalities or {})
+
+    @property
+    def locations(self):
+        """
+        Names of the searched locations: the municipalities, or the region itself
+        """
+        return list(self.municipalities) or [self.name]
+
+    def contains(self, municipality, municipality_code=None):
+        """
+        Check if a municipality in this region is part of the search area
+        """
+        if not self.municipalities:
+            return True
+        return municipality in self.municipalities or municipality_code in self.municipalities.values()
+
+
+class SearchConfig:
+    """
+    Parsed search configuration
+
+    Attributes:
+        regions (list): Region objects in configuration order
+        default_regions (list): Codes of the regions the website shows first
+        search_queries (dict): Free-text terms per category
+        occupation_fields (dict): Occupation field ids per category
+        job_categories (dict): Keyword rules per category
+    """
+
+    def __init__(self, regions, search_queries, occupation_fields, job_categories, default_regions=None):
+        self.regions = list(regions)
+        self.search_queries = search_queries
+        self.occupation_fields = occupation_fields
+        self.job_categories = job_categories
+        self.by_code = {region.code: region for region in self.regions}
+        self.default_regions = list(default_regions or self.by_code)
+        # Every configured municipality name points at its region
+        self._region_by_location = {}
+        for region in self.regions:
+            for location in region.locations:
+                self._region_by_location.setdefault(location, region.code)
+
+    @property
+    def locations(self):
+        """
+        Names of all searched locations
+        """
+        return [location for region in self.regions for location in region.locations]
+
+    @property
+    def municipality_codes(self):
+        """
+        Municipality code per configured municipality name
+        """
+        return {name: code for region in self.regions for name, code in region.municipalities.items()}
+
+    def region_of(self, address=None, location=None):
+        """
+        Find the region code of a JobTech workplace address or a location name
+
+        Args:
+            address (dict): Workplace address of a JobTech ad
+            location (str): Municipality or region name, used when the
+                address has no region or municipality code
+
+        Returns:
+            str: Two-digit region code, None if it cannot be told
+        """
+        address = address or {}
+        code = address.get("region_code")
+        if code:
+            return str(code).zfill(2)
+        municipality_code = address.get("municipality_code")
+        if municipality_code:
+            # Municipality codes start with the code of their region
+            return str(municipality_code).zfill(4)[:2]
+        return self._region_by_location.get(address.get("municipality") or location)
+
+    def contains(self, address):
+        """
+        Check if a JobTech workplace address lies in the search area
+        """
+        if not address:
+            return False
+        region = self.by_code.get(self.region_of(address))
+        return region is not None and region.contains(address.get("municipality"), address.get("municipality_code"))
+
+
+def parse_search_config(data):
+    """
+    Validate a decoded configuration and build a SearchConfig
+
+    Raises:
+        ValueError: If a key is missing or a region or municipality code is invalid
+    """
+    try:
+        regions = []
+        for entry in data["regions"]:
+            code = str(entry["code"])
+            if not re.fullmatch(r"\d\d", code):
+                raise ValueError(f"Invalid region code {code!r}, expected two digits")
+            municipalities = entry.get("municipalities") or {}
+            for name, municipality_code in municipalities.items():
+                if not re.fullmatch(r"\d{4}", str(municipality_code)) or not str(municipality_code).startswith(code):
+                    raise ValueError(f"Invalid municipality code {municipality_code!r} for {name} in region {code}")
+            regions.append(Region(code, entry["name"], municipalities))
+        config = SearchConfig(
+            regions, data["search_queries"], data.get("occupation_fields") or {}, data["job_categories"],
+            data.get("default_regions")
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid search configuration: {e!r}") from None
+    if len(config.by_code) != len(config.regions):
+        raise ValueError("Every region may only be configured once")
+    unknown = [code for code in config.default_regions if code not in config.by_code]
+    if unknown:
+        raise ValueError(f"Default regions {', '.join(unknown)} are not configured")
+    return config
+
+
+def load_search_config(path):
+    """
+    Read the search configuration from a JSON file
+
+    Args:
+        path (str): Configuration file
+
+    Returns:
+        SearchConfig: Parsed configuration
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a valid configuration
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_search_config(json.load(f))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Build-time inverted search index for the website
+
+Maps normalized terms from title, employer and description, as well as
+the filter facets (employer, location, category, meaningful, high
+relevance), to posting lists. A posting is the position of a job in the
+listing index (data/jobs_index.json). Posting lists are sorted and
+delta-encoded to keep the file small.
+
+index.html normalizes queries the same way as fold_text and tokenize
+below, and answers searches and filters by intersecting posting lists.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index format or the normalization changes
+SEARCH_INDEX_VERSION = 2
+
+# Jobs at or above this relevance score are "highly relevant" on the website
+HIGH_RELEVANCE_SCORE = 70
+
+# Frequent words that would only bloat the index
+STOPWORDS = frozenset([
+    "och", "att", "det", "som", "en", "ett", "av", "for", "med", "till", "pa", "ar",
+    "om", "har", "den", "de", "vi", "du", "dig", "din", "ditt", "dina", "oss", "var",
+    "vara", "kan", "ska", "eller", "inom", "hos", "ocksa", "samt", "sa", "fran", "men",
+    "the", "and", "to", "of", "in", "for", "with", "on", "at", "is", "are", "as",
+    "be", "or", "an", "by", "our", "we", "you", "your", "will", "from", "this", "that"
+])
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+[#+]*")
+
+
+def fold_text(text):
+    """
+    Lowercase a text and fold diacritics, so "Göteborg" and "goteborg"
+    produce the same terms
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Lowercase text without diacritics (å, ä and ö become a, a and o)
+    """
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """
+    Split a text into normalized search terms
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: Terms of at least two characters, without stopwords
+    """
+    return [
+        token for token in TOKEN_PATTERN.findall(fold_text(text))
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def delta_encode(postings):
+    """
+    Encode a sorted posting list as the differences between neighbours
+    """
+    encoded = []
+    previous = 0
+    for posting in postings:
+        encoded.append(posting - previous)
+        previous = posting
+    return encoded
+
+
+def _encode_postings(index):
+    return {key: delta_encode(postings) for key, postings in sorted(index.items())}
+
+
+class SearchIndexBuilder:
+    """
+    Inverted index built one job at a time, in listing index order
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.terms = {}
+        self.employers = {}
+        self.locations = {}
+        self.categories = {}
+        self.meaningful = []
+        self.high_relevance = []
+
+    def add(self, job):
+        """
+        Add the next job of the listing index
+
+        Args:
+            job (dict): Job in the standard format
+        """
+        position = self.count
+        self.count += 1
+        text = " ".join(str(job.get(field) or "") for field in ("title", "employer", "location", "description"))
+        for term in set(tokenize(text)):
+            self.terms.setdefault(term, []).append(position)
+
+        self.employers.setdefault(job.get("employer") or "", []).append(position)
+        self.locations.setdefault(job.get("location") or "", []).append(position)
+        self.categories.setdefault(job.get("category") or "", []).append(position)
+        if job.get("is_meaningful"):
+            self.meaningful.append(position)
+        if (job.get("relevance_score") or 0) >= HIGH_RELEVANCE_SCORE:
+            self.high_relevance.append(position)
+
+    def build(self, listing_version=None):
+        """
+        Build the search index from the jobs added so far
+
+        Args:
+            listing_version (int): Change log version of the listing the
+                index was built for; index.html only uses an index whose
+                version matches the listing it loaded
+
+        Returns:
+            dict: Search index ready to be serialized
+        """
+        return {
+            "version": SEARCH_INDEX_VERSION,
+            "listing_version": listing_version,
+            "count": self.count,
+            "stopwords": sorted(STOPWORDS),
+            "terms": _encode_postings(self.terms),
+            "employers": _encode_postings(self.employers),
+            "locations": _encode_postings(self.locations),
+            "categories": _encode_postings(self.categories),
+            "meaningful": delta_encode(self.meaningful),
+            "high_relevance": delta_encode(self.high_relevance)
+        }
+
+
+def build_search_index(jobs):
+    """
+    Build the inverted index for jobs in listing index order
+
+    Args:
+        jobs (iterable): Jobs in the standard format, in the same order
+            as they appear in the listing index
+
+    Returns:
+        dict: Search index ready to be serialized
+    """
+    builder = SearchIndexBuilder()
+    for job in jobs:
+        builder.add(job)
+    return builder.build()
+
+
+def encode_search_index(index):
+    """
+    Serialize a search index as compact UTF-8 JSON
+    """
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic job ads for benchmarks
+
+Generates ads shaped like JobTech search hits, with Swedish titles,
+employers and descriptions. The mix of roles is chosen so that every
+classification path is exercised: IT, AI and RPA jobs, consultant ads,
+meaningful public-sector employers and jobs that match no category.
+Dates are relative to the day the ads are generated, so the ads are
+current whenever a benchmark runs. The same seed and count produce the
+same ads on the same day.
+
+Usage:
+    python scripts/synthetic_jobs.py --count 10000 --output search.json
+    python scripts/jobtech_stub_server.py --search search.json
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+# Scales used by the benchmark suite
+DEFAULT_SCALES = [1000, 10000, 100000]
+
+# Time of day of the reference time, so ads generated on one day are identical
+REFERENCE_HOUR = 8
+
+MUNICIPALITIES = ["Göteborg", "Kungsbacka", "Mölndal", "Partille", "Kungälv", "Alingsås"]
+
+# Municipality codes; the first two digits are the region code
+MUNICIPALITY_CODES = {
+    "Göteborg": "1480", "Kungsbacka": "1384", "Mölndal": "1481",
+    "Partille": "1402", "Kungälv": "1482", "Alingsås": "1489"
+}
+
+PUBLIC_EMPLOYERS = [
+    "Göteborgs Stad", "Kungsbacka kommun", "Västra Götalandsregionen", "Region Halland",
+    "Försäkringskassan", "Skatteverket", "Göteborgs universitet", "Chalmers tekniska högskola",
+    "Trafikverket", "Polismyndigheten", "Sahlgrenska Universitetssjukhuset", "Lantmäteriet"
+]
+
+PRIVATE_EMPLOYERS = [
+    "Volvo Cars", "SKF", "Ericsson", "Stena Line", "Hasselblad", "Mölnlycke Health Care",
+    "Essity", "Zenseact", "Polestar", "Astrazeneca", "Nordisk Mjukvara AB", "Västkustens Data AB"
+]
+
+CONSULTANT_EMPLOYERS = ["Konsultbolaget Väst AB", "Academic Work", "Experis", "Nexer", "Sigma IT Consulting"]
+
+# Role templates: (title, phrases used in the description)
+ROLES = {
+    "IT": [
+        ("Systemutvecklare", ["utveckla och förvalta våra system", "Java och Python", "agila team", "REST API:er"]),
+        ("Fullstackutvecklare", ["JavaScript, React och Node.js", "moderna webbapplikationer", "CI/CD", "molntjänster i Azure"]),
+        ("IT-tekniker", ["support till våra användare", "nätverk och infrastruktur", "ITIL", "felsökning av klienter"]),
+        ("Systemförvaltare", ["förvaltning av verksamhetssystem", "SQL-databaser", "kravställning", "systemintegration"]),
+        ("DevOps Engineer", ["Kubernetes och Docker", "automatiserade driftsättningar", "Linux", "övervakning"]),
+        ("IT-säkerhetsspecialist", ["informationssäkerhet", "cybersäkerhet", "riskanalyser", "säkerhetsarkitektur"]),
+    ],
+    "AI": [
+        ("Data Scientist", ["maskininlärning", "statistiska modeller", "Python och pandas", "dataanalys"]),
+        ("AI-utvecklare", ["artificiell intelligens", "neurala nätverk", "deep learning", "TensorFlow och PyTorch"]),
+        ("Machine Learning Engineer", ["machine learning", "MLOps", "natural language processing", "prediktiva modeller"]),
+    ],
+    "RPA": [
+        ("RPA-utvecklare", ["UiPath", "robotic process automation", "automatisering av processer", "Blue Prism"]),
+        ("Automationsutvecklare", ["automatisera manuella flöden", "UiPath Studio", "processautomation", "Power Automate"]),
+    ],
+    "OTHER": [
+        ("Undersköterska", ["omvårdnad", "patientnära arbete", "hemtjänst", "schemalagd tjänstgöring"]),
+        ("Ekonomiassistent", ["leverantörsreskontra", "bokslut", "fakturahantering", "ekonomisystem"]),
+        ("Lagerarbetare", ["truckkort", "plock och pack", "skiftarbete", "godsmottagning"]),
+        ("Förskollärare", ["pedagogisk verksamhet", "barngrupper", "läroplanen", "samarbete med vårdnadshavare"]),
+    ],
+}
+
+# Share of ads per role group
+ROLE_WEIGHTS = {"IT": 0.45, "AI": 0.1, "RPA": 0.05, "OTHER": 0.4}
+
+INTRO_SENTENCES = [
+    "Vi söker nu en {title} till vår verksamhet i {municipality}.",
+    "Är du vår nya {title}? Välkommen till oss i {municipality}!",
+    "{employer} växer och behöver förstärka teamet med en {title}.",
+]
+
+BODY_SENTENCES = [
+    "I rollen kommer du att arbeta med {phrase}.",
+    "Du har erfarenhet av {phrase} och trivs med att ta eget ansvar.",
+    "Det är meriterande om du har arbetat med {phrase}.",
+    "Hos oss får du möjlighet att utvecklas inom {phrase}.",
+    "Tjänsten innebär nära samarbete med kollegor inom {phrase}.",
+]
+
+OUTRO_SENTENCES = [
+    "Vi erbjuder en flexibel arbetsplats med goda möjligheter till distansarbete.",
+    "Tjänsten är en tillsvidareanställning på heltid med sex månaders provanställning.",
+    "Urval sker löpande, så välkommen med din ansökan redan idag.",
+    "Vi värdesätter de kvaliteter som mångfald tillför verksamheten.",
+]
+
+CONSULTANT_SENTENCES = [
+    "Uppdraget är på konsultbasis hos en av våra kunder.",
+    "Som konsult hos oss arbetar du i spännande kunduppdrag.",
+]
+
+
+def _description(rng, title, employer, municipality, phrases, consultant):
+    sentences = [rng.choice(INTRO_SENTENCES).format(title=title.lower(), employer=employer, municipality=municipality)]
+    for phrase in rng.sample(phrases, k=rng.randint(2, len(phrases))):
+        sentences.append(rng.choice(BODY_SENTENCES).format(phrase=phrase))
+    if consultant:
+        sentences.append(rng.choice(CONSULTANT_SENTENCES))
+    sentences.extend(rng.sample(OUTRO_SENTENCES, k=2))
+
+    # Split into a few paragraphs, as real ads are
+    paragraphs = []
+    while sentences:
+        size = rng.randint(2, 3)
+        paragraphs.append(" ".join(sentences[:size]))
+        sentences = sentences[size:]
+    return "\n\n".join(paragraphs)
+
+
+def reference_time():
+    """
+    Reference time of the generated dates: today at REFERENCE_HOUR
+    """
+    return datetime.now().replace(hour=REFERENCE_HOUR, minute=0, second=0, microsecond=0)
+
+
+def generate_ad(rng, number, reference):
+    """
+    Generate one synthetic ad
+
+    Ads are published in the 30 days before the reference time, and
+    their deadlines lie 14 to 45 days after it.
+
+    Args:
+        rng (random.Random): Seeded random generator
+        number (int): Sequence number, used for the ad id
+        reference (datetime): Reference time of the dates
+
+    Returns:
+        dict: Ad shaped like a JobTech search hit
+    """
+    group = rng.choices(list(ROLE_WEIGHTS), weights=list(ROLE_WEIGHTS.values()))[0]
+    title, phrases = rng.choice(ROLES[group])
+    if rng.random() < 0.2:
+        title = f"Senior {title.lower()}"
+
+    consultant = rng.random() < 0.1
+    if consultant:
+        employer = rng.choice(CONSULTANT_EMPLOYERS)
+    elif rng.random() < 0.5:
+        employer = rng.choice(PUBLIC_EMPLOYERS)
+    else:
+        employer = rng.choice(PRIVATE_EMPLOYERS)
+    municipality = rng.choice(MUNICIPALITIES)
+
+    published = reference - timedelta(days=rng.randint(0, 30), minutes=rng.randint(0, 600))
+    deadline = reference + timedelta(days=rng.randint(14, 45))
+    ad_id = str(30000000 + number)
+
+    return {
+        "id": ad_id,
+        "headline": title,
+        "employer": {"name": employer},
+        "workplace_address": {
+            "municipality": municipality,
+            "municipality_code": MUNICIPALITY_CODES[municipality],
+            "region_code": MUNICIPALITY_CODES[municipality][:2]
+        },
+        "description": {"text": _description(rng, title, employer, municipality, phrases, consultant)},
+        "application_details": {"url": f"https://arbetsformedlingen.se/platsbanken/annonser/{ad_id}"},
+        "publication_date": published.strftime("%Y-%m-%dT%H:%M:%S"),
+        "application_deadline": deadline.strftime("%Y-%m-%dT23:59:59")
+    }
+
+
+def generate_ads(count, seed=0, reference=None):
+    """
+    Generate synthetic ads
+
+    Args:
+        count (int): Number of ads
+        seed (int): Random seed, the same seed gives the same ads
+        reference (datetime): Reference time of the dates (None = today, see reference_time)
+
+    Yields:
+        dict: Ads shaped like JobTech search hits
+    """
+    rng = random.Random(seed)
+    reference = reference or reference_time()
+    for number in range(count):
+        yield generate_ad(rng, number, reference)
+
+
+def generate_search_response(count, seed=0, reference=None):
+    """
+    Generate a JobTech search response holding all ads, as served by jobtech_stub_server.py
+    """
+    hits = list(generate_ads(count, seed, reference))
+    return {"total": {"value": len(hits)}, "hits": hits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic JobTech ads")
+    parser.add_argument("--count", type=int, default=DEFAULT_SCALES[0], help="number of ads")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", required=True, help="JSON file for the search response")
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(generate_search_response(args.count, args.seed), f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
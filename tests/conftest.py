@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The scripts are run as plain modules from the scripts directory
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+# Recorded inputs of the tests
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+@pytest.fixture(scope="module")
+def scraper(tmp_path_factory):
+    """
+    The scraper module, with its keyword matcher built in a temporary cache directory
+    """
+    import jobtech_job_scraper
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(jobtech_job_scraper, "RULES_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        patch.setattr(jobtech_job_scraper, "_matcher", None)
+        patch.setattr(jobtech_job_scraper, "_batch_scorer", None)
+        yield jobtech_job_scraper
@@ -0,0 +1,135 @@
+"""
+Checkpointed backfill of JSONL dumps into the job store and month shards
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from job_store import JobStore
+from synthetic_jobs import generate_ads
+
+REFERENCE = datetime(2026, 10, 1)
+
+
+@pytest.fixture(scope="module")
+def backfill(scraper):
+    import backfill
+
+    return backfill
+
+
+def write_dump(path, count, seed):
+    with open(path, "w", encoding="utf-8") as f:
+        for ad in generate_ads(count, seed=seed, reference=REFERENCE):
+            # Synthetic ids only depend on the position, dumps must not share them
+            ad["id"] = f"{seed}-{ad['id']}"
+            f.write(json.dumps(ad, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def read_shards(directory):
+    """
+    Ids in every shard, by shard name
+    """
+    shards = {}
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith(".jsonl"):
+            with open(os.path.join(directory, entry), "r", encoding="utf-8") as f:
+                shards[entry] = [json.loads(line)["id"] for line in f]
+    return shards
+
+
+class FailingSink:
+    """
+    Sink that fails after a number of batches, like an interrupted run
+    """
+
+    def __init__(self, sink, batches):
+        self.sink = sink
+        self.batches = batches
+
+    def __getattr__(self, name):
+        return getattr(self.sink, name)
+
+    def write(self, jobs, checkpoint):
+        if not self.batches:
+            raise KeyboardInterrupt
+        self.batches -= 1
+        return self.sink.write(jobs, checkpoint)
+
+
+def run_backfill(backfill, dump, sink, **kwargs):
+    try:
+        return backfill.backfill(dump, sink, workers=1, batch_size=20, **kwargs)
+    finally:
+        sink.close()
+
+
+def test_remove_ranges(backfill, tmp_path):
+    path = tmp_path / "shard.jsonl"
+    path.write_bytes(b"0123456789abcdef")
+
+    backfill._remove_ranges(str(path), [(0, 2), (5, 9), (14, 16)])
+
+    assert path.read_bytes() == b"2349abcd"
+
+
+def test_store_resumes_from_its_checkpoint(backfill, tmp_path):
+    dump = write_dump(tmp_path / "ads.jsonl", 100, seed=21)
+    store_path = str(tmp_path / "jobs.db")
+    with pytest.raises(KeyboardInterrupt):
+        run_backfill(backfill, dump, FailingSink(backfill.StoreSink(store_path, dump), 2))
+
+    result = run_backfill(backfill, dump, backfill.StoreSink(store_path, dump))
+
+    assert result["records"] == 100
+    assert result["written"] == 60
+    with JobStore(store_path) as store:
+        assert store.conn.execute("SELECT COUNT(*) FROM jobs WHERE active = 0").fetchone()[0] == 100
+
+
+def test_shards_resume_without_duplicates(backfill, tmp_path):
+    dump = write_dump(tmp_path / "ads.jsonl", 100, seed=22)
+    run_backfill(backfill, dump, backfill.ShardSink(str(tmp_path / "clean"), dump))
+
+    directory = str(tmp_path / "resumed")
+    with pytest.raises(KeyboardInterrupt):
+        run_backfill(backfill, dump, FailingSink(backfill.ShardSink(directory, dump), 2))
+    # A batch appended after the last checkpoint, as by a run killed mid-write
+    with open(os.path.join(directory, "2026-09.jsonl"), "ab") as f:
+        f.write(b'{"id": "half written"}\n')
+    run_backfill(backfill, dump, backfill.ShardSink(directory, dump))
+
+    assert read_shards(directory) == read_shards(str(tmp_path / "clean"))
+
+
+def test_restart_only_removes_the_ads_of_its_dump(backfill, tmp_path):
+    first = write_dump(tmp_path / "first.jsonl", 60, seed=23)
+    second = write_dump(tmp_path / "second.jsonl", 60, seed=24)
+    run_backfill(backfill, second, backfill.ShardSink(str(tmp_path / "second only"), second))
+
+    directory = str(tmp_path / "shards")
+    run_backfill(backfill, first, backfill.ShardSink(directory, first))
+    run_backfill(backfill, second, backfill.ShardSink(directory, second))
+    run_backfill(backfill, first, backfill.ShardSink(directory, first), restart=True)
+
+    # The restarted dump's ads are written again after the other dump's
+    with open(first, "r", encoding="utf-8") as f:
+        first_ids = {json.loads(line)["id"] for line in f}
+    shards = read_shards(directory)
+    assert sorted(ad_id for ids in shards.values() for ad_id in ids) == \
+        sorted(first_ids | {ad_id for ids in read_shards(str(tmp_path / "second only")).values() for ad_id in ids})
+    for name, ids in read_shards(str(tmp_path / "second only")).items():
+        assert [ad_id for ad_id in shards[name] if ad_id not in first_ids] == ids
+
+    # Restarting without a checkpoint of its own leaves the other dump alone
+    sink = backfill.ShardSink(directory, first)
+    sink.reset()
+    sink.close()
+    assert read_shards(directory) == read_shards(str(tmp_path / "second only"))
+    with open(os.path.join(directory, backfill.SHARD_STATE_FILE), "r", encoding="utf-8") as f:
+        state = json.load(f)
+    assert list(state["sources"]) == [os.path.abspath(second)]
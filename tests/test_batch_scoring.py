@@ -0,0 +1,85 @@
+"""
+The batch scorer must classify every job exactly like categorize_job
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from synthetic_jobs import generate_ads
+
+FIELDS = ("is_consultant", "is_meaningful", "category", "relevance_score", "content_hash")
+
+EDGE_CASES = [
+    # Empty and missing fields
+    {"title": "", "description": "", "employer": ""},
+    {"title": None, "description": None, "employer": None},
+    {},
+    # Hits in the title only
+    {"title": "Systemutvecklare Python", "description": "", "employer": ""},
+    {"title": "Machine learning engineer", "description": "", "employer": ""},
+    {"title": "RPA-utvecklare UiPath", "description": "", "employer": ""},
+    {"title": "Maskininlärning och stordata", "description": "", "employer": ""},
+    # Hits in the description only
+    {"title": "Utvecklare", "description": "Du arbetar med Java, SQL och Azure.", "employer": "Skatteverket"},
+    # Weights that add up to just above the threshold (0.2 + 0.2 + 0.2)
+    {"title": "Handläggare", "description": "Machine learning, data science och stordata", "employer": "Migrationsverket"},
+    {"title": "Analytiker med pandas", "description": "Machine learning och stordata", "employer": ""},
+    # Consultant jobs are excluded before any category is scored
+    {"title": "Javakonsult", "description": "Python och AWS", "employer": "Tech AB"},
+    {"title": "Systemutvecklare", "description": "Du blir placerad hos vår kund.", "employer": "Kodbolaget"},
+    {"title": "Systemutvecklare", "description": "Python", "employer": "Bemanning Sverige AB"},
+    # Exclusion keywords of a category
+    {"title": "Frontend developer", "description": "React och TypeScript", "employer": "Göteborgs Stad"},
+    {"title": "Doktorand i maskininlärning", "description": "Deep learning med PyTorch", "employer": "Chalmers"},
+    {"title": "DevOps engineer", "description": "Process automation med UiPath", "employer": "Region Stockholm"},
+    # Several categories in one job, where the first configured one wins a tie
+    {"title": "Data scientist", "description": "Python, SQL, RPA och machine learning", "employer": "Trafikverket"},
+    # Case and compounds
+    {"title": "SYSTEMUTVECKLARE .NET", "description": "ASP.NET och C#", "employer": "FÖRSÄKRINGSKASSAN"},
+    # A job in JobTech format
+    {"headline": "Mjukvaruutvecklare", "employer": {"name": "Polismyndigheten"},
+     "description": {"text": "Vi söker en utvecklare med Kotlin och Go."}},
+]
+
+
+def assert_same_classification(scraper, jobs):
+    reference = [dict(job) for job in jobs]
+    batch = [dict(job) for job in jobs]
+    expected = [scraper.categorize_job(job) for job in reference]
+
+    assert scraper.categorize_job_batch(batch) == expected
+    for index, (job, batch_job) in enumerate(zip(reference, batch)):
+        for field in FIELDS:
+            assert batch_job[field] == job[field], f"job {index}: {field}"
+
+
+def test_synthetic_ads(scraper):
+    jobs = [scraper.normalize_jobtech_ad(ad, "Göteborg") for ad in generate_ads(2000, seed=3)]
+    categories = {scraper.categorize_job(dict(job)) for job in jobs}
+    # The corpus covers every outcome
+    assert {"IT", "AI", "RPA", None} <= categories
+
+    assert_same_classification(scraper, jobs)
+
+
+@pytest.mark.parametrize("job", EDGE_CASES)
+def test_edge_case(scraper, job):
+    assert_same_classification(scraper, [job])
+
+
+def test_edge_cases_in_one_batch(scraper):
+    assert_same_classification(scraper, EDGE_CASES)
+
+
+def test_batches_match_single_jobs(scraper):
+    jobs = [scraper.normalize_jobtech_ad(ad, "Göteborg") for ad in generate_ads(50, seed=4)] + EDGE_CASES
+    reference = [dict(job) for job in jobs]
+    for job in reference:
+        scraper.categorize_job(job)
+
+    batched = list(scraper.categorize_jobs_in_batches([dict(job) for job in jobs], batch_size=8))
+
+    assert [{field: job[field] for field in FIELDS} for job in batched] == \
+        [{field: job[field] for field in FIELDS} for job in reference]
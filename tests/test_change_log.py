@@ -0,0 +1,149 @@
+"""
+Deltas, snapshots and compaction of the listing change log
+"""
+
+import json
+import os
+import random
+
+from change_log import MANIFEST_FILE, ChangeLog, apply_delta, diff_listings, encode_lines
+
+
+def entry(job_id, title=None):
+    return {"id": str(job_id), "title": title or f"Systemutvecklare {job_id}", "category": "IT"}
+
+
+def listing(ids, suffix=""):
+    return [entry(job_id, f"Systemutvecklare {job_id}{suffix}") for job_id in ids]
+
+
+def read_json(directory, filename):
+    with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_delta_reproduces_the_listing():
+    rng = random.Random(7)
+    previous = listing(range(50))
+    next_id = 50
+    for _ in range(20):
+        current = [item for item in previous if rng.random() > 0.1]
+        current = [entry(item["id"], item["title"] + " (uppdaterad)") if rng.random() < 0.1 else item
+                   for item in current]
+        added = rng.randint(0, 5)
+        current += listing(range(next_id, next_id + added))
+        next_id += added
+        if rng.random() < 0.3:
+            rng.shuffle(current)
+
+        assert apply_delta(previous, diff_listings(previous, current)) == current
+        previous = current
+
+
+def test_delta_holds_only_the_changes():
+    previous = listing([1, 2, 3, 4])
+    current = [previous[0], entry(2, "Nätverkstekniker"), previous[3], entry(5)]
+
+    delta = diff_listings(previous, current)
+
+    assert delta == {"added": [entry(5)], "updated": [entry(2, "Nätverkstekniker")], "removed": ["3"]}
+
+
+def test_delta_carries_the_order_only_when_it_changed():
+    previous = listing([1, 2, 3])
+
+    assert "order" not in diff_listings(previous, previous[1:] + listing([4]))
+    assert diff_listings(previous, [previous[2], previous[0], previous[1]])["order"] == ["3", "1", "2"]
+
+
+def test_encode_lines_puts_every_entry_on_a_line():
+    document = {"version": 3, "jobs": listing([1, 2]), "added": []}
+
+    encoded = encode_lines(document).decode("utf-8")
+
+    assert json.loads(encoded) == document
+    lines = encoded.splitlines()
+    assert lines[0] == '{"added":[],'
+    assert [json.loads(line.rstrip(",")) for line in lines[2:4]] == listing([1, 2])
+
+
+def test_load_rebuilds_the_latest_listing(tmp_path):
+    log = ChangeLog(str(tmp_path))
+    listings = [listing(range(200)), listing(range(1, 201))]
+    listings.append([entry(1, "Nätverkstekniker")] + listings[-1][1:])
+    listings.append(listings[-1][2:] + listing([500]))
+    for current in listings:
+        log.update(current)
+
+    manifest, loaded = log.load()
+
+    assert manifest["version"] == 4
+    assert [delta["version"] for delta in manifest["deltas"]] == [2, 3, 4]
+    assert loaded == listings[-1]
+
+
+def test_unchanged_listing_writes_no_delta(tmp_path):
+    log = ChangeLog(str(tmp_path))
+    first = log.update(listing(range(10)))
+
+    assert log.update(listing(range(10))) == first
+    assert sorted(os.listdir(tmp_path)) == [MANIFEST_FILE, "snapshot-000001.json"]
+
+
+def test_compaction_after_the_delta_limit(tmp_path):
+    log = ChangeLog(str(tmp_path), compact_after=2)
+    for count in (20, 21, 22, 23):
+        manifest = log.update(listing(range(count)))
+
+    assert manifest["version"] == 4
+    assert manifest["snapshot"] == {"version": 4, "file": "snapshot-000004.json",
+                                    "bytes": os.path.getsize(tmp_path / "snapshot-000004.json")}
+    assert manifest["deltas"] == []
+    assert read_json(tmp_path, "snapshot-000004.json")["jobs"] == listing(range(23))
+
+
+def test_compaction_when_the_deltas_outgrow_the_snapshot(tmp_path):
+    log = ChangeLog(str(tmp_path))
+    log.update(listing(range(4)))
+
+    manifest = log.update(listing(range(4), " med en mycket längre titel"))
+
+    assert manifest["snapshot"]["version"] == 2
+    assert manifest["deltas"] == []
+
+
+def test_compaction_keeps_the_previous_snapshot_for_one_cycle(tmp_path):
+    log = ChangeLog(str(tmp_path), compact_after=2)
+    manifests = [log.update(listing(range(count))) for count in range(20, 27)]
+    # Versions 1-3 are snapshot 1 and two deltas, 4-6 snapshot 4 and two
+    # deltas, 7 snapshot 7
+    assert [manifest["snapshot"]["version"] for manifest in manifests] == [1, 1, 1, 4, 4, 4, 7]
+
+    # Every file the manifest before the last compaction names is still there
+    previous = manifests[5]
+    for filename in [previous["snapshot"]["file"]] + [delta["file"] for delta in previous["deltas"]]:
+        assert os.path.exists(tmp_path / filename), filename
+    # The files from before that are gone
+    assert sorted(os.listdir(tmp_path)) == [
+        "delta-000005.json", "delta-000006.json", MANIFEST_FILE, "snapshot-000004.json", "snapshot-000007.json"
+    ]
+
+    # A visitor with the previous manifest rebuilds its version from the kept files
+    jobs = read_json(tmp_path, previous["snapshot"]["file"])["jobs"]
+    for delta in previous["deltas"]:
+        jobs = apply_delta(jobs, read_json(tmp_path, delta["file"]))
+    assert jobs == listing(range(25))
+
+
+def test_unreadable_manifest_starts_a_snapshot_with_a_new_version(tmp_path):
+    log = ChangeLog(str(tmp_path))
+    log.update(listing(range(10)))
+    log.update(listing(range(11)))
+    (tmp_path / MANIFEST_FILE).write_text("{not json", encoding="utf-8")
+
+    manifest = log.update(listing(range(12)))
+
+    # Version numbers a visitor may have cached are never reused
+    assert manifest["version"] == 3
+    assert manifest["snapshot"]["file"] == "snapshot-000003.json"
+    assert log.load() == (manifest, listing(range(12)))
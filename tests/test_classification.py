@@ -0,0 +1,54 @@
+"""
+Classification of the ads the baseline scraper exported
+
+data/baseline_jobs.json holds the 64 ads of the last export before the
+keyword matcher replaced the substring scans, with the category the
+substring scans gave them. Changes to the keyword rules or the matcher
+that move any of them show up here.
+"""
+
+import json
+import os
+from collections import Counter
+
+from conftest import DATA_DIR
+
+# Ads whose category differs from the baseline, and the reason
+RECLASSIFIED = {
+    # Uppercase keywords such as "AI", "RPA" and "Machine Learning" never
+    # matched the lowercased text before
+    "31377205": "AI",   # Junior Creative AI Operator / Developer
+    "31228788": "AI",   # Machine Learning Engineer - Computer Vision
+    "31365156": "AI",   # AI Act Compliance Lead
+    "31365074": "AI",   # UX-/Service Designer med fokus på AI-assisterad expertstöd
+    "31334419": "AI",   # Teknisk Projektledare & AI-utvecklare
+    "31307049": "RPA",  # RPA-orienterad Lönespecialist med systeminriktning
+}
+
+
+def load_baseline():
+    with open(os.path.join(DATA_DIR, "baseline_jobs.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_baseline_category_counts(scraper):
+    categories = Counter(scraper.categorize_job(dict(job)) for job in load_baseline())
+
+    assert categories == {"IT": 54, "AI": 9, "RPA": 1}
+
+
+def test_baseline_categories(scraper):
+    changed = {}
+    for job in load_baseline():
+        category = scraper.categorize_job(dict(job))
+        if category != job["category"]:
+            changed[job["id"]] = category
+
+    assert changed == RECLASSIFIED
+
+
+def test_devops_ads_stay_in_it(scraper):
+    # "devops engineer" is an IT primary keyword, so DevOps is no IT exclusion
+    jobs = {job["id"]: job for job in load_baseline()}
+    for job_id in ("31199154", "31363599", "31373113", "31270904"):
+        assert scraper.categorize_job(dict(jobs[job_id])) == "IT", jobs[job_id]["title"]
@@ -0,0 +1,196 @@
+"""
+On-disk response cache, its revalidation, and cached pages of a JobTech search walk
+"""
+
+import random
+import threading
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from fetch_engine import TokenBucket, rate_limited_get
+from http_cache import ResponseCache, cache_key
+from jobtech_stub_server import create_server
+from synthetic_jobs import generate_search_response
+
+PAGE_SIZE = 10
+PARAMS = {"q": "systemutvecklare"}
+URL = "https://jobsearch.example.org/search"
+
+
+def response(status=200, body=b"", **headers):
+    result = requests.Response()
+    result.status_code = status
+    result.headers.update({name.replace("_", "-"): value for name, value in headers.items()})
+    result._content = body
+    return result
+
+
+class RecordingSession:
+    """
+    Session that answers every GET with the next prepared response and records the request headers
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def test_put_and_get(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db"), ttl=60) as cache:
+        cache.put(URL, {"q": "python", "offset": 0}, response(body=b'{"hits": []}', Content_Type="application/json"))
+
+        cached = cache.get(URL, {"offset": 0, "q": "python"})
+
+        assert cached.fresh
+        assert cached.body == b'{"hits": []}'
+        assert cached.to_response(URL).json() == {"hits": []}
+        assert cache.get(URL, {"q": "python", "offset": 100}) is None
+
+
+def test_entries_go_stale_after_their_ttl(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db"), ttl=60) as cache:
+        cache.put(URL, {"q": "a"}, response(body=b"a"))
+        cache.put(URL, {"q": "b"}, response(body=b"b", ETag='"v1"'), ttl=0)
+
+        assert cache.get(URL, {"q": "a"}).fresh
+        assert not cache.get(URL, {"q": "b"}).fresh
+
+
+def test_no_store_responses_are_not_cached(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db")) as cache:
+        cache.put(URL, {}, response(body=b"secret", Cache_Control="private, no-store"))
+
+        assert cache.get(URL, {}) is None
+
+
+def test_a_stale_entry_is_revalidated(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db"), ttl=60) as cache:
+        cache.put(URL, {}, response(body=b"old", ETag='"v1"', Last_Modified="Wed, 30 Sep 2026 06:00:00 GMT"),
+                  ttl=0)
+        session = RecordingSession(response(304, ETag='"v2"'))
+
+        answer = rate_limited_get(session, URL, TokenBucket(100, 10), params={}, cache=cache)
+
+        assert session.requests == [{"If-None-Match": '"v1"',
+                                     "If-Modified-Since": "Wed, 30 Sep 2026 06:00:00 GMT"}]
+        assert answer.content == b"old"
+        # The 304 made the entry fresh again, with its new ETag
+        refreshed = cache.get(URL, {})
+        assert refreshed.fresh
+        assert refreshed.headers["ETag"] == '"v2"'
+        assert rate_limited_get(session, URL, TokenBucket(100, 10), params={}, cache=cache).content == b"old"
+        assert len(session.requests) == 1
+
+
+def test_a_changed_response_replaces_the_entry(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db"), ttl=60) as cache:
+        cache.put(URL, {}, response(body=b"old", ETag='"v1"'), ttl=0)
+        session = RecordingSession(response(200, b"new", ETag='"v2"'))
+
+        assert rate_limited_get(session, URL, TokenBucket(100, 10), params={}, cache=cache).content == b"new"
+
+        assert cache.get(URL, {}).body == b"new"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    # Random bytes, which zlib cannot shrink
+    body = random.Random(3).randbytes(1000)
+    with ResponseCache(str(tmp_path / "http.db"), ttl=60, max_bytes=2500) as cache:
+        for name in ("a", "b"):
+            cache.put(URL, {"q": name}, response(body=body))
+        # Reading a makes b the least recently used entry
+        cache.get(URL, {"q": "a"})
+
+        cache.put(URL, {"q": "c"}, response(body=body))
+
+        assert [cache.get(URL, {"q": name}) is not None for name in ("a", "b", "c")] == [True, False, True]
+        assert cache.stats()["entries"] == 2
+
+
+def test_expired_entries_without_validators_are_dropped(tmp_path):
+    with ResponseCache(str(tmp_path / "http.db"), ttl=60) as cache:
+        cache.put(URL, {"q": "plain"}, response(body=b"a"), ttl=-1)
+        cache.put(URL, {"q": "etag"}, response(body=b"b", ETag='"v1"'), ttl=-1)
+
+        cache.put(URL, {"q": "new"}, response(body=b"c"))
+
+        assert cache.get(URL, {"q": "plain"}) is None
+        assert cache.get(URL, {"q": "etag"}) is not None
+
+
+@pytest.fixture
+def search():
+    return generate_search_response(40, seed=11)
+
+
+@pytest.fixture
+def walk(scraper, search, tmp_path):
+    """
+    Walk the stub's search with the scraper, caching the pages in a temporary file
+    """
+    server = create_server("127.0.0.1", 0, search=search)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/search"
+    cache = ResponseCache(str(tmp_path / "http.db"), ttl=3600)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(scraper, "JOBTECH_API_URL", url)
+        patch.setattr(scraper, "HTTP_CACHE_TTL", 3600)
+        patch.setattr(scraper, "_http_cache", cache)
+
+        def run():
+            jobs = scraper.iter_jobtech_search(PARAMS, "test", "Göteborg", page_size=PAGE_SIZE)
+            return [job["id"] for job in jobs]
+
+        yield run, url, cache
+    cache.close()
+    server.shutdown()
+    server.server_close()
+
+
+def page_key(url, offset):
+    return cache_key(url, dict(PARAMS, offset=offset, limit=PAGE_SIZE))
+
+
+def set_hits(search, hits):
+    search["hits"][:] = hits
+    search["total"] = {"value": len(hits)}
+
+
+def test_a_cached_walk_stays_in_the_cache(walk, search):
+    run, _, _ = walk
+    first = run()
+    set_hits(search, search["hits"][1:])
+
+    assert run() == first
+
+
+def test_a_walk_past_an_evicted_page_starts_over(walk, search):
+    run, url, cache = walk
+    old_ids = run()
+    set_hits(search, search["hits"][1:])
+    cache.conn.execute("DELETE FROM responses WHERE key = ?", (page_key(url, 20),))
+
+    ids = run()
+
+    # The ads of the cached pages, then the rest of the fresh search,
+    # without the ad a fresh page 2 would have skipped
+    assert len(ids) == len(set(ids))
+    assert ids == old_ids
+
+
+def test_a_fresh_first_page_revalidates_the_later_ones(walk, search):
+    run, url, cache = walk
+    run()
+    added = dict(search["hits"][5], id="39999999")
+    set_hits(search, [added] + search["hits"])
+    cache.conn.execute("UPDATE responses SET expires = 0 WHERE key = ?", (page_key(url, 0),))
+
+    # A cached page 1 would repeat the last ad of page 0
+    assert run() == [hit["id"] for hit in search["hits"]]
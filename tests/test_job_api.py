@@ -0,0 +1,35 @@
+"""
+Index of the query API, built on the index of the previous update
+"""
+
+from job_api import JobIndex
+from job_record import normalize_job
+
+
+def job(job_id, title):
+    return normalize_job("JobTech", job_id, title, "Skatteverket", "Solna", f"{title} i Python och SQL",
+                         f"https://example.org/{job_id}", "2026-10-01", "2026-11-01", "01")
+
+
+def test_an_update_only_rebuilds_the_changed_jobs():
+    previous = JobIndex([job(str(number), f"Systemutvecklare {number}") for number in range(10)])
+    jobs = [job(str(number), f"Systemutvecklare {number}") for number in range(1, 10)]
+    jobs[3]["title"] = "Nätverkstekniker"
+    jobs.append(job("10", "Databasadministratör"))
+
+    index = JobIndex(jobs, previous=previous)
+
+    assert index.changed == 2
+    rebuilt = JobIndex(jobs)
+    assert (index.version, index.texts, index.listings) == (rebuilt.version, rebuilt.texts, rebuilt.listings)
+    assert index.query({"q": "nätverk"})["jobs"] == [rebuilt.listings[3]]
+
+
+def test_an_unchanged_result_set_keeps_its_version():
+    jobs = [job(str(number), f"Systemutvecklare {number}") for number in range(5)]
+    previous = JobIndex(jobs)
+
+    index = JobIndex([job(str(number), f"Systemutvecklare {number}") for number in range(5)], previous=previous)
+
+    assert index.changed == 0
+    assert index.version == previous.version
@@ -0,0 +1,47 @@
+"""
+Removal of the jobs a full sync no longer returns
+"""
+
+from job_store import JobStore
+
+FIRST_RUN = "2026-10-01T06:00:00"
+SECOND_RUN = "2026-10-02T06:00:00"
+
+
+def job(job_id, region):
+    return {"id": job_id, "title": f"Systemutvecklare {job_id}", "region": region, "category": "IT"}
+
+
+def active_ids(store):
+    return {job["id"] for job in store.iter_active_jobs()}
+
+
+def store_with_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    store.upsert_jobs([job("1", "01"), job("2", "14"), job("3", None), job("4", "14")], FIRST_RUN)
+    # The second run only returns job 4
+    store.upsert_jobs([job("4", "14")], SECOND_RUN)
+    return store
+
+
+def test_unseen_jobs_are_removed(tmp_path):
+    with store_with_jobs(tmp_path) as store:
+        assert store.deactivate_unseen(SECOND_RUN) == 3
+
+        assert active_ids(store) == {"4"}
+
+
+def test_jobs_of_failed_regions_stay(tmp_path):
+    with store_with_jobs(tmp_path) as store:
+        assert store.deactivate_unseen(SECOND_RUN, keep_regions=["01"]) == 1
+
+        # Job 2 was in a region whose searches succeeded; job 3 has no
+        # region and may belong to the failed one
+        assert active_ids(store) == {"1", "3", "4"}
+
+
+def test_jobs_without_a_region_stay_when_any_region_failed(tmp_path):
+    with store_with_jobs(tmp_path) as store:
+        store.deactivate_unseen(SECOND_RUN, keep_regions=["14"])
+
+        assert active_ids(store) == {"2", "3", "4"}
@@ -0,0 +1,102 @@
+"""
+MinHash clustering of reposted and cross-source ads
+"""
+
+from array import array
+
+from job_store import JobStore
+from near_duplicates import NUM_BINS, _DisjointSet, find_clusters, minhash_signature, similarity
+
+DESCRIPTION = (
+    "Vi söker en systemutvecklare som vill vara med och utveckla våra digitala tjänster för medborgare och "
+    "företag. Du arbetar i ett agilt team med Python, SQL och Azure, och tar ansvar för hela kedjan från krav "
+    "till drift. Vi ser gärna att du har erfarenhet av API:er, automatiserade tester och kontinuerlig leverans."
+)
+
+
+def signature(changed_bins=(), value=1):
+    """
+    Signature of 64 bins where the given bins differ from the base signature
+    """
+    bins = [1000 + index for index in range(NUM_BINS)]
+    for index in changed_bins:
+        bins[index] = value
+    return array("Q", bins).tobytes()
+
+
+# A and C each differ from B in 8 bins (87.5% similar to B), and in 16
+# bins from each other (75%, below the threshold)
+A = signature(range(0, 8), 1)
+B = signature()
+C = signature(range(8, 16), 2)
+
+
+def test_similarity_counts_equal_bins():
+    assert similarity(A, B) == 56 / 64
+    assert similarity(A, C) == 48 / 64
+
+
+def test_chains_do_not_merge_dissimilar_ads():
+    assert find_clusters([("a", A), ("b", B), ("c", C)]) == [["a", "b"]]
+
+
+def test_every_member_is_similar_to_the_representative():
+    # With B first, A and C are both similar to the representative
+    assert find_clusters([("b", B), ("a", A), ("c", C)]) == [["b", "a", "c"]]
+
+
+def test_a_bridging_ad_does_not_merge_dissimilar_clusters():
+    # b is similar to a and to c, but joining c's cluster to a would put
+    # c into a cluster whose representative it is not similar to
+    assert find_clusters([("a", A), ("c", C), ("b", B)]) == [["c", "b"]]
+
+
+def test_reposts_cluster_and_other_ads_do_not():
+    repost = DESCRIPTION.replace("Azure", "AWS")
+    other = "Vi söker en undersköterska till vår avdelning för geriatrik. Du arbetar dag, kväll och helg."
+    items = [
+        ("1", minhash_signature("Systemutvecklare", "Skatteverket", DESCRIPTION)),
+        ("2", minhash_signature("Undersköterska", "Region Skåne", other)),
+        ("3", minhash_signature("Systemutvecklare", "Skatteverket", repost)),
+        ("4", None),
+        ("5", minhash_signature("Systemutvecklare", "Skatteverket", DESCRIPTION)),
+    ]
+
+    assert find_clusters(items) == [["1", "3", "5"]]
+
+
+def test_signature_of_an_ad_without_text():
+    assert minhash_signature("", None, "") is None
+
+
+def test_disjoint_set_roots_at_the_first_item():
+    sets = _DisjointSet()
+    for _ in range(5):
+        sets.add()
+
+    sets.union(3, 4)
+    sets.union(4, 1)
+
+    assert sets.find(4) == sets.find(3) == 1
+    assert sorted(sets.members[1]) == [1, 3, 4]
+    assert 3 not in sets.members
+
+
+def test_merge_keeps_the_best_scored_ad(scraper, tmp_path):
+    def job(job_id, score, published, description=DESCRIPTION):
+        return {"id": job_id, "title": "Systemutvecklare", "employer": "Skatteverket", "description": description,
+                "url": f"https://example.org/{job_id}", "source": "JobTech", "published": published,
+                "category": "IT", "relevance_score": score}
+
+    with JobStore(str(tmp_path / "jobs.db")) as store:
+        store.upsert_jobs([job("1", 60, "2026-10-01"), job("2", 80, "2026-10-02"), job("3", 80, "2026-10-05"),
+                           job("4", 70, "2026-10-01", "Undersköterska till vår avdelning för geriatrik.")],
+                          "2026-10-06T06:00:00")
+
+        scraper.merge_near_duplicates(store)
+
+        jobs = {job["id"]: job for job in store.iter_active_jobs()}
+    # The highest score wins, the most recently published ad on a tie
+    assert sorted(jobs) == ["3", "4"]
+    assert [source["id"] for source in jobs["3"]["sources"]] == ["3", "2", "1"]
+    assert "sources" not in jobs["4"]
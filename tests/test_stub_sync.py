@@ -0,0 +1,121 @@
+"""
+Full and incremental syncs of the scraper against the JobTech stub server
+"""
+
+import copy
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+from conftest import SCRIPTS_DIR
+from job_store import JobStore
+from jobtech_stub_server import create_server
+from synthetic_jobs import generate_search_response
+
+SCALE = 300
+ADDED_ID = "39999999"
+
+
+@pytest.fixture(scope="module")
+def search():
+    return generate_search_response(SCALE, seed=5)
+
+
+@pytest.fixture(scope="module")
+def feed():
+    # The stub serves this list, which the test fills in once it knows
+    # which ads were exported
+    return []
+
+
+@pytest.fixture(scope="module")
+def stub(search, feed):
+    server = create_server("127.0.0.1", 0, feed=feed, search=search)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def run_scraper(stub, base_dir, *args):
+    env = dict(os.environ)
+    env.update({
+        "JOBTECH_API_URL": f"{stub}/search",
+        "JOBTECH_STREAM_URL": f"{stub}/stream",
+        "JOBSCRAPER_BASE_DIR": str(base_dir),
+        "JOBSCRAPER_CACHE_DIR": str(base_dir / ".cache"),
+        "JOBSCRAPER_HTTP_CACHE_TTL": "0",
+        "JOBSCRAPER_REQUESTS_PER_SECOND": "100"
+    })
+    completed = subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "jobtech_job_scraper.py"), *args],
+        cwd=base_dir, env=env, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def assert_outputs_match_store(base_dir):
+    """
+    Check the exports against the active jobs in the store, and return their ids
+    """
+    with JobStore(str(base_dir / "jobs.db")) as store:
+        active_ids = [job["id"] for job in store.iter_active_jobs()]
+    exported = read_json(base_dir / "all_jobs.json")
+    listing = read_json(base_dir / "data" / "jobs_index.json")
+    search_index = read_json(base_dir / "data" / "search_index.json")
+
+    assert [job["id"] for job in exported] == active_ids
+    assert sorted(job["id"] for job in listing) == sorted(active_ids)
+    assert search_index["count"] == len(active_ids)
+    assert search_index["listing_version"] is not None
+    category_files = {"IT": "it_jobs.json", "AI": "ai_jobs.json", "RPA": "rpa_jobs.json"}
+    for category, name in category_files.items():
+        assert [job["id"] for job in read_json(base_dir / name)] == \
+            [job["id"] for job in exported if job["category"] == category]
+    return set(active_ids)
+
+
+def test_full_and_incremental_sync(stub, search, feed, tmp_path):
+    run_scraper(stub, tmp_path)
+
+    exported_ids = assert_outputs_match_store(tmp_path)
+    # The synthetic ads are dated relative to today, so none of them has expired
+    assert len(exported_ids) >= 3
+    assert exported_ids <= {hit["id"] for hit in search["hits"]}
+    today = datetime.now().strftime("%Y-%m-%d")
+    assert all(job["deadline"] >= today for job in read_json(tmp_path / "all_jobs.json"))
+    checkpoint = read_json(tmp_path / "sync_state.json")["checkpoint"]
+
+    hits = [hit for hit in search["hits"] if hit["id"] in exported_ids]
+    removed, updated, template = hits[0], copy.deepcopy(hits[1]), copy.deepcopy(hits[2])
+    updated["headline"] = "Lagerarbetare"
+    updated["description"] = {"text": "Plock och pack på vårt lager. Truckkort är ett krav."}
+    added = template
+    added["id"] = ADDED_ID
+    added["headline"] = "Systemutvecklare inom Python och SQL"
+    added["description"] = {"text": "Du utvecklar våra system för ärendehantering i Python, SQL och Azure."}
+    feed[:] = [{"id": removed["id"], "removed": True}, updated, added]
+
+    run_scraper(stub, tmp_path, "--incremental")
+
+    # The changes came from the stream, not from another full sync
+    metrics = read_json(tmp_path / "run_metrics.json")
+    assert metrics["counters"]["changes"] == len(feed)
+    assert read_json(tmp_path / "sync_state.json")["checkpoint"] >= checkpoint
+
+    incremental_ids = assert_outputs_match_store(tmp_path)
+    assert incremental_ids == (exported_ids - {removed["id"], updated["id"]}) | {ADDED_ID}
+    with JobStore(str(tmp_path / "jobs.db")) as store:
+        assert store.get_classification(ADDED_ID)["category"] == "IT"
+        assert store.get_classification(updated["id"])["category"] is None